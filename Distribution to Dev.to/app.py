@@ -1,23 +1,45 @@
-import smtplib
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
+from __future__ import annotations
+
 import argparse
+import functools
 import os
 import pathlib
+import threading
 import time
-import base64
+import uuid
 import json
 import re
-from io import BytesIO
-from urllib.parse import quote, urljoin
-from typing import List, Optional, Tuple
-
-import requests
-from PIL import Image, ImageDraw, ImageFont
-from agents import Agent, ModelSettings, Runner, set_default_openai_key
-from bs4 import BeautifulSoup
+import shutil
+from urllib.parse import quote
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Callable, List, Optional, Tuple
+
 from dotenv import load_dotenv
 
+import b64_stream
+import banner_renditions
+import checkpoints
+from banner_cache import banner_key, default_banner_cache
+from boilerplate import default_boilerplate_index
+from canonical_index import DuplicateCanonicalError, default_canonical_index, devto_api_url
+from near_dup import NearDuplicateError, default_near_dup_index
+import html_extract
+import github_upload
+import http_client
+import ratelimit
+import sections
+from disk_cache import DiskCache, env_int, sha256_hex
+from drafts import default_draft_store
+from page_cache import default_page_cache
+
+# Heavy dependencies (agents/openai, PIL, requests, smtplib/email, markdown2) are imported
+# inside the stage that uses them, so `--help`, the web form and items served from the
+# caches start without them. bench_startup.py checks that this stays true.
+if TYPE_CHECKING:
+    import requests
+    from PIL import Image, ImageDraw, ImageFont
+    from agents import Agent
+
 STATIC_BANNERS_DIR = pathlib.Path(__file__).parent / "static" / "banners"
 
 DEFAULT_COMPANY_BLURB = (
@@ -40,13 +62,24 @@ def banner_caption_text() -> str:
 def _truthy_env(name: str, default: str = "0") -> bool:
     return (os.getenv(name, default) or "").strip().lower() in {"1", "true", "yes", "on"}
 
-try:
-    import markdown2
-except ImportError:
-    markdown2 = None
+
+def service_slot(service: str):
+    """Hold one concurrency slot for `service` (openai, openrouter, devto, github) while calling it.
+
+    Requests sent through `http_client.request(..., service=...)` take theirs in ratelimit.send(),
+    after their rate-limit wait; use this only for calls that bypass http_client (the Agents SDK).
+    """
+    return ratelimit.concurrency_slot(service)
+
 def send_medium_email(subject: str, markdown_content: str, recipient_email: str, sender_email: str, smtp_server: str, smtp_port: int, smtp_user: str, smtp_password: str, banner_url: str = None):
         """Convert markdown to HTML and send as email body for Medium copy-paste, with banner image at the top."""
-        if not markdown2:
+        import smtplib
+        from email.mime.multipart import MIMEMultipart
+        from email.mime.text import MIMEText
+
+        try:
+                import markdown2
+        except ImportError:
                 raise ImportError("markdown2 is required. Install with: pip install markdown2")
         # Remove banner markdown from content for HTML part (so it only appears in the template)
         html_body = markdown2.markdown(strip_banner_markdown(markdown_content, banner_url))
@@ -169,6 +202,11 @@ def _github_upload_banner(file_path: pathlib.Path) -> str:
     Optional:
     - GITHUB_BRANCH (default: main)
     - GITHUB_PATH_PREFIX (default: banners)
+    - GITHUB_API_URL (default: https://api.github.com)
+
+    The auth scheme and branch mode that worked are remembered (github_upload.py), so
+    later uploads skip the probing. Inside `github_upload.deferred_uploads()` the file is
+    only queued and its final raw URL returned; `github_upload.flush()` commits the batch.
 
     Note: The repo must be public for Dev.to to fetch the returned URL.
     """
@@ -182,9 +220,6 @@ def _github_upload_banner(file_path: pathlib.Path) -> str:
     if not repo or "/" not in repo:
         raise RuntimeError('GITHUB_REPO missing/invalid (expected "owner/repo")')
 
-    file_bytes = file_path.read_bytes()
-    b64 = base64.b64encode(file_bytes).decode("utf-8")
-
     def _sanitize_component(value: str) -> str:
         v = "".join(ch for ch in (value or "").strip() if ch.isprintable())
         v = v.replace(" ", "-")
@@ -195,8 +230,8 @@ def _github_upload_banner(file_path: pathlib.Path) -> str:
         return v
 
     safe_filename = _sanitize_component(file_path.name)
-    # Ensure extension stays .png for our banners.
-    if not safe_filename.lower().endswith(".png"):
+    # Ensure the banner keeps an image extension (.png, or .webp with BANNER_FORMAT=webp).
+    if not safe_filename.lower().endswith((".png", ".webp")):
         safe_filename = safe_filename + ".png"
 
     # Sanitize path prefix into slash-separated components.
@@ -208,11 +243,12 @@ def _github_upload_banner(file_path: pathlib.Path) -> str:
         for part in parts:
             safe_parts.append(_sanitize_component(part))
         path_prefix = "/".join(safe_parts)
+
+    if github_upload.deferring():
+        return github_upload.defer(f"{path_prefix or 'banners'}/{safe_filename}", file_path)
+
     def _payload(include_branch: bool) -> dict:
-        p = {
-            "message": f"Add banner {safe_filename}",
-            "content": b64,
-        }
+        p = {"message": f"Add banner {safe_filename}"}
         if include_branch and branch:
             p["branch"] = branch
         return p
@@ -222,39 +258,58 @@ def _github_upload_banner(file_path: pathlib.Path) -> str:
             "Authorization": f"{auth_scheme} {token}",
             "Accept": "application/vnd.github+json",
             "X-GitHub-Api-Version": "2022-11-28",
+            "Content-Type": "application/json",
         }
-        return requests.put(api_url, json=_payload(include_branch), headers=headers, timeout=30)
+        # The base64 content is encoded from disk in chunks into a spooled body.
+        with b64_stream.json_body(_payload(include_branch), "content", file_path) as body:
+            return http_client.put(api_url, data=body, headers=headers, timeout=30, service="github")
 
     def _try_upload(remote_path: str) -> Optional[str]:
-        api_url = f"https://api.github.com/repos/{repo}/contents/{quote(remote_path, safe='/')}"
+        api_url = f"{github_upload.api_url()}/repos/{repo}/contents/{quote(remote_path, safe='/')}"
 
         last_resp: Optional[requests.Response] = None
-        for include_branch in (True, False):
-            for scheme in ("Bearer", "token"):
-                resp = _attempt(api_url, scheme, include_branch=include_branch)
-                last_resp = resp
-                if resp.status_code in (200, 201):
-                    data = resp.json()
-                    download_url = ((data.get("content") or {}).get("download_url") or "").strip()
-                    if not download_url:
-                        raise RuntimeError("GitHub upload succeeded but download_url was missing")
-                    return download_url
-
-                # If branch name is invalid/nonexistent, retry without specifying branch.
-                if include_branch and resp.status_code == 422 and "branch" in (resp.text or "").lower():
-                    continue
-
-                # Malformed path: caller will try a different remote_path.
-                if resp.status_code == 422 and "malformed path component" in (resp.text or "").lower():
-                    return None
-
-                if resp.status_code == 403 and "resource not accessible by personal access token" in (resp.text or "").lower():
-                    raise RuntimeError(
-                        "GitHub upload failed (403): token cannot access this repo/path. "
-                        "Use a fine-grained PAT with access to this repository and Contents: Read and write. "
-                        "If this repo is under an org with SSO/SAML, authorize the token for that org. "
-                        f"Response: {resp.text}"
-                    )
+        # Last known-good (branch mode, auth scheme) first, then the rest.
+        for include_branch, scheme in github_upload.preferred_modes(repo):
+            resp = _attempt(api_url, scheme, include_branch=include_branch)
+            last_resp = resp
+            if resp.status_code in (200, 201):
+                github_upload.remember_mode(repo, scheme, include_branch)
+                data = resp.json()
+                download_url = ((data.get("content") or {}).get("download_url") or "").strip()
+                if not download_url:
+                    raise RuntimeError("GitHub upload succeeded but download_url was missing")
+                return download_url
+
+            # Content-addressed names: the same path already holds this exact banner.
+            if resp.status_code == 422 and "sha" in (resp.text or "") and "wasn't supplied" in (resp.text or ""):
+                existing = http_client.get(
+                    api_url,
+                    params={"ref": branch} if include_branch and branch else None,
+                    headers={"Authorization": f"{scheme} {token}", "Accept": "application/vnd.github+json"},
+                    timeout=30,
+                    service="github",
+                )
+                if existing.status_code == 200:
+                    github_upload.remember_mode(repo, scheme, include_branch)
+                    download_url = ((existing.json() or {}).get("download_url") or "").strip()
+                    if download_url:
+                        return download_url
+
+            # If branch name is invalid/nonexistent, retry without specifying branch.
+            if include_branch and resp.status_code == 422 and "branch" in (resp.text or "").lower():
+                continue
+
+            # Malformed path: caller will try a different remote_path.
+            if resp.status_code == 422 and "malformed path component" in (resp.text or "").lower():
+                return None
+
+            if resp.status_code == 403 and "resource not accessible by personal access token" in (resp.text or "").lower():
+                raise RuntimeError(
+                    "GitHub upload failed (403): token cannot access this repo/path. "
+                    "Use a fine-grained PAT with access to this repository and Contents: Read and write. "
+                    "If this repo is under an org with SSO/SAML, authorize the token for that org. "
+                    f"Response: {resp.text}"
+                )
 
         if last_resp is None:
             return None
@@ -286,7 +341,10 @@ def _github_upload_banner(file_path: pathlib.Path) -> str:
     )
 
 
+@functools.lru_cache(maxsize=64)
 def _pick_font(size: int) -> ImageFont.FreeTypeFont | ImageFont.ImageFont:
+    from PIL import ImageFont
+
     candidates = [
         "/System/Library/Fonts/SFNS.ttf",
         "/System/Library/Fonts/Supplemental/Arial.ttf",
@@ -301,23 +359,119 @@ def _pick_font(size: int) -> ImageFont.FreeTypeFont | ImageFont.ImageFont:
     return ImageFont.load_default()
 
 
-def _generate_local_banner_file(text: str, caption: Optional[str] = None) -> pathlib.Path:
-    """Generate a simple, readable banner locally (no external API)."""
-    width, height = 1000, 420
-    img = Image.new("RGB", (width, height), (15, 23, 42))
-    draw = ImageDraw.Draw(img)
+@functools.lru_cache(maxsize=8192)
+def _text_width(font: ImageFont.FreeTypeFont | ImageFont.ImageFont, text: str) -> float:
+    """Advance width of `text` in `font`; memoized per (font, word) since _pick_font reuses fonts."""
+    return font.getlength(text)
+
+
+LOCAL_BANNER_SIZE = (1000, 420)
+# Font sizes tried when fitting the title, largest first.
+LOCAL_BANNER_FONT_SIZES = tuple(range(76, 34, -2))
+_banner_templates: dict[tuple[int, int], Image.Image] = {}
+_banner_templates_lock = threading.Lock()
+
+
+def _banner_template(width: int, height: int) -> Image.Image:
+    """Background gradient plus accent shapes, rendered once per size; returns a copy."""
+    from PIL import Image, ImageDraw
+
+    with _banner_templates_lock:
+        template = _banner_templates.get((width, height))
+        if template is None:
+            # Vertical gradient: compute one 1px column, then stretch it across the width.
+            column = Image.new("RGB", (1, height))
+            column.putdata(
+                [
+                    (int(18 + 32 * t), int(24 + 22 * t), int(46 + 44 * t))
+                    for t in (y / (height - 1) for y in range(height))
+                ]
+            )
+            template = column.resize((width, height), Image.NEAREST)
+            draw = ImageDraw.Draw(template)
+            # Accent shapes
+            draw.ellipse([(width - 360, -120), (width + 40, 280)], outline=(96, 165, 250), width=6)
+            draw.rounded_rectangle([(60, height - 200), (520, height - 80)], radius=24, outline=(167, 243, 208), width=6)
+            _banner_templates[(width, height)] = template
+        return template.copy()
+
+
+def _wrap_title(words: list[str], font: ImageFont.ImageFont, max_w: int, max_lines: int) -> list[str]:
+    """Greedy word wrap using cached word widths; ellipsizes the last line on overflow."""
+    if not words:
+        return [""]
+    space = _text_width(font, " ")
+
+    lines: list[str] = []
+    current: list[str] = []
+    current_w = 0.0
+    for word in words:
+        word_w = _text_width(font, word)
+        candidate_w = current_w + space + word_w if current else word_w
+        if candidate_w <= max_w or not current:
+            current.append(word)
+            current_w = candidate_w
+            continue
+        lines.append(" ".join(current))
+        current, current_w = [word], word_w
+        if len(lines) >= max_lines:
+            break
+    if len(lines) < max_lines and current:
+        lines.append(" ".join(current))
+
+    # If text overflowed max_lines, ellipsize the last line.
+    if len(lines) > max_lines:
+        lines = lines[:max_lines]
+    if len(lines) == max_lines and (len(words) > sum(len(l.split()) for l in lines)):
+        last = lines[-1]
+        while last:
+            candidate = last.rstrip(" .") + "…"
+            if _text_width(font, candidate) <= max_w:
+                lines[-1] = candidate
+                break
+            last = " ".join(last.split()[:-1])
+        if not lines[-1].endswith("…"):
+            lines[-1] = (lines[-1][: max(1, len(lines[-1]) - 2)]).rstrip() + "…"
+    return lines
+
 
-    # Subtle gradient
-    for y in range(height):
-        t = y / (height - 1)
-        r = int(18 + 32 * t)
-        g = int(24 + 22 * t)
-        b = int(46 + 44 * t)
-        draw.line([(0, y), (width, y)], fill=(r, g, b))
+def _layout_title(draw: ImageDraw.ImageDraw, title: str, width: int, height: int) -> tuple[list[str], int]:
+    """Largest font size whose wrapped title fits the text box, found by binary search.
 
-    # Accent shapes
-    draw.ellipse([(width - 360, -120), (width + 40, 280)], outline=(96, 165, 250), width=6)
-    draw.rounded_rectangle([(60, height - 200), (520, height - 80)], radius=24, outline=(167, 243, 208), width=6)
+    Fitting is monotonic in font size, so O(log n) sizes are measured instead of all of them.
+    Returns `(lines, font_size)`.
+    """
+    max_w = int(width * 0.86)
+    max_h = int(height * 0.42)
+    words = title.split()
+
+    def _measure(size: int):
+        lines = _wrap_title(words, _pick_font(size), max_w=max_w, max_lines=3)
+        bbox = draw.multiline_textbbox((0, 0), "\n".join(lines), font=_pick_font(size), spacing=10, align="center")
+        return lines, bbox
+
+    best = None
+    lo, hi = 0, len(LOCAL_BANNER_FONT_SIZES) - 1
+    while lo <= hi:
+        mid = (lo + hi) // 2
+        lines, bbox = _measure(LOCAL_BANNER_FONT_SIZES[mid])
+        if bbox[2] - bbox[0] <= max_w and bbox[3] - bbox[1] <= max_h:
+            best = (lines, LOCAL_BANNER_FONT_SIZES[mid])
+            hi = mid - 1
+        else:
+            lo = mid + 1
+    return best or (_measure(36)[0], 36)
+
+
+def _render_local_banners(text: str, sizes: dict) -> dict:
+    """Render a simple, readable banner locally (no external API) at every size in `sizes`.
+
+    The title is laid out once, at the cover size; other renditions reuse the same lines
+    with the font scaled to fit. Returns `{name: image}`.
+    """
+    from PIL import Image, ImageDraw
+
+    base_w, base_h = sizes.get("cover") or LOCAL_BANNER_SIZE
 
     # Title text
     title = (text or "").strip()
@@ -328,113 +482,61 @@ def _generate_local_banner_file(text: str, caption: Optional[str] = None) -> pat
     if len(title) > 72:
         title = title[:69].rstrip() + "…"
 
-    def _wrap_lines(text_value: str, font_value: ImageFont.ImageFont, max_w: int, max_lines: int) -> list[str]:
-        words = (text_value or "").split()
-        if not words:
-            return [""]
-
-        lines: list[str] = []
-        current: list[str] = []
-        for word in words:
-            candidate = (" ".join(current + [word])).strip()
-            bbox = draw.textbbox((0, 0), candidate, font=font_value)
-            candidate_w = bbox[2] - bbox[0]
-            if candidate_w <= max_w or not current:
-                current.append(word)
-                continue
-            lines.append(" ".join(current))
-            current = [word]
-            if len(lines) >= max_lines:
-                break
-        if len(lines) < max_lines and current:
-            lines.append(" ".join(current))
-
-        # If text overflowed max_lines, ellipsize the last line.
-        if len(lines) > max_lines:
-            lines = lines[:max_lines]
-        if len(lines) == max_lines and (len(words) > sum(len(l.split()) for l in lines)):
-            last = lines[-1]
-            while last:
-                candidate = last.rstrip(" .") + "…"
-                bbox = draw.textbbox((0, 0), candidate, font=font_value)
-                if (bbox[2] - bbox[0]) <= max_w:
-                    lines[-1] = candidate
-                    break
-                last = " ".join(last.split()[:-1])
-            if not lines[-1].endswith("…"):
-                lines[-1] = (lines[-1][: max(1, len(lines[-1]) - 2)]).rstrip() + "…"
-        return lines
-
-    def _fit_text(text_value: str) -> tuple[list[str], ImageFont.ImageFont]:
-        max_w = int(width * 0.86)
-        max_h = int(height * 0.42)
-        for size in range(76, 34, -2):
-            font_value = _pick_font(size)
-            lines = _wrap_lines(text_value, font_value, max_w=max_w, max_lines=3)
-            bbox = draw.multiline_textbbox((0, 0), "\n".join(lines), font=font_value, spacing=10, align="center")
-            tw, th = bbox[2] - bbox[0], bbox[3] - bbox[1]
-            if tw <= max_w and th <= max_h:
-                return lines, font_value
-        font_value = _pick_font(36)
-        return _wrap_lines(text_value, font_value, max_w=max_w, max_lines=3), font_value
-
-    lines, font = _fit_text(title)
+    lines, font_size = _layout_title(ImageDraw.Draw(Image.new("L", (1, 1))), title, base_w, base_h)
     text_block = "\n".join(lines)
-    bbox = draw.multiline_textbbox((0, 0), text_block, font=font, spacing=10, align="center")
-    tw, th = bbox[2] - bbox[0], bbox[3] - bbox[1]
-    x = (width - tw) // 2
-    y = (height - th) // 2
 
-    # Outline for readability
-    for ox, oy in [(-2, -2), (2, -2), (-2, 2), (2, 2), (0, -2), (0, 2), (-2, 0), (2, 0)]:
-        draw.multiline_text((x + ox, y + oy), text_block, font=font, fill=(0, 0, 0), spacing=10, align="center")
-    draw.multiline_text((x, y), text_block, font=font, fill=(255, 255, 255), spacing=10, align="center")
-
-    # Caption rendering removed: no About Infrasity or other caption on local banners
-
-    STATIC_BANNERS_DIR.mkdir(parents=True, exist_ok=True)
-    ts = int(time.time())
-    filename = f"banner-{ts}.png"
-    out_path = STATIC_BANNERS_DIR / filename
-    img.save(out_path, format="PNG")
-    return out_path
+    images = {}
+    for name, size in sizes.items():
+        width, height = size or (base_w, base_h)
+        scale = min(width / base_w, height / base_h)
+        img = _banner_template(width, height)
+        draw = ImageDraw.Draw(img)
+        font = _pick_font(max(10, round(font_size * scale)))
+        spacing = max(2, round(10 * scale))
+        bbox = draw.multiline_textbbox((0, 0), text_block, font=font, spacing=spacing, align="center")
+        x = (width - (bbox[2] - bbox[0])) // 2
+        y = (height - (bbox[3] - bbox[1])) // 2
+        # Outline for readability, drawn in the same pass as the fill.
+        draw.multiline_text(
+            (x, y),
+            text_block,
+            font=font,
+            fill=(255, 255, 255),
+            spacing=spacing,
+            align="center",
+            stroke_width=max(1, round(2 * scale)),
+            stroke_fill=(0, 0, 0),
+        )
+        # Caption rendering removed: no About Infrasity or other caption on local banners
+        images[name] = img
+    return images
 
 
-def _parse_size(value: str) -> tuple[int, int]:
-    parts = value.lower().split("x")
-    if len(parts) != 2:
-        raise ValueError("size must be WxH")
-    return int(parts[0]), int(parts[1])
+def openai_api_url() -> str:
+    """OpenAI API base; OPENAI_BASE_URL is also what the agents SDK reads."""
+    return ((os.getenv("OPENAI_BASE_URL") or "").strip() or "https://api.openai.com/v1").rstrip("/")
 
 
-def _center_fit(img: Image.Image, target_w: int, target_h: int) -> Image.Image:
-    tw, th = target_w, target_h
-    iw, ih = img.size
-    target_ratio = tw / th
-    image_ratio = iw / ih
-    if image_ratio > target_ratio:
-        # too wide -> crop width
-        new_w = int(ih * target_ratio)
-        left = (iw - new_w) // 2
-        box = (left, 0, left + new_w, ih)
-    else:
-        # too tall -> crop height
-        new_h = int(iw / target_ratio)
-        top = (ih - new_h) // 2
-        box = (0, top, iw, top + new_h)
-    cropped = img.crop(box)
-    return cropped.resize((tw, th), Image.LANCZOS)
+def openrouter_api_url() -> str:
+    return ((os.getenv("OPENROUTER_API_URL") or "").strip() or "https://openrouter.ai/api/v1").rstrip("/")
 
 
 def _generate_openai_banner_file(prompt: str) -> pathlib.Path:
     """Generate an image via OpenAI Images API and save to static/banners.
 
+    Requests are paced by the `openai` rate limit (ratelimit.py).
+
     Env:
       - OPENAI_API_KEY (required)
+      - OPENAI_BASE_URL API base (default: https://api.openai.com/v1)
       - OPENAI_IMAGE_MODEL (default: dall-e-3)
       - OPENAI_IMAGE_SIZE (request to OpenAI, default: 1792x1024; must be one of 1024x1024, 1792x1024, 1024x1792)
-      - BANNER_OUTPUT_SIZE (optional final size WxH, e.g., 1000x420; will center-crop/fit from the requested image)
+
+    The file holds the image as returned; BANNER_OUTPUT_SIZE and other renditions are cut
+    from it by generate_banner_renditions().
     """
+    import requests
+
     api_key = (os.getenv("OPENAI_API_KEY") or "").strip()
     if not api_key:
         raise RuntimeError("OPENAI_API_KEY missing for OpenAI image generation.")
@@ -446,15 +548,6 @@ def _generate_openai_banner_file(prompt: str) -> pathlib.Path:
     if requested_size not in supported_sizes:
         requested_size = "1024x1024"
 
-    target_size_str = (os.getenv("BANNER_OUTPUT_SIZE") or "").strip()
-    target_w = target_h = None
-    if target_size_str:
-        try:
-            target_w, target_h = _parse_size(target_size_str)
-        except Exception:
-            # Ignore invalid target size; keep None to avoid breaking banner generation
-            target_w = target_h = None
-
     payload = {
         "model": model,
         "prompt": prompt[:2000],
@@ -466,7 +559,9 @@ def _generate_openai_banner_file(prompt: str) -> pathlib.Path:
         "Authorization": f"Bearer {api_key}",
         "Content-Type": "application/json",
     }
-    resp = requests.post("https://api.openai.com/v1/images/generations", json=payload, headers=headers, timeout=120)
+    resp = http_client.post(
+        f"{openai_api_url()}/images/generations", json=payload, headers=headers, timeout=120, service="openai"
+    )
     try:
         resp.raise_for_status()
     except requests.HTTPError as exc:  # pragma: no cover - external API
@@ -488,49 +583,33 @@ def _generate_openai_banner_file(prompt: str) -> pathlib.Path:
         raise RuntimeError(f"OpenAI Images returned no data: {data}")
     item = arr[0] or {}
 
-    image_bytes: Optional[bytes] = None
+    STATIC_BANNERS_DIR.mkdir(parents=True, exist_ok=True)
+    ts = int(time.time())
+    # Suffix keeps names unique when several items render within the same second.
+    filename = f"banner-openai-{ts}-{uuid.uuid4().hex[:8]}.png"
+    out_path = STATIC_BANNERS_DIR / filename
+    # Image bytes go straight to disk in chunks; they are never held as one blob.
     # For gpt-image-1-mini/gpt-4o, only 'url' is returned.
     if "url" in item and item["url"]:
-        img_url = str(item["url"]).strip()
-        r = requests.get(img_url, timeout=120)
-        r.raise_for_status()
-        image_bytes = r.content
+        http_client.download(str(item["url"]).strip(), out_path, timeout=120)
     elif "b64_json" in item and item["b64_json"]:
         # For backward compatibility with DALL·E models.
         try:
-            image_bytes = base64.b64decode(item["b64_json"])
-        except Exception as exc:  # pragma: no cover
+            b64_stream.decode_to_file(item["b64_json"], out_path)
+        except ValueError as exc:  # pragma: no cover
             raise RuntimeError("Failed to decode base64 image from OpenAI response") from exc
     else:
         raise RuntimeError(f"OpenAI Images response missing image content: {item}")
-
-    # Optional center-crop/resize to target size for platforms like Medium (e.g., 1000x420)
-    if target_w and target_h:
-        try:
-            with Image.open(BytesIO(image_bytes)) as im:
-                im = im.convert("RGB")
-                fitted = _center_fit(im, target_w, target_h)
-                buf = pathlib.BytesIO()
-                fitted.save(buf, format="PNG")
-                image_bytes = buf.getvalue()
-        except Exception:
-            pass
-
-    STATIC_BANNERS_DIR.mkdir(parents=True, exist_ok=True)
-    ts = int(time.time())
-    filename = f"banner-openai-{ts}.png"
-    out_path = STATIC_BANNERS_DIR / filename
-    out_path.write_bytes(image_bytes)
     return out_path
 
 
 def _generate_openrouter_banner_file(prompt: str) -> pathlib.Path:
-    """Generate an image via OpenRouter API and save to static/banners."""
+    """Generate an image via OpenRouter API (OPENROUTER_API_URL) and save to static/banners."""
     api_key = (os.getenv("OPENROUTER_API_KEY") or "").strip()
     if not api_key:
         raise RuntimeError("OPENROUTER_API_KEY missing for OpenRouter image generation.")
 
-    url = "https://openrouter.ai/api/v1/chat/completions"
+    url = f"{openrouter_api_url()}/chat/completions"
     headers = {
         "Authorization": f"Bearer {api_key}",
         "Content-Type": "application/json",
@@ -541,7 +620,7 @@ def _generate_openrouter_banner_file(prompt: str) -> pathlib.Path:
         "modalities": ["image", "text"],
         "image_config": {"aspect_ratio": "16:9", "image_size": "2K"},
     }
-    resp = requests.post(url, json=payload, headers=headers, timeout=120)
+    resp = http_client.post(url, json=payload, headers=headers, timeout=120, service="openrouter")
     resp.raise_for_status()
     data = resp.json()
     arr = data.get("choices") or []
@@ -555,12 +634,12 @@ def _generate_openrouter_banner_file(prompt: str) -> pathlib.Path:
     if not image_url.startswith("data:image"):
         raise RuntimeError("OpenRouter did not return a base64 image")
     header, encoded = image_url.split(",", 1)
-    image_bytes = base64.b64decode(encoded)
     STATIC_BANNERS_DIR.mkdir(parents=True, exist_ok=True)
     ts = int(time.time())
-    filename = f"banner-openrouter-{ts}.png"
+    # Suffix keeps names unique when several items render within the same second.
+    filename = f"banner-openrouter-{ts}-{uuid.uuid4().hex[:8]}.png"
     out_path = STATIC_BANNERS_DIR / filename
-    out_path.write_bytes(image_bytes)
+    b64_stream.decode_to_file(encoded, out_path)
     return out_path
 
 
@@ -630,14 +709,229 @@ def _remove_leading_title(md: str, title: Optional[str]) -> str:
     return md
 
 
-def generate_banner(prompt: str, base_url: Optional[str] = None, caption: Optional[str] = None) -> str:
-    """Generate a banner image.
+# Bump when _render_local_banners() output changes so cached banners are not reused.
+LOCAL_BANNER_STYLE = "local-v3"
+
+
+def _no_upload_error(_: pathlib.Path) -> str:
+    raise RuntimeError(
+        "BANNER_BASE_URL is empty and no supported BANNER_UPLOAD_PROVIDER is configured. "
+        "Set BANNER_BASE_URL to a public URL, or set BANNER_UPLOAD_PROVIDER=github with GITHUB_TOKEN+GITHUB_REPO."
+    )
+
+
+def _publish_banner_file(out_path: pathlib.Path, base_url: str, otherwise: Callable[[pathlib.Path], str]) -> str:
+    """Serve `out_path` under `base_url`, or upload it; `otherwise` handles no upload provider."""
+    if base_url:
+        return _local_file_to_base_url(out_path, base_url)
+    upload_provider = (os.getenv("BANNER_UPLOAD_PROVIDER") or "github").strip().lower()
+    if upload_provider == "github":
+        return _github_upload_banner(out_path)
+    return otherwise(out_path)
+
+
+def _banner_destination(base_url: str) -> str:
+    """Identifies where a banner URL points, so cached URLs are only reused for the same target."""
+    if base_url:
+        return base_url.rstrip("/")
+    upload_provider = (os.getenv("BANNER_UPLOAD_PROVIDER") or "github").strip().lower()
+    if upload_provider == "github":
+        repo = (os.getenv("GITHUB_REPO") or "").strip()
+        branch = (os.getenv("GITHUB_BRANCH") or "main").strip() or "main"
+        prefix = (os.getenv("GITHUB_PATH_PREFIX") or "banners").strip().strip("/")
+        return f"github:{repo}@{branch}/{prefix}"
+    return f"none:{upload_provider}"
+
+
+def _rendition_sizes(default_cover: Optional[Tuple[int, int]]) -> dict:
+    """Configured renditions; the cover defaults to the provider's own size, bare names to the cover's."""
+    sizes = banner_renditions.configured_renditions()
+    cover = sizes["cover"] or default_cover
+    return {name: size or cover for name, size in sizes.items()}
+
+
+def _output_size() -> Optional[Tuple[int, int]]:
+    """BANNER_OUTPUT_SIZE as (w, h); invalid values are ignored so banner generation keeps working."""
+    value = (os.getenv("BANNER_OUTPUT_SIZE") or "").strip()
+    try:
+        return banner_renditions.parse_size(value) if value else None
+    except ValueError:
+        return None
+
+
+def _rendition_files(provider: str, prompt: str, size: str, style: str, sizes: dict, fmt: str) -> dict:
+    """`{name: (key, path)}` of each rendition's content-addressed file; equal sizes share a file."""
+    files = {}
+    for name, dims in sizes.items():
+        tag = "x".join(map(str, dims)) if dims else "source"
+        key = banner_key(provider, prompt, f"{size}>{tag}", f"{style}/{fmt}")
+        files[name] = (key, STATIC_BANNERS_DIR / f"banner-{key}{banner_renditions.extension(fmt)}")
+    return files
+
+
+def _write_renditions(render: Callable[[], dict], files: dict, fmt: str, overwrite: bool = False) -> bool:
+    """Render once and write every missing rendition file; returns whether anything was rendered.
+
+    `render()` maps each rendition to an image to encode, or to an already-encoded file,
+    which is copied as is and removed afterwards.
+    """
+    todo = {path: name for name, (_, path) in files.items() if overwrite or not path.exists()}
+    if not todo:
+        return False
+    images = render()
+    STATIC_BANNERS_DIR.mkdir(parents=True, exist_ok=True)
+    try:
+        for path, name in todo.items():
+            tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex[:8]}.tmp")
+            if isinstance(images[name], pathlib.Path):
+                shutil.copyfile(images[name], tmp)
+            else:
+                tmp.write_bytes(banner_renditions.encode(images[name], fmt))
+            os.replace(tmp, path)
+    finally:
+        for source in {v for v in images.values() if isinstance(v, pathlib.Path)}:
+            source.unlink(missing_ok=True)
+    return True
+
+
+def _source_renditions(source: pathlib.Path, sizes: dict, fmt: str) -> dict:
+    """Cut every rendition from one generated image.
+
+    Only the header is read first. Renditions at the source's size, in the source's own
+    format, are the file itself, so they skip decoding and re-encoding. Everything else
+    comes from a single decode. Decoded-only sources are removed here.
+    """
+    from PIL import Image
+
+    with Image.open(source) as im:
+        reusable = banner_renditions.is_encoded_as(im, fmt)
+        out = {name: source for name, size in sizes.items() if reusable and size in (None, im.size)}
+        rest = {name: size for name, size in sizes.items() if name not in out}
+        if rest:
+            out.update(banner_renditions.fit_renditions(im, rest))
+    if source not in out.values():
+        source.unlink(missing_ok=True)
+    return out
+
+
+def _cached_banner(
+    provider: str,
+    prompt: str,
+    size: str,
+    style: str,
+    sizes: dict,
+    render: Callable[[], dict],
+    base_url: str,
+    otherwise: Callable[[pathlib.Path], str],
+    refresh: bool = False,
+) -> dict:
+    """Return `{rendition: url}` for (provider, prompt, size, style), rendering/uploading only on a miss.
+
+    `render()` returns every rendition's image at once, so a miss on any of them costs one
+    generation or layout pass. `refresh` skips the cache and renders again; the new banner
+    goes to new files (already-served URLs keep their image) and replaces the cached URLs.
+    """
+    fmt = banner_renditions.banner_format()
+    files = _rendition_files(provider, prompt, size, style, sizes, fmt)
+    cache = default_banner_cache()
+    destination = _banner_destination(base_url)
+    urls: dict = {}
+    if cache is not None and not refresh:
+        for name, (key, _) in files.items():
+            url = cache.get_url(key, destination)
+            if url:
+                urls[name] = url
+    missing = [name for name in files if name not in urls]
+    if not missing:
+        return urls
+    targets = files
+    if refresh:
+        targets = _rendition_files(provider, prompt, size, f"{style}+{uuid.uuid4().hex[:8]}", sizes, fmt)
+    _write_renditions(render, {name: targets[name] for name in missing}, fmt, overwrite=cache is None)
+    # A deferred GitHub upload is not committed yet; its URL is remembered once flush() commits it.
+    deferred = destination.startswith("github:") and github_upload.deferring()
+    published: dict = {}
+    for name in missing:
+        key, path = files[name][0], targets[name][1]
+        if path not in published:
+            published[path] = _publish_banner_file(path, base_url, otherwise)
+            if cache is not None and deferred:
+                github_upload.when_committed(
+                    published[path], lambda url, key=key, file_name=path.name: cache.set_url(key, destination, url, file_name)
+                )
+            elif cache is not None:
+                cache.set_url(key, destination, published[path], path.name)
+        urls[name] = published[path]
+    return {name: urls[name] for name in files}
+
+
+def _openai_banner(prompt: str, base_url: str, refresh: bool = False) -> dict:
+    sizes = _rendition_sizes(_output_size())
+    fmt = banner_renditions.banner_format()
+    return _cached_banner(
+        "openai",
+        prompt,
+        (os.getenv("OPENAI_IMAGE_SIZE") or "1024x1024").strip(),
+        "dall-e-3",
+        sizes,
+        lambda: _source_renditions(_generate_openai_banner_file(prompt), sizes, fmt),
+        base_url,
+        str,
+        refresh=refresh,
+    )
+
+
+def _local_banner(title: str, base_url: str, otherwise: Callable[[pathlib.Path], str], refresh: bool = False) -> dict:
+    sizes = _rendition_sizes(LOCAL_BANNER_SIZE)
+    return _cached_banner(
+        "local",
+        title,
+        "layout",
+        LOCAL_BANNER_STYLE,
+        sizes,
+        lambda: _render_local_banners(title, sizes),
+        base_url,
+        otherwise,
+        refresh=refresh,
+    )
+
+
+def local_banner_title(prompt: str) -> str:
+    """Visible text of a local banner for `prompt`."""
+    # Only use the blog title as the visible text for local banners.
+    # Try to extract the title from the prompt (which is usually: f"{title_clean}. {style_hint}")
+    return prompt.split(". ", 1)[0].strip()
+
+
+def prerender_local_banner(title: str) -> Tuple[dict, bool]:
+    """Render the local banner renditions for `title` to their content-addressed files unless they exist.
+
+    generate_banner() then finds the files and only publishes them. Safe to call from
+    worker processes (see `run_from_json.py banners`). Returns `({rendition: (key,
+    file_name)}, rendered)`.
+    """
+    sizes = _rendition_sizes(LOCAL_BANNER_SIZE)
+    fmt = banner_renditions.banner_format()
+    files = _rendition_files("local", title, "layout", LOCAL_BANNER_STYLE, sizes, fmt)
+    rendered = _write_renditions(lambda: _render_local_banners(title, sizes), files, fmt)
+    return {name: (key, path.name) for name, (key, path) in files.items()}, rendered
+
+
+def generate_banner_renditions(
+    prompt: str, base_url: Optional[str] = None, caption: Optional[str] = None, refresh: bool = False
+) -> dict:
+    """Generate every configured banner rendition and return `{name: url}` (always has "cover").
 
     Provider is selected via `BANNER_PROVIDER`:
-    - `local` (default): generate a local PNG (no external API)
+    - `local` (default): generate local images (no external API)
     - `openai`: generate via OpenAI Images (DALL·E)
     - `openrouter`: generate via OpenRouter API
     - `auto`: try OpenAI Images, then fall back to local
+
+    All renditions (BANNER_RENDITIONS, see banner_renditions.py) come from one generated
+    image or one title layout. Banners are cached by (provider, prompt, size, style) and
+    destination (see banner_cache.py), so an identical request returns the already-served URLs.
+    `refresh` generates a new banner anyway.
     """
     base_url = (base_url or "").strip()
 
@@ -647,67 +941,32 @@ def generate_banner(prompt: str, base_url: Optional[str] = None, caption: Option
 
     provider = (os.getenv("BANNER_PROVIDER") or "local").strip().lower()
     if provider == "local":
-        # Only use the blog title as the visible text for local banners.
-        # Try to extract the title from the prompt (which is usually: f"{title_clean}. {style_hint}")
-        title = prompt.split(". ", 1)[0].strip()
-        out_path = _generate_local_banner_file(title, caption=caption)
-        if base_url:
-            return _local_file_to_base_url(out_path, base_url)
-
-        # No base URL; upload somewhere public.
-        upload_provider = (os.getenv("BANNER_UPLOAD_PROVIDER") or "github").strip().lower()
-        if upload_provider == "github":
-            return _github_upload_banner(out_path)
-        raise RuntimeError(
-            "BANNER_BASE_URL is empty and no supported BANNER_UPLOAD_PROVIDER is configured. "
-            "Set BANNER_BASE_URL to a public URL, or set BANNER_UPLOAD_PROVIDER=github with GITHUB_TOKEN+GITHUB_REPO."
-        )
-    elif provider == "openai":
-        # Try OpenAI Images first (when provider is openai or auto)
-        if provider in ("openai", "auto"):
-            if not (os.getenv("OPENAI_API_KEY") or "").strip():
-                # Surface a clear error instead of silently falling back so users know to set the key
-                raise RuntimeError("OPENAI_API_KEY missing. Set it or choose BANNER_PROVIDER=local.")
-            try:
-                out_path = _generate_openai_banner_file(trimmed_prompt)
-                if base_url:
-                    return _local_file_to_base_url(out_path, base_url)
-                upload_provider = (os.getenv("BANNER_UPLOAD_PROVIDER") or "github").strip().lower()
-                if upload_provider == "github":
-                    return _github_upload_banner(out_path)
-                return str(out_path)
-            except Exception:
-                if provider == "openai":
-                    # In openai-only mode, surface the failure
-                    raise
-                # In auto mode, fall through to local
+        return _local_banner(local_banner_title(prompt), base_url, _no_upload_error, refresh=refresh)
+    elif provider in ("openai", "auto"):
+        if not (os.getenv("OPENAI_API_KEY") or "").strip():
+            # Surface a clear error instead of silently falling back so users know to set the key
+            raise RuntimeError("OPENAI_API_KEY missing. Set it or choose BANNER_PROVIDER=local.")
+        try:
+            return _openai_banner(trimmed_prompt, base_url, refresh=refresh)
+        except Exception:
+            if provider == "openai":
+                # In openai-only mode, surface the failure
+                raise
+            # In auto mode, fall through to local
     elif provider == "openrouter":
-        out_path = _generate_openrouter_banner_file(trimmed_prompt)
-        if base_url:
-            return _local_file_to_base_url(out_path, base_url)
-        upload_provider = (os.getenv("BANNER_UPLOAD_PROVIDER") or "github").strip().lower()
-        if upload_provider == "github":
-            return _github_upload_banner(out_path)
-        return str(out_path)
-    elif provider == "auto":
-        # Try OpenAI Images first (when provider is openai or auto)
-        if provider in ("openai", "auto"):
-            if not (os.getenv("OPENAI_API_KEY") or "").strip():
-                # Surface a clear error instead of silently falling back so users know to set the key
-                raise RuntimeError("OPENAI_API_KEY missing. Set it or choose BANNER_PROVIDER=local.")
-            try:
-                out_path = _generate_openai_banner_file(trimmed_prompt)
-                if base_url:
-                    return _local_file_to_base_url(out_path, base_url)
-                upload_provider = (os.getenv("BANNER_UPLOAD_PROVIDER") or "github").strip().lower()
-                if upload_provider == "github":
-                    return _github_upload_banner(out_path)
-                return str(out_path)
-            except Exception:
-                if provider == "openai":
-                    # In openai-only mode, surface the failure
-                    raise
-                # In auto mode, fall through to local
+        sizes = _rendition_sizes(_output_size())
+        fmt = banner_renditions.banner_format()
+        return _cached_banner(
+            "openrouter",
+            trimmed_prompt,
+            "16:9@2K",
+            "google/gemini-2.5-flash-image-preview",
+            sizes,
+            lambda: _source_renditions(_generate_openrouter_banner_file(trimmed_prompt), sizes, fmt),
+            base_url,
+            str,
+            refresh=refresh,
+        )
 
     # Final fallback: local generator
     title = trimmed_prompt
@@ -716,14 +975,14 @@ def generate_banner(prompt: str, base_url: Optional[str] = None, caption: Option
             title = title.split("titled '", 1)[1].split("'", 1)[0]
         except Exception:
             title = trimmed_prompt
-    out_path = _generate_local_banner_file(title, caption=caption)
-    if base_url:
-        return _local_file_to_base_url(out_path, base_url)
+    return _local_banner(title, base_url, lambda out_path: _local_file_to_base_url(out_path, ""), refresh=refresh)
 
-    upload_provider = (os.getenv("BANNER_UPLOAD_PROVIDER") or "github").strip().lower()
-    if upload_provider == "github":
-        return _github_upload_banner(out_path)
-    return _local_file_to_base_url(out_path, "")
+
+def generate_banner(
+    prompt: str, base_url: Optional[str] = None, caption: Optional[str] = None, refresh: bool = False
+) -> str:
+    """Generate a banner image and return the URL of its cover rendition (see generate_banner_renditions())."""
+    return generate_banner_renditions(prompt, base_url=base_url, caption=caption, refresh=refresh)["cover"]
 
 
 def fetch_page(url: str) -> Tuple[str, str, List[Tuple[str, str]], List[str]]:
@@ -731,64 +990,69 @@ def fetch_page(url: str) -> Tuple[str, str, List[Tuple[str, str]], List[str]]:
 
     Main points are extracted from headings (h1-h3) and prominent list items and returned as a
     list of short strings to help ensure the summarizer covers the article's key ideas.
+
+    Pages and their parsed results are cached on disk (see page_cache.py), so re-fetching an
+    unchanged page costs at most a conditional GET. Lines repeated across most pages of the
+    same site (nav, footer, cookie banners) are dropped from the text (see boilerplate.py).
     """
-    resp = requests.get(
-        url,
-        timeout=20,
-        headers={
-            "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X) AppleWebKit/537.36 (KHTML, like Gecko) Chrome Safari",
-        },
-    )
-    resp.raise_for_status()
-    soup = BeautifulSoup(resp.text, "html.parser")
-    title = soup.title.string.strip() if soup.title and soup.title.string else "Untitled"
-
-    # Extract readable text (preserve paragraphs and lists)
-    for tag in soup(["script", "style", "noscript", "svg"]):
-        tag.decompose()
-    body = soup.get_text(separator="\n")
-    text = "\n".join(line.strip() for line in body.splitlines() if line.strip())
-
-    # Extract and dedupe anchor links
-    seen_urls: set[str] = set()
-    links: list[Tuple[str, str]] = []
-    for a in soup.find_all("a", href=True):
-        href = a.get("href") or ""
-        abs_url = urljoin(url, href)
-        if abs_url in seen_urls:
-            continue
-        seen_urls.add(abs_url)
-        text_a = (a.get_text(strip=True) or abs_url)[:200]
-        links.append((text_a, abs_url))
-
-    # Extract main points from headings and list items (short, unique)
-    points: list[str] = []
-    def _add_point(s: str) -> None:
-        clean = " ".join((s or "").split())
-        if not clean:
-            return
-        # Keep points concise
-        if len(clean) > 240:
-            clean = clean[:237].rstrip() + "…"
-        if clean not in points:
-            points.append(clean)
-
-    for h in soup.find_all(["h1", "h2", "h3"]):
-        _add_point(h.get_text())
-    # Pull a few prominent list items (limit to first 8)
-    for li in soup.find_all("li"):
-        _add_point(li.get_text())
-        if len(points) >= 8:
-            break
+    return fetch_page_keyed(url)[:4]
+
+
+def fetch_page_keyed(url: str) -> Tuple[str, str, List[Tuple[str, str]], List[str], str]:
+    """fetch_page() plus `source_key`, a hash of the page text before boilerplate removal.
+
+    The boilerplate index keeps learning, so the cleaned text of an unchanged page can
+    change between runs. The summary cache and draft ids are keyed on `source_key`
+    instead, and stay valid until the page itself changes.
+    """
+    title, raw_text, links, points, headings = _fetch_parsed(url)
+    text = raw_text
+    index = default_boilerplate_index()
+    if index is not None:
+        text = index.clean(url, raw_text, keep=headings)
+    return title, text, links, points, sha256_hex(raw_text)
+
+
+def _fetch_parsed(url: str) -> Tuple[str, str, List[Tuple[str, str]], List[str], List[str]]:
+    """fetch_page() before boilerplate removal: `(title, text, links, points, headings)` via the page cache."""
+    def _get(target: str, extra_headers: Optional[dict] = None) -> requests.Response:
+        return http_client.get(
+            target,
+            timeout=20,
+            headers={
+                "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X) AppleWebKit/537.36 (KHTML, like Gecko) Chrome Safari",
+                **(extra_headers or {}),
+            },
+        )
+
+    cache = default_page_cache()
+    if cache is None:
+        resp = _get(url)
+        resp.raise_for_status()
+        return _parse_page(url, resp.text)
 
-    # If no headings/lists found, fall back to first sentences from the article
-    if not points:
-        words = text.split()
-        if words:
-            snippet = " ".join(words[:60])
-            _add_point(snippet)
+    html, body_hash = cache.fetch(url, _get)
+    parsed_key = f"{PAGE_PARSER_VERSION}:{body_hash}:{url}"
+    cached = cache.get_parsed(parsed_key)
+    if cached:
+        title, text, links, points, headings = cached
+        return title, text, [tuple(link) for link in links], points, headings
+    result = _parse_page(url, html)
+    cache.set_parsed(parsed_key, list(result))
+    return result
 
-    return title, text, links, points
+
+# Bump when _parse_page output changes so cached parse results are not reused.
+PAGE_PARSER_VERSION = "3"
+
+
+def _parse_page(url: str, html: str) -> Tuple[str, str, List[Tuple[str, str]], List[str], List[str]]:
+    """Extract `(title, text, links, points, headings)` from a page's HTML; see fetch_page().
+
+    PAGE_MAX_BYTES (default: 5 MB) caps how much of the document is parsed.
+    """
+    max_bytes = int(os.getenv("PAGE_MAX_BYTES") or html_extract.DEFAULT_MAX_BYTES)
+    return html_extract.extract_page(url, html, max_bytes=max_bytes)
 
 
 def build_banner_prompt(title: str, raw_text: str, tags: Optional[List[str]] = None, caption: Optional[str] = None) -> str:
@@ -811,6 +1075,156 @@ def build_banner_prompt(title: str, raw_text: str, tags: Optional[List[str]] = N
     return prompt.strip()
 
 
+SUMMARY_CACHE_DIR = pathlib.Path(__file__).parent / "cache" / "summaries"
+_summary_cache: Optional[DiskCache] = None
+_summary_cache_lock = threading.Lock()
+
+
+def summary_cache() -> Optional[DiskCache]:
+    """Disk cache of LLM summaries, or None when SUMMARY_CACHE=0.
+
+    Env: SUMMARY_CACHE_DIR (default: cache/summaries), SUMMARY_CACHE_MAX_MB (default: 50).
+    """
+    global _summary_cache
+    if not _truthy_env("SUMMARY_CACHE", default="1"):
+        return None
+    with _summary_cache_lock:
+        if _summary_cache is None:
+            directory = (os.getenv("SUMMARY_CACHE_DIR") or "").strip() or SUMMARY_CACHE_DIR
+            _summary_cache = DiskCache(directory, max_bytes=env_int("SUMMARY_CACHE_MAX_MB", 50) * 1024 * 1024)
+        return _summary_cache
+
+
+async def _run_agent_streamed(agent: Agent, input_payload: str, on_delta: Callable[[str], None]):
+    """Run `agent` with the streamed run API, forwarding output text deltas; returns the final output."""
+    from agents import Runner
+    from openai.types.responses import ResponseTextDeltaEvent
+
+    result = Runner.run_streamed(agent, input=input_payload)
+    async for event in result.stream_events():
+        if event.type == "raw_response_event" and isinstance(event.data, ResponseTextDeltaEvent):
+            on_delta(event.data.delta)
+    return result.final_output
+
+
+def _run_agent_cached(
+    name: str,
+    instructions: str,
+    input_payload: str,
+    model: str,
+    settings: dict,
+    refresh: bool = False,
+    on_delta: Optional[Callable[[str], None]] = None,
+    key_input: Optional[str] = None,
+) -> str:
+    """Run one agent call through the summary cache (keyed by instructions, input, model, settings).
+
+    `settings` are ModelSettings fields. The agents SDK is only imported on a cache miss.
+    `key_input`, when given, stands in for `input_payload` in the cache key.
+    With `on_delta`, the call is streamed and every markdown text delta is passed to it as
+    it arrives; a cached result is passed as one delta.
+    """
+    cache = summary_cache()
+    cache_key = sha256_hex(
+        json.dumps(
+            {"instructions": instructions, "input": key_input or input_payload, "model": model, "settings": settings},
+            sort_keys=True,
+        )
+    )
+    if cache is not None and not refresh:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            if on_delta is not None:
+                on_delta(cached.decode("utf-8"))
+            return cached.decode("utf-8")
+
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise RuntimeError("OPENAI_API_KEY missing.")
+
+    import asyncio
+
+    from agents import Agent, ModelSettings, Runner, set_default_openai_key
+
+    set_default_openai_key(api_key)
+
+    agent = Agent(name=name, instructions=instructions, model=model, model_settings=ModelSettings(**settings))
+    with service_slot("openai"):
+        if on_delta is None:
+            output = Runner.run_sync(agent, input=input_payload).final_output
+        else:
+            output = asyncio.run(_run_agent_streamed(agent, input_payload, on_delta))
+    output = output.strip() if isinstance(output, str) else str(output).strip()
+    if cache is not None and output:
+        cache.set(cache_key, output.encode("utf-8"))
+    return output
+
+
+# Pages longer than this are condensed section by section before the final rewrite.
+SUMMARY_MAP_THRESHOLD = 15000
+
+CONDENSE_INSTRUCTIONS = """
+You condense one section of a longer technical article into dense notes for a writer who will later rewrite the whole article.
+
+- Keep EVERY named item (tools, companies, platforms, products, people), with what the source says about each.
+- Keep numbers, versions, commands, code identifiers, links and concrete claims exactly as written.
+- Keep the section's headings as short markdown headings and preserve the source order.
+- Drop navigation, repetition, marketing filler and boilerplate.
+- Do NOT add facts, opinions or transitions that are not in the section.
+- Aim for roughly {words} words or fewer.
+"""
+
+
+def condense_long_text(
+    source_title: str,
+    raw_text: str,
+    headings: Optional[List[str]] = None,
+    model: str = "gpt-4o-mini",
+    refresh: bool = False,
+    source_key: Optional[str] = None,
+) -> Tuple[str, int]:
+    """Map step for long pages: condense heading-aligned chunks in parallel.
+
+    Returns `(digest, chunk_count)`; the digest keeps every section in document order, so
+    the final rewrite sees the whole article instead of its first 15,000 characters.
+    A page that needs more than SUMMARY_MAX_CHUNKS chunks is packed into that many larger
+    ones, with a warning, rather than losing its tail.
+    Env: SUMMARY_CHUNK_CHARS (default: 6000), SUMMARY_MAX_CHUNKS (default: 24),
+    SUMMARY_MAP_CONCURRENCY (default: 4), SUMMARY_MAP_MODEL (default: the summary model).
+    With `source_key` (see summarize_content()), chunks are cached by position in that source.
+    """
+    chunk_chars = max(1000, env_int("SUMMARY_CHUNK_CHARS", 6000))
+    max_chunks = max(1, env_int("SUMMARY_MAX_CHUNKS", 24))
+    chunks = sections.chunk_text(raw_text, headings or [], max_chars=chunk_chars)
+    if len(chunks) > max_chunks:
+        print(
+            f"[summary] {source_title}: {len(chunks)} chunks exceed SUMMARY_MAX_CHUNKS={max_chunks}; "
+            f"packing all sections into {max_chunks} larger chunks."
+        )
+        chunks = sections.chunk_text(raw_text, headings or [], max_chars=chunk_chars, max_chunks=max_chunks)
+    map_model = (os.getenv("SUMMARY_MAP_MODEL") or "").strip() or model
+    model_settings = {"temperature": 0.1}
+
+    def _condense(indexed: Tuple[int, str]) -> str:
+        index, chunk = indexed
+        instructions = CONDENSE_INSTRUCTIONS.format(words=max(120, len(chunk.split()) // 3))
+        header = f"Article: {source_title}\nSection {index + 1} of {len(chunks)}:\n\n"
+        return _run_agent_cached(
+            "condenser",
+            instructions,
+            header + chunk,
+            map_model,
+            model_settings,
+            refresh=refresh,
+            key_input=header + f"Source: {source_key}" if source_key else None,
+        )
+
+    workers = max(1, min(env_int("SUMMARY_MAP_CONCURRENCY", 4), len(chunks)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="condense") as pool:
+        notes = list(pool.map(_condense, enumerate(chunks)))
+    return "\n\n".join(note for note in notes if note), len(chunks)
+
+
 def summarize_content(
     source_title: str,
     source_url: str,
@@ -820,14 +1234,21 @@ def summarize_content(
     model: str = "gpt-4o-mini",
     banner_url: Optional[str] = None,
     lock_title: bool = False,
+    refresh: bool = False,
+    on_delta: Optional[Callable[[str], None]] = None,
+    source_key: Optional[str] = None,
 ) -> str:
-    """Summarize raw_text to markdown with the requested publication structure."""
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise RuntimeError("OPENAI_API_KEY missing.")
+    """Summarize raw_text to markdown with the requested publication structure.
 
-    set_default_openai_key(api_key)
+    Results are cached on disk keyed by the full instructions, input payload and model
+    settings (see summary_cache()); `refresh=True` skips the cached copy and overwrites it.
+    With `source_key` (see fetch_page_keyed()), the key holds it instead of the text, so
+    boilerplate the index learns later does not invalidate the cached summary.
+    Text longer than SUMMARY_MAP_THRESHOLD characters is first condensed section by section
+    (condense_long_text()) and the rewrite runs on the merged digest.
 
+    `on_delta` receives the article's markdown as it is generated (see _run_agent_cached()).
+    """
     lower, upper = target_words
     primary_keyword = (os.getenv("PRIMARY_KEYWORD") or source_title or "").strip()
 
@@ -964,12 +1385,7 @@ Before outputting, verify:
 - The article would feel at home on dev.to, not like a corporate blog.
 """
 
-    agent = Agent(
-        name="summarizer",
-        instructions=structure,
-        model=model,
-        model_settings=ModelSettings(temperature=0.3),
-    )
+    model_settings = {"temperature": 0.3}
 
     banner_line = f"Banner URL (for cover image only, do not embed as first line): {banner_url}\n" if banner_url else "Banner URL: (none)\n"
     title_line = "Title is locked; do not invent a new one.\n" if lock_title else ""
@@ -978,18 +1394,58 @@ Before outputting, verify:
         mp_lines = "\n".join(f"- {p}" for p in main_points[:8])
         main_points_block = f"Main points (extracted from source):\n{mp_lines}\n\n"
 
-    input_payload = (
+    threshold = env_int("SUMMARY_MAP_THRESHOLD", SUMMARY_MAP_THRESHOLD)
+    if threshold > 0 and len(raw_text) > threshold:
+        digest, chunk_count = condense_long_text(
+            source_title, raw_text, main_points, model=model, refresh=refresh, source_key=source_key
+        )
+        content_block = f"Content (condensed notes covering all {chunk_count} sections of the source, in order):\n{digest}"
+        key_block = f"Content: condensed source {source_key}"
+    else:
+        content_block = f"Content (may be truncated):\n{raw_text[:15000]}"
+        key_block = f"Content: source {source_key}"
+
+    header = (
         f"Source title: {source_title}\n"
         f"Source URL: {source_url}\n"
         f"{banner_line}"
         f"{title_line}"
         f"{main_points_block}"
-        f"Content (may be truncated):\n{raw_text[:15000]}"
     )
 
-    result = Runner.run_sync(agent, input=input_payload)
-    summary = result.final_output
-    return summary.strip() if isinstance(summary, str) else str(summary).strip()
+    return _run_agent_cached(
+        "summarizer",
+        structure,
+        header + content_block,
+        model,
+        model_settings,
+        refresh=refresh,
+        on_delta=on_delta,
+        key_input=header + key_block if source_key else None,
+    )
+
+
+def _run_banner_and_summary(
+    banner_job: Optional[Callable[[], str]],
+    summary_job: Callable[[], str],
+) -> Tuple[Optional[str], Optional[Exception], str]:
+    """Run banner generation alongside summarization and join both results.
+
+    The summary never needs the generated banner (it is only injected afterwards as the
+    cover image), so the two slow calls overlap and the item costs roughly the slower one.
+    Returns `(banner_url, banner_error, summary_md)`; banner failures are handed back so
+    callers can decide whether they are fatal, while summary failures propagate.
+    """
+    if banner_job is None:
+        return None, None, summary_job()
+
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="banner") as pool:
+        banner_future = pool.submit(banner_job)
+        summary_md = summary_job()
+        try:
+            return banner_future.result(), None, summary_md
+        except Exception as exc:
+            return None, exc, summary_md
 
 
 def post_devto(
@@ -1000,6 +1456,8 @@ def post_devto(
     publish: bool,
     canonical_url: Optional[str],
 ) -> dict:
+    import requests
+
     headers = {"api-key": api_key, "Content-Type": "application/json"}
 
     # No longer append company blurb or About Infrasity section automatically.
@@ -1016,7 +1474,7 @@ def post_devto(
     payload = {"article": article}
 
     def _send(p: dict) -> requests.Response:
-        return requests.post("https://dev.to/api/articles", json=p, headers=headers, timeout=20)
+        return http_client.post(f"{devto_api_url()}/articles", json=p, headers=headers, timeout=20, service="devto")
 
     resp = _send(payload)
     try:
@@ -1024,15 +1482,26 @@ def post_devto(
     except requests.HTTPError as exc:  # pragma: no cover - network dependent
         # Dev.to enforces uniqueness for canonical_url across articles.
         if resp.status_code == 422 and canonical_url and "canonical url has already been taken" in resp.text.lower():
+            index = default_canonical_index()
+            if index is not None:
+                index.record(canonical_url, source="devto-422")
             raise RuntimeError(f"Dev.to publish failed ({resp.status_code}): {resp.text}") from exc
         raise RuntimeError(f"Dev.to publish failed ({resp.status_code}): {resp.text}") from exc
 
-    return resp.json()
+    data = resp.json()
+    index = default_canonical_index()
+    if canonical_url and index is not None:
+        index.record(canonical_url, source="publish", devto_url=data.get("url"), article_id=data.get("id"))
+    return data
 
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Summarize and cross-post blog content.")
-    parser.add_argument("--url", required=True, help="Published article URL to pull content from.")
+    parser.add_argument("--url", help="Published article URL to pull content from.")
+    parser.add_argument(
+        "--draft",
+        help="Id of a draft stored by the web UI; prints it (and publishes it with --publish) instead of processing --url.",
+    )
     parser.add_argument("--tags", help="Comma-separated tags.")
     parser.add_argument("--title", help="Optional override title.")
     parser.add_argument("--banner", help="Optional banner image URL to place at top of markdown.")
@@ -1060,6 +1529,16 @@ def parse_args() -> argparse.Namespace:
         action="store_true",
         help="Actually publish (otherwise dry-run only prints payloads).",
     )
+    parser.add_argument(
+        "--refresh-summary",
+        action="store_true",
+        help="Ignore the cached summary for this input and call the model again.",
+    )
+    parser.add_argument(
+        "--skip-near-duplicates",
+        action="store_true",
+        help="Stop before banner/summary when the page near-duplicates one processed earlier.",
+    )
     # Medium email and SMTP options
     parser.add_argument(
         "--medium-email",
@@ -1087,92 +1566,327 @@ def parse_args() -> argparse.Namespace:
         "--smtp-from",
         help="Sender email address (required if --medium-email is set)."
     )
-    return parser.parse_args()
+    args = parser.parse_args()
+    if not args.url and not args.draft:
+        parser.error("one of --url or --draft is required")
+    return args
 
 
-def main() -> None:
+def _checkpoint_root() -> Optional[pathlib.Path]:
+    """Directory for per-item stage checkpoints, or None when CHECKPOINTS=0.
 
-    load_dotenv()
-    args = parse_args()
-    # Debug: print banner/image envs and args
-    print(f"[app-debug] BANNER_PROVIDER={'openai'} OPENAI_API_KEY_set={'yes' if os.getenv('OPENAI_API_KEY') else 'no'} BANNER_UPLOAD_PROVIDER={os.getenv('BANNER_UPLOAD_PROVIDER')} --auto_banner={getattr(args, 'auto_banner', None)} --banner={getattr(args, 'banner', None)}")
+    Env: CHECKPOINT_DIR (default: outputs next to app.py).
+    """
+    if not _truthy_env("CHECKPOINTS", default="1"):
+        return None
+    directory = (os.getenv("CHECKPOINT_DIR") or "").strip()
+    return pathlib.Path(directory) if directory else checkpoints.DEFAULT_ROOT
+
+
+def _check_near_duplicate(url: str, text: str, action: Optional[str], already_published: bool = False) -> None:
+    index = default_near_dup_index()
+    if index is None:
+        return
+    match = index.check(url, text)
+    if not match or already_published:
+        return
+    original, score = match
+    action = (action or os.getenv("NEAR_DUP_ACTION") or "warn").strip().lower()
+    if action == "skip":
+        raise NearDuplicateError(url, original, score)
+    print(f"[near-dup] {url} looks like a near-duplicate of {original} (similarity {score:.2f})")
+
+
+def process_item(
+    url: str,
+    *,
+    tags: Optional[List[str]] = None,
+    title: Optional[str] = None,
+    canonical: Optional[str] = None,
+    banner: Optional[str] = None,
+    auto_banner: bool = False,
+    banner_prompt: Optional[str] = None,
+    banner_base_url: Optional[str] = None,
+    lock_title: bool = False,
+    publish: bool = False,
+    medium: Optional[dict] = None,
+    refresh_summary: bool = False,
+    resume: bool = True,
+    near_dup_action: Optional[str] = None,
+    stop_after: Optional[str] = None,
+) -> dict:
+    """Run the full pipeline for one article and return its results.
 
-    tags = [t.strip() for t in args.tags.split(",") if t.strip()] if args.tags else []
-    canonical_url = args.canonical or os.getenv("CANONICAL_URL") or args.url
+    This is the library entry point shared by the CLI and the batch runner, so many
+    items can be processed in one interpreter. `medium` takes the dict shape returned by
+    `get_medium_email_config_from_env()`.
 
-    page_title, page_text, page_links, page_main_points = fetch_page(args.url)
-    title = args.title or page_title
-    lock_title = args.lock_title or bool(args.title)
+    Each stage (fetch, banner, summarize, postprocess, publish, medium) checkpoints its
+    artifact under `outputs/<item-id>/` (see checkpoints.py), and a later call resumes at
+    the first stage without one. `resume=False` redoes everything except publish and the
+    Medium email, which are never repeated once recorded. A failing stage raises
+    `checkpoints.StageError` naming it.
 
-    # Do not use company blurb as caption for banner rendering
-    caption_text = None
+    After fetching, the page is checked against the near-duplicate index (near_dup.py).
+    With `near_dup_action="skip"` (default: NEAR_DUP_ACTION, else "warn") a page that
+    near-duplicates an earlier one raises `NearDuplicateError` before any banner or LLM
+    call; with "warn" it is only reported.
 
-    banner_url = args.banner
-    if not banner_url and args.auto_banner:
-        prompt = args.banner_prompt or build_banner_prompt(title, page_text, tags, caption=None)
-        base_url = args.banner_base_url or os.getenv("BANNER_BASE_URL")
-        banner_url = generate_banner(prompt, base_url=base_url, caption=None)
+    When publishing, the canonical URL is checked against the local canonical index
+    (canonical_index.py) before anything else runs; a URL that already has a Dev.to
+    article raises `DuplicateCanonicalError` instead of failing with 422 at the end.
 
-    summary_md = summarize_content(
-        title,
-        args.url,
-        page_text,
-        main_points=page_main_points,
-        banner_url=banner_url,
-        lock_title=lock_title,
-    )
+    `stop_after="postprocess"` returns once the article is ready, without publishing or
+    emailing; the batch runner uses it to commit all banners at once before publishing.
+    """
+    tags = list(tags or [])
+    canonical_url = canonical or os.getenv("CANONICAL_URL") or url
+
+    root = _checkpoint_root()
+    ckpt = None
+    if root is not None:
+        ckpt = checkpoints.ItemCheckpoint(
+            root,
+            url,
+            inputs={
+                "tags": tags,
+                "title": title,
+                "banner": banner,
+                "auto_banner": auto_banner,
+                "banner_prompt": banner_prompt,
+                "lock_title": lock_title,
+            },
+        )
+        if not resume:
+            for name in ("fetch",) + checkpoints.INPUT_DEPENDENT_STAGES:
+                ckpt.clear(name)
+        elif refresh_summary:
+            ckpt.clear("summarize")
+            ckpt.clear("postprocess")
+
+    if publish and canonical_url and not (ckpt is not None and ckpt.path("publish").exists()):
+        index = default_canonical_index()
+        entry = index.lookup(canonical_url) if index is not None else None
+        if entry:
+            raise DuplicateCanonicalError(canonical_url, entry)
+
+    def _stage(name: str, fn: Callable[[], object]):
+        if ckpt is not None:
+            saved = ckpt.load(name)
+            if saved is not None:
+                print(f"[checkpoint] {name}: reusing {ckpt.path(name)}")
+                return saved
+        try:
+            value = fn()
+        except checkpoints.StageError:
+            # A nested stage failed (banner/summarize inside postprocess); keep its name.
+            raise
+        except Exception as exc:
+            raise checkpoints.StageError(name, exc) from exc
+        if ckpt is not None:
+            ckpt.save(name, value)
+        return value
+
+    page = _stage("fetch", lambda: list(fetch_page_keyed(url)))
+    page_title, page_text, page_links, page_main_points = page[:4]
+    source_key = page[4] if len(page) > 4 else None  # older checkpoints have no source key
+    _check_near_duplicate(url, page_text, near_dup_action, already_published=bool(ckpt and ckpt.path("publish").exists()))
+    lock_title = lock_title or bool(title)
+    title = title or page_title
+
+    banner_job = None
+    if not banner and auto_banner:
+        prompt = banner_prompt or build_banner_prompt(title, page_text, tags, caption=None)
+        base_url = banner_base_url or os.getenv("BANNER_BASE_URL")
+
+        def _banner_job() -> str:
+            def _banner() -> dict:
+                renditions = generate_banner_renditions(prompt, base_url=base_url, caption=None)
+                return {"banner_url": renditions["cover"], "renditions": renditions}
+
+            saved = _stage("banner", _banner)
+            generated["banner_renditions"] = saved.get("renditions") or {}
+            return saved["banner_url"]
+
+        banner_job = _banner_job
+
+    generated: dict = {}
+
+    def _article() -> str:
+        generated_banner, banner_error, summary = _run_banner_and_summary(
+            banner_job,
+            lambda: _stage(
+                "summarize",
+                lambda: summarize_content(
+                    title,
+                    url,
+                    page_text,
+                    main_points=page_main_points,
+                    banner_url=banner,
+                    lock_title=lock_title,
+                    refresh=refresh_summary,
+                    source_key=source_key,
+                ),
+            ),
+        )
+        if banner_error is not None:
+            raise banner_error
+        cover_url = banner or generated_banner
+        generated["banner_url"] = generated_banner
 
-    # Remove duplicated title/H1 in generated markdown when we supply title separately to Dev.to
-    summary_md = _remove_leading_title(summary_md, title)
+        # Remove duplicated title/H1 in generated markdown when we supply title separately to Dev.to
+        md = _remove_leading_title(summary, title)
 
-    # Ensure Dev.to uses the banner as the cover image.
-    if banner_url:
-        summary_md = _ensure_front_matter_cover_image(summary_md, banner_url)
+        # Ensure Dev.to uses the banner as the cover image.
+        if cover_url:
+            md = _ensure_front_matter_cover_image(md, cover_url)
 
-    # Inline banner images can render very large on Dev.to; keep it optional.
-    if banner_url and _truthy_env("INLINE_BANNER", default="0"):
-        summary_md = _ensure_banner_markdown(summary_md, banner_url)
+        # Inline banner images can render very large on Dev.to; keep it optional.
+        if cover_url and _truthy_env("INLINE_BANNER", default="0"):
+            md = _ensure_banner_markdown(md, cover_url)
 
-    # No longer append company blurb or About Infrasity section to preview markdown.
+        # No longer append company blurb or About Infrasity section to preview markdown.
+        return md
 
-    if args.publish:
-        devto_key = os.getenv("DEVTO_API_KEY")
-        if not devto_key:
-            raise RuntimeError("DEVTO_API_KEY missing (required when --publish is set).")
-        devto_resp = post_devto(devto_key, title, summary_md, tags, publish=True, canonical_url=canonical_url)
+    summary_md = _stage("postprocess", _article)
+    # A resumed run skips _article(); the banner checkpoint still has the URL.
+    banner_url = banner or generated.get("banner_url")
+    renditions = {} if banner else generated.get("banner_renditions") or {}
+    if not banner_url and ckpt is not None:
+        saved_banner = ckpt.load("banner") or {}
+        banner_url = saved_banner.get("banner_url")
+        renditions = saved_banner.get("renditions") or {}
+    if banner_url and not renditions:
+        renditions = {"cover": banner_url}
+
+    devto_resp: Optional[dict] = None
+    if stop_after == "postprocess":
+        publish, medium = False, None
+    if publish:
+
+        def _publish() -> dict:
+            devto_key = os.getenv("DEVTO_API_KEY")
+            if not devto_key:
+                raise RuntimeError("DEVTO_API_KEY missing (required when --publish is set).")
+            return post_devto(devto_key, title, summary_md, tags, publish=True, canonical_url=canonical_url)
+
+        devto_resp = _stage("publish", _publish)
         print("Dev.to published:", devto_resp.get("url", devto_resp))
-    else:
+    elif stop_after != "postprocess":
         # Dry-run mode: do not require DEVTO_API_KEY
         print("[dry-run] Dev.to payload ready (not sent).")
 
-    print("Summary ready.\n---\n")
-    print(summary_md)
-
     # If requested, send Medium-ready HTML email
+    if medium and medium.get("medium_email"):
+
+        def _send_medium() -> dict:
+            if not all([
+                medium.get("smtp_server"), medium.get("smtp_user"), medium.get("smtp_password"), medium.get("smtp_from")
+            ]):
+                raise RuntimeError("To send Medium email, provide --smtp-server, --smtp-user, --smtp-password, and --smtp-from.")
+            # Always prepend the banner image (if available) to the Medium email markdown for plain text part
+            medium_md = summary_md
+            email_banner = renditions.get("medium") or banner_url
+            if email_banner:
+                banner_md = f"![Banner]({email_banner})\n\n"
+                if not medium_md.lstrip().startswith("![Banner]("):
+                    medium_md = banner_md + medium_md.lstrip("\n")
+            print(f"[medium-email] Sending Medium-ready HTML to {medium['medium_email']}...")
+            send_medium_email(
+                subject=f"Medium-ready: {title}",
+                markdown_content=medium_md,
+                recipient_email=medium["medium_email"],
+                sender_email=medium["smtp_from"],
+                smtp_server=medium["smtp_server"],
+                smtp_port=int(medium.get("smtp_port") or 465),
+                smtp_user=medium["smtp_user"],
+                smtp_password=medium["smtp_password"],
+                banner_url=email_banner,
+            )
+            print("[medium-email] Sent.")
+            return {"recipient": medium["medium_email"], "sent_at": time.time()}
+
+        _stage("medium", _send_medium)
+
+    return {
+        "url": url,
+        "title": title,
+        "canonical_url": canonical_url,
+        "banner_url": banner_url,
+        "banner_renditions": renditions,
+        "summary_md": summary_md,
+        "devto": devto_resp,
+    }
+
+
+def publish_draft(draft_id: str, tags: List[str], canonical: Optional[str], publish: bool) -> None:
+    """Print a draft stored by the web UI and, with `publish`, post it to Dev.to."""
+    store = default_draft_store()
+    draft = store.get(draft_id) if store is not None else None
+    if draft is None:
+        raise SystemExit(f"Draft {draft_id!r} is not in the draft store.")
+    print(f"Draft {draft_id}: {draft.get('title') or 'Untitled'} ({draft.get('source_url')})\n---\n")
+    print(draft["summary_md"])
+    if draft.get("published"):
+        print(f"\nAlready published: {draft['published'].get('url')}")
+    if not publish:
+        return
+    devto_key = os.getenv("DEVTO_API_KEY")
+    if not devto_key:
+        raise RuntimeError("DEVTO_API_KEY missing (required when --publish is set).")
+    devto_resp = post_devto(
+        devto_key,
+        draft.get("title") or "Untitled",
+        draft["summary_md"],
+        tags,
+        publish=True,
+        canonical_url=canonical or draft.get("source_url"),
+    )
+    store.mark_published(draft_id, devto_resp)
+    print(f"\nDev.to published: {devto_resp.get('url', devto_resp)}")
+
+
+def main() -> None:
+
+    load_dotenv()
+    args = parse_args()
+    # Debug: print banner/image envs and args
+    print(f"[app-debug] BANNER_PROVIDER={'openai'} OPENAI_API_KEY_set={'yes' if os.getenv('OPENAI_API_KEY') else 'no'} BANNER_UPLOAD_PROVIDER={os.getenv('BANNER_UPLOAD_PROVIDER')} --auto_banner={getattr(args, 'auto_banner', None)} --banner={getattr(args, 'banner', None)}")
+
+    tags = [t.strip() for t in args.tags.split(",") if t.strip()] if args.tags else []
+    if args.draft:
+        publish_draft(args.draft, tags=tags, canonical=args.canonical, publish=args.publish)
+        return
+
+    medium = None
     if getattr(args, "medium_email", None):
-        if not all([
-            args.smtp_server, args.smtp_user, args.smtp_password, args.smtp_from
-        ]):
-            raise RuntimeError("To send Medium email, provide --smtp-server, --smtp-user, --smtp-password, and --smtp-from.")
-        # Always prepend the banner image (if available) to the Medium email markdown for plain text part
-        medium_md = summary_md
-        if banner_url:
-            banner_md = f"![Banner]({banner_url})\n\n"
-            if not medium_md.lstrip().startswith("![Banner]("):
-                medium_md = banner_md + medium_md.lstrip("\n")
-        print(f"[medium-email] Sending Medium-ready HTML to {args.medium_email}...")
-        send_medium_email(
-            subject=f"Medium-ready: {title}",
-            markdown_content=medium_md,
-            recipient_email=args.medium_email,
-            sender_email=args.smtp_from,
-            smtp_server=args.smtp_server,
-            smtp_port=args.smtp_port,
-            smtp_user=args.smtp_user,
-            smtp_password=args.smtp_password,
-            banner_url=banner_url,
-        )
-        print("[medium-email] Sent.")
+        medium = {
+            "medium_email": args.medium_email,
+            "smtp_server": args.smtp_server,
+            "smtp_port": args.smtp_port,
+            "smtp_user": args.smtp_user,
+            "smtp_password": args.smtp_password,
+            "smtp_from": args.smtp_from,
+        }
+
+    result = process_item(
+        args.url,
+        tags=tags,
+        title=args.title,
+        canonical=args.canonical,
+        banner=args.banner,
+        auto_banner=args.auto_banner,
+        banner_prompt=args.banner_prompt,
+        banner_base_url=args.banner_base_url,
+        lock_title=args.lock_title,
+        publish=args.publish,
+        medium=medium,
+        refresh_summary=args.refresh_summary,
+        near_dup_action="skip" if args.skip_near_duplicates else None,
+    )
+
+    print("Summary ready.\n---\n")
+    print(result["summary_md"])
 
 
 if __name__ == "__main__":
@@ -0,0 +1,61 @@
+"""Chunked base64 helpers, so banner bytes are never held in memory as one blob.
+
+- `decode_to_file()` writes a base64 payload (OpenAI `b64_json`, OpenRouter data URLs)
+  to disk a slice at a time.
+- `json_body()` builds a JSON request body whose base64 field is encoded straight from a
+  file into a spooled temp file. It stays in memory while small and moves to disk
+  beyond SPOOL_MAX_BYTES, and requests streams it as the upload body.
+"""
+import base64
+import json
+import os
+import pathlib
+import re
+import tempfile
+from typing import IO
+
+CHUNK_BYTES = 3 * 64 * 1024  # multiple of 3: every chunk encodes without padding
+CHUNK_CHARS = 4 * 64 * 1024  # multiple of 4: every slice decodes on its own
+SPOOL_MAX_BYTES = 1024 * 1024
+_WHITESPACE = re.compile(r"\s")
+
+
+def decode_to_file(encoded: str, dest: pathlib.Path) -> int:
+    """Decode base64 `encoded` into `dest` slice by slice; returns bytes written."""
+    if _WHITESPACE.search(encoded):
+        # Line-wrapped payloads would shift the 4-character slice boundaries.
+        encoded = _WHITESPACE.sub("", encoded)
+    tmp = dest.with_name(f".{dest.name}.part")
+    written = 0
+    try:
+        with open(tmp, "wb") as f:
+            for start in range(0, len(encoded), CHUNK_CHARS):
+                chunk = base64.b64decode(encoded[start : start + CHUNK_CHARS], validate=True)
+                f.write(chunk)
+                written += len(chunk)
+        os.replace(tmp, dest)
+    except Exception:
+        tmp.unlink(missing_ok=True)
+        raise
+    return written
+
+
+def encode_file(src: pathlib.Path, out: IO[bytes]) -> None:
+    """Write the base64 encoding of `src` to `out` without reading `src` in one go."""
+    with open(src, "rb") as f:
+        while True:
+            chunk = f.read(CHUNK_BYTES)
+            if not chunk:
+                break
+            out.write(base64.b64encode(chunk))
+
+
+def json_body(fields: dict, key: str, src: pathlib.Path) -> IO[bytes]:
+    """`fields` plus `key: base64(src)` as a JSON body in a rewound spooled temp file."""
+    head = json.dumps(fields)[:-1]
+    body = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    body.write(f"{head}{', ' if fields else ''}{json.dumps(key)}: \"".encode("utf-8"))
+    encode_file(src, body)
+    body.write(b'"}')
+    body.seek(0)
+    return body
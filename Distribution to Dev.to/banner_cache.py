@@ -0,0 +1,62 @@
+"""Content-addressed banner cache used by app.generate_banner().
+
+A banner is identified by `banner_key(provider, prompt, size, style)`. Its rendered PNG is
+kept as `static/banners/banner-<key>.png`, and the manifest maps `(key, destination)` to
+the public URL the banner was already served or uploaded under. A destination is the
+base URL, or the GitHub repo, branch and prefix. A repeat request for the same banner
+returns that URL without rendering, calling an image API or committing to GitHub again.
+If only the PNG exists (e.g. a new destination), it is reused without re-rendering.
+
+The manifest is a DiskCache, so it is bounded in size and evicts least-recently-used
+entries first.
+
+Env:
+  - BANNER_CACHE (default: 1) set to 0 to always render and upload
+  - BANNER_CACHE_DIR manifest location (default: cache/banners next to app.py)
+  - BANNER_CACHE_MAX_MB manifest size bound (default: 5)
+"""
+import json
+import os
+import pathlib
+import threading
+from typing import Optional
+
+from disk_cache import DiskCache, env_int, sha256_hex
+
+DEFAULT_DIR = pathlib.Path(__file__).parent / "cache" / "banners"
+
+
+def banner_key(provider: str, prompt: str, size: str, style: str) -> str:
+    """Stable short hash of everything that determines a banner's pixels."""
+    return sha256_hex(json.dumps([provider, prompt, size, style]))[:24]
+
+
+class BannerCache:
+    def __init__(self, directory: pathlib.Path | str, max_bytes: int = 5 * 1024 * 1024):
+        self.manifest = DiskCache(directory, max_bytes=max_bytes)
+
+    def get_url(self, key: str, destination: str) -> Optional[str]:
+        entry = self.manifest.get_json(f"url:{key}:{destination}")
+        return (entry or {}).get("url")
+
+    def set_url(self, key: str, destination: str, url: str, file_name: str) -> None:
+        self.manifest.set_json(f"url:{key}:{destination}", {"url": url, "file": file_name})
+
+    def stats(self) -> dict:
+        return self.manifest.stats()
+
+
+_default_cache: Optional[BannerCache] = None
+_default_lock = threading.Lock()
+
+
+def default_banner_cache() -> Optional[BannerCache]:
+    """Process-wide BannerCache configured from env, or None when BANNER_CACHE=0."""
+    global _default_cache
+    if (os.getenv("BANNER_CACHE", "1") or "").strip().lower() in {"0", "false", "no", "off"}:
+        return None
+    with _default_lock:
+        if _default_cache is None:
+            directory = (os.getenv("BANNER_CACHE_DIR") or "").strip() or DEFAULT_DIR
+            _default_cache = BannerCache(directory, max_bytes=env_int("BANNER_CACHE_MAX_MB", 5) * 1024 * 1024)
+        return _default_cache
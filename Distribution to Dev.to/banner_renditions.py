@@ -0,0 +1,119 @@
+"""Named banner renditions (cover, OG card, ...) and their compact encodings.
+
+generate_banner_renditions() produces every rendition in one pass. A local banner lays
+out its title once and draws each size from that layout. A generated image is decoded
+once and center-cropped to each size. Each rendition is then encoded in the configured
+format before it is written and uploaded.
+
+`cover` is always produced. It is the Dev.to cover image that generate_banner() returns,
+and its size defaults to the provider's own size: 1000x420 for local banners, or
+BANNER_OUTPUT_SIZE (else the generated image as is) for image APIs. A rendition named
+`medium` is embedded in the Medium email instead of the cover.
+
+Env:
+  - BANNER_RENDITIONS comma-separated `name:WxH` list, e.g. `cover:1000x420,og:1200x630`
+    (default: `cover`); a bare name takes the provider's own size
+  - BANNER_FORMAT `png8` palette-quantized PNG (default), `png` full-color PNG, or `webp`
+"""
+from __future__ import annotations
+
+import io
+import os
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+Size = Optional[Tuple[int, int]]
+FORMATS = {"png8": ("PNG", ".png"), "png": ("PNG", ".png"), "webp": ("WEBP", ".webp")}
+WEBP_QUALITY = 85
+
+
+def parse_size(value: str) -> Tuple[int, int]:
+    parts = value.lower().split("x")
+    if len(parts) != 2:
+        raise ValueError("size must be WxH")
+    return int(parts[0]), int(parts[1])
+
+
+def parse_renditions(spec: Optional[str]) -> Dict[str, Size]:
+    """`{name: (w, h) or None}` for a BANNER_RENDITIONS value, `cover` first."""
+    renditions: Dict[str, Size] = {"cover": None}
+    for part in (spec or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        name, _, size = part.partition(":")
+        name = name.strip().lower()
+        if not name:
+            raise RuntimeError(f"Invalid BANNER_RENDITIONS entry: {part!r}")
+        try:
+            renditions[name] = parse_size(size.strip()) if size.strip() else None
+        except ValueError as exc:
+            raise RuntimeError(f"Invalid BANNER_RENDITIONS size in {part!r} (expected name:WxH)") from exc
+    return renditions
+
+
+def configured_renditions() -> Dict[str, Size]:
+    return parse_renditions(os.getenv("BANNER_RENDITIONS"))
+
+
+def banner_format() -> str:
+    fmt = (os.getenv("BANNER_FORMAT") or "png8").strip().lower()
+    if fmt not in FORMATS:
+        raise RuntimeError(f"BANNER_FORMAT must be one of {', '.join(FORMATS)} (got {fmt!r})")
+    return fmt
+
+
+def extension(fmt: str) -> str:
+    return FORMATS[fmt][1]
+
+
+def is_encoded_as(img: Image.Image, fmt: str) -> bool:
+    """Whether an opened image file already is what encode(img, fmt) would produce."""
+    if fmt == "png8":
+        return img.format == "PNG" and img.mode == "P"
+    return img.format == FORMATS[fmt][0]
+
+
+def center_fit(img: Image.Image, target_w: int, target_h: int) -> Image.Image:
+    """Center-crop `img` to the target aspect ratio, then resize it to the target size."""
+    from PIL import Image
+
+    tw, th = target_w, target_h
+    iw, ih = img.size
+    if (iw, ih) == (tw, th):
+        return img
+    target_ratio = tw / th
+    image_ratio = iw / ih
+    if image_ratio > target_ratio:
+        # too wide -> crop width
+        new_w = int(ih * target_ratio)
+        left = (iw - new_w) // 2
+        box = (left, 0, left + new_w, ih)
+    else:
+        # too tall -> crop height
+        new_h = int(iw / target_ratio)
+        top = (ih - new_h) // 2
+        box = (0, top, iw, top + new_h)
+    return img.resize((tw, th), Image.LANCZOS, box=box)
+
+
+def fit_renditions(img: Image.Image, sizes: Dict[str, Size]) -> Dict[str, Image.Image]:
+    """Every rendition from one decoded source; a None size keeps the source as is."""
+    img = img.convert("RGB")
+    return {name: center_fit(img, *size) if size else img for name, size in sizes.items()}
+
+
+def encode(img: Image.Image, fmt: str) -> bytes:
+    """`img` encoded as `fmt`; png8 quantizes to a 256-color palette first."""
+    from PIL import Image
+
+    buf = io.BytesIO()
+    if fmt == "png8":
+        img.convert("RGB").quantize(colors=256, method=Image.Quantize.FASTOCTREE).save(buf, format="PNG", optimize=True)
+    elif fmt == "webp":
+        img.convert("RGB").save(buf, format="WEBP", quality=WEBP_QUALITY)
+    else:
+        img.save(buf, format="PNG", optimize=True)
+    return buf.getvalue()
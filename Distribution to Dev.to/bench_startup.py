@@ -0,0 +1,101 @@
+"""Startup benchmark: import cost of app.py, web.py and run_from_json.py.
+
+Each target runs in a fresh interpreter under `python -X importtime`, a few times, and
+the fastest run counts. Modules the bare interpreter loads anyway (`-c pass`) are left
+out. The check fails (exit 1) when a target goes over its time budget, or when it
+imports one of the heavy dependencies the pipeline defers to the stage that needs them.
+The heavy-module check does not depend on machine speed, so it catches regressions even
+with generous budgets.
+
+    python bench_startup.py                  # table + pass/fail
+    python bench_startup.py --runs 10 --budget-scale 2 --top 8
+"""
+import argparse
+import pathlib
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+ROOT = pathlib.Path(__file__).parent
+
+# Imported lazily by the pipeline; none may load at startup.
+DEFERRED_MODULES = ("agents", "openai", "PIL", "requests", "urllib3", "smtplib", "email.mime", "markdown2", "asyncio")
+
+# (label, interpreter arguments, budget in ms)
+TARGETS: List[Tuple[str, List[str], float]] = [
+    ("import app", ["-c", "import app"], 250),
+    ("import run_from_json", ["-c", "import run_from_json"], 150),
+    ("import web", ["-c", "import web"], 600),
+    ("app.py --help", [str(ROOT / "app.py"), "--help"], 400),
+]
+
+
+def _importtime(args: List[str]) -> Tuple[float, Dict[str, int]]:
+    """Wall-clock ms of one run and `{module: self µs}` from its -X importtime report."""
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", *args], cwd=ROOT, capture_output=True, text=True
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+    if proc.returncode != 0:
+        raise RuntimeError(f"{' '.join(args)} exited with {proc.returncode}:\n{proc.stderr[-2000:]}")
+    modules: Dict[str, int] = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:") :].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():  # the header line
+            continue
+        modules[parts[2].strip()] = int(parts[0])
+    return wall_ms, modules
+
+
+def _is_deferred(module: str) -> bool:
+    return any(module == name or module.startswith(name + ".") for name in DEFERRED_MODULES)
+
+
+def measure(args: List[str], runs: int, baseline: Dict[str, int]) -> Tuple[float, float, Dict[str, int]]:
+    """Best wall ms, best import ms beyond the baseline, and that run's extra modules."""
+    best_wall, best_import, best_modules = float("inf"), float("inf"), {}
+    for _ in range(runs):
+        wall_ms, modules = _importtime(args)
+        extra = {name: us for name, us in modules.items() if name not in baseline}
+        import_ms = sum(extra.values()) / 1000
+        best_wall = min(best_wall, wall_ms)
+        if import_ms < best_import:
+            best_import, best_modules = import_ms, extra
+    return best_wall, best_import, best_modules
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Check startup import time and deferred heavy imports.")
+    parser.add_argument("--runs", type=int, default=5, help="Runs per target; the fastest counts (default: 5).")
+    parser.add_argument("--budget-scale", type=float, default=1.0, help="Multiply every budget, e.g. on slow CI machines.")
+    parser.add_argument("--top", type=int, default=5, help="Slowest own imports listed per target (default: 5).")
+    args = parser.parse_args()
+
+    _, baseline = _importtime(["-c", "pass"])
+    failures: List[str] = []
+    print(f"{'target':<24} {'imports ms':>10} {'wall ms':>9} {'budget ms':>10}")
+    for label, target_args, budget in TARGETS:
+        budget *= args.budget_scale
+        wall_ms, import_ms, modules = measure(target_args, max(1, args.runs), baseline)
+        print(f"{label:<24} {import_ms:>10.1f} {wall_ms:>9.1f} {budget:>10.0f}")
+        for name, us in sorted(modules.items(), key=lambda item: -item[1])[: args.top]:
+            print(f"    {us / 1000:>7.1f} ms  {name}")
+        if import_ms > budget:
+            failures.append(f"{label}: imports take {import_ms:.0f} ms (budget {budget:.0f} ms)")
+        deferred = sorted({name.split(".")[0] for name in modules if _is_deferred(name)})
+        if deferred:
+            failures.append(f"{label}: imports deferred dependencies at startup: {', '.join(deferred)}")
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    if not failures:
+        print("OK")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+"""Per-site boilerplate index: drop text lines that repeat across most pages of a site.
+
+Navigation, footers, cookie banners and "related posts" blocks show up as the same text
+lines on nearly every page of a site. For each site (host), the index remembers the set
+of line hashes seen on every fetched URL, plus a document frequency per hash. A line whose
+hash appears on at least `ratio` of the site's pages (once `min_pages` are known) is
+treated as boilerplate and removed before the text reaches the summarizer. The page's own
+headings (`keep`) are never removed: articles on one topic share headings such as
+"Conclusion" or "Key Features", and sections.py splits the text at them.
+
+Observing a page replaces that URL's previous line set, so re-fetching a page updates
+the counts instead of inflating them. Each site is persisted as one JSON file and
+updated incrementally under a file lock, so batch workers and parallel runners share it.
+
+Env:
+  - BOILERPLATE (default: 1) set to 0 to disable
+  - BOILERPLATE_DIR (default: cache/boilerplate next to app.py)
+  - BOILERPLATE_RATIO share of pages a line must appear on to be stripped (default: 0.8)
+  - BOILERPLATE_MIN_PAGES pages of a site needed before anything is stripped (default: 10)
+  - BOILERPLATE_MAX_PAGES pages remembered per site, oldest forgotten first (default: 500)
+"""
+import json
+import os
+import pathlib
+import re
+import threading
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlparse
+
+from disk_cache import env_int, sha256_hex
+from state_store import _write_json_atomic, file_lock
+
+DEFAULT_DIR = pathlib.Path(__file__).parent / "cache" / "boilerplate"
+DEFAULT_RATIO = 0.8
+DEFAULT_MIN_PAGES = 10
+
+
+def line_hash(line: str) -> str:
+    return sha256_hex(" ".join(line.split()).casefold())[:16]
+
+
+def site_of(url: str) -> str:
+    host = (urlparse(url or "").hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+class BoilerplateIndex:
+    def __init__(
+        self,
+        directory: pathlib.Path | str,
+        ratio: float = DEFAULT_RATIO,
+        min_pages: int = DEFAULT_MIN_PAGES,
+        max_pages: int = 500,
+    ):
+        self.directory = pathlib.Path(directory)
+        self.ratio = ratio
+        self.min_pages = max(2, min_pages)
+        self.max_pages = max(self.min_pages, max_pages)
+        self._lock = threading.Lock()
+        self.lines_stripped = 0
+        self.chars_stripped = 0
+
+    def _path(self, site: str) -> pathlib.Path:
+        return self.directory / f"{re.sub(r'[^A-Za-z0-9.-]+', '_', site) or 'local'}.json"
+
+    def _read(self, site: str) -> dict:
+        try:
+            data = json.loads(self._path(site).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            data = {}
+        return {"pages": data.get("pages") or {}, "df": data.get("df") or {}}
+
+    def observe(self, url: str, text: str) -> dict:
+        """Record `url`'s line hashes and return the site's updated index."""
+        site = site_of(url)
+        hashes = sorted({line_hash(line) for line in text.splitlines() if line.strip()})
+        path = self._path(site)
+        with file_lock(path.with_suffix(".lock")):
+            data = self._read(site)
+            pages: Dict[str, List[str]] = data["pages"]
+            df: Dict[str, int] = data["df"]
+            if pages.get(url) == hashes:
+                return data
+            for h in pages.pop(url, []):
+                if df.get(h, 0) <= 1:
+                    df.pop(h, None)
+                else:
+                    df[h] -= 1
+            pages[url] = hashes
+            for h in hashes:
+                df[h] = df.get(h, 0) + 1
+            # dicts keep insertion order, so the first keys are the least recently observed pages
+            while len(pages) > self.max_pages:
+                old_url = next(iter(pages))
+                for h in pages.pop(old_url):
+                    if df.get(h, 0) <= 1:
+                        df.pop(h, None)
+                    else:
+                        df[h] -= 1
+            _write_json_atomic(path, data)
+        return data
+
+    def boilerplate_hashes(self, data: dict) -> set:
+        total = len(data["pages"])
+        if total < self.min_pages:
+            return set()
+        cutoff = max(2, self.ratio * total)
+        return {h for h, count in data["df"].items() if count >= cutoff}
+
+    def clean(self, url: str, text: str, keep: Iterable[str] = ()) -> str:
+        """Observe `text` for `url`, then return it without the site's boilerplate lines.
+
+        Lines equal to one of `keep` (the page's headings) stay even if they repeat.
+        """
+        common = self.boilerplate_hashes(self.observe(url, text)) - {line_hash(line) for line in keep}
+        if not common:
+            return text
+        kept: list[str] = []
+        dropped_chars = 0
+        for line in text.splitlines():
+            if line.strip() and line_hash(line) in common:
+                dropped_chars += len(line) + 1
+                continue
+            kept.append(line)
+        with self._lock:
+            self.lines_stripped += len(text.splitlines()) - len(kept)
+            self.chars_stripped += dropped_chars
+        return "\n".join(kept)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"lines_stripped": self.lines_stripped, "chars_stripped": self.chars_stripped}
+
+
+_default_index: Optional[BoilerplateIndex] = None
+_default_lock = threading.Lock()
+
+
+def default_boilerplate_index() -> Optional[BoilerplateIndex]:
+    """Process-wide BoilerplateIndex configured from env, or None when BOILERPLATE=0."""
+    global _default_index
+    if (os.getenv("BOILERPLATE", "1") or "").strip().lower() in {"0", "false", "no", "off"}:
+        return None
+    with _default_lock:
+        if _default_index is None:
+            directory = (os.getenv("BOILERPLATE_DIR") or "").strip() or DEFAULT_DIR
+            _default_index = BoilerplateIndex(
+                directory,
+                ratio=float(os.getenv("BOILERPLATE_RATIO") or DEFAULT_RATIO),
+                min_pages=env_int("BOILERPLATE_MIN_PAGES", DEFAULT_MIN_PAGES),
+                max_pages=env_int("BOILERPLATE_MAX_PAGES", 500),
+            )
+        return _default_index
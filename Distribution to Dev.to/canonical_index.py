@@ -0,0 +1,144 @@
+"""Local index of canonical URLs that already have a Dev.to article.
+
+Dev.to rejects a second article with the same `canonical_url` (HTTP 422), but only after
+the banner and summary have been paid for. process_item() checks this index first and
+refuses such items immediately.
+
+The index (`state/canonical_urls.json`) is fed from three places:
+- every successful publish, and every 422 "canonical url has already been taken";
+- the runner's state store (canonicals of items already processed with publishing on);
+- a paginated listing of your own Dev.to articles (`/api/articles/me/all`), which the
+  runner syncs by default whenever DEVTO_API_KEY is set.
+
+URLs are compared after light normalization (lowercase scheme/host, no fragment, no
+trailing slash).
+
+Env:
+  - CANONICAL_INDEX (default: 1) set to 0 to disable the pre-flight check
+  - DEVTO_SYNC_CANONICALS (default: on when DEVTO_API_KEY is set) runner syncs the index from Dev.to before a publishing run
+  - DEVTO_API_URL Dev.to API base (default: https://dev.to/api), e.g. a local fake server in tests
+"""
+import json
+import os
+import pathlib
+import threading
+import time
+from typing import Iterable, Optional
+from urllib.parse import urlsplit, urlunsplit
+
+import http_client
+from state_store import _write_json_atomic, file_lock
+
+DEFAULT_PATH = pathlib.Path(__file__).parent / "state" / "canonical_urls.json"
+DEFAULT_DEVTO_API_URL = "https://dev.to/api"
+
+
+def devto_api_url() -> str:
+    return ((os.getenv("DEVTO_API_URL") or "").strip() or DEFAULT_DEVTO_API_URL).rstrip("/")
+
+
+class DuplicateCanonicalError(RuntimeError):
+    """The canonical URL already belongs to a Dev.to article; publishing would fail with 422."""
+
+    def __init__(self, canonical_url: str, entry: dict):
+        where = entry.get("devto_url") or entry.get("source") or "a previous run"
+        super().__init__(f"Canonical URL {canonical_url} is already used on Dev.to ({where}).")
+        self.canonical_url = canonical_url
+        self.entry = entry
+
+
+def normalize(url: str) -> str:
+    parts = urlsplit((url or "").strip())
+    path = parts.path.rstrip("/")
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, parts.query, ""))
+
+
+class CanonicalIndex:
+    def __init__(self, path: pathlib.Path | str = DEFAULT_PATH):
+        self.path = pathlib.Path(path)
+        self.lock_path = self.path.with_name(".canonical_urls.lock")
+        self._lock = threading.Lock()
+        self._entries: Optional[dict] = None
+        self._mtime: Optional[int] = None
+
+    def _load(self) -> dict:
+        try:
+            mtime = self.path.stat().st_mtime_ns
+        except OSError:
+            mtime = None
+        if self._entries is None or mtime != self._mtime:
+            try:
+                self._entries = json.loads(self.path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                self._entries = {}
+            self._mtime = mtime
+        return self._entries
+
+    def lookup(self, canonical_url: str) -> Optional[dict]:
+        with self._lock:
+            return self._load().get(normalize(canonical_url))
+
+    def add_many(self, entries: Iterable[tuple[str, dict]]) -> int:
+        """Record `(canonical_url, info)` pairs; returns how many were new."""
+        with self._lock, file_lock(self.lock_path):
+            self._entries = None
+            current = self._load()
+            added = 0
+            for url, info in entries:
+                key = normalize(url)
+                if not key:
+                    continue
+                if key not in current:
+                    added += 1
+                current[key] = {**current.get(key, {}), **info, "seen_at": int(time.time())}
+            _write_json_atomic(self.path, current)
+            self._mtime = self.path.stat().st_mtime_ns
+            return added
+
+    def record(self, canonical_url: str, source: str, devto_url: Optional[str] = None, article_id=None) -> None:
+        info: dict = {"source": source}
+        if devto_url:
+            info["devto_url"] = devto_url
+        if article_id is not None:
+            info["id"] = article_id
+        self.add_many([(canonical_url, info)])
+
+    def sync_from_devto(self, api_key: str, per_page: int = 1000) -> int:
+        """Add canonical URLs of all your Dev.to articles (published or not); returns how many were new."""
+        headers = {"api-key": api_key, "Accept": "application/vnd.forem.api-v1+json"}
+        found: list = []
+        page = 1
+        while True:
+            resp = http_client.get(
+                f"{devto_api_url()}/articles/me/all",
+                params={"page": page, "per_page": per_page},
+                headers=headers,
+                timeout=20,
+                service="devto",
+            )
+            if resp.status_code != 200:
+                raise RuntimeError(f"Dev.to article listing failed ({resp.status_code}): {resp.text[:200]}")
+            articles = resp.json() or []
+            for article in articles:
+                canonical = article.get("canonical_url")
+                if canonical:
+                    found.append((canonical, {"source": "devto", "devto_url": article.get("url"), "id": article.get("id")}))
+            if len(articles) < per_page:
+                break
+            page += 1
+        return self.add_many(found) if found else 0
+
+
+_default_index: Optional[CanonicalIndex] = None
+_default_lock = threading.Lock()
+
+
+def default_canonical_index() -> Optional[CanonicalIndex]:
+    """Process-wide CanonicalIndex, or None when CANONICAL_INDEX=0."""
+    global _default_index
+    if (os.getenv("CANONICAL_INDEX", "1") or "").strip().lower() in {"0", "false", "no", "off"}:
+        return None
+    with _default_lock:
+        if _default_index is None:
+            _default_index = CanonicalIndex()
+        return _default_index
@@ -0,0 +1,142 @@
+"""Per-item stage checkpoints for app.process_item().
+
+Every stage of the item pipeline persists its artifact under `outputs/<item-id>/` as soon
+as it completes:
+
+    fetch        page.json     (title, text, links, main points, source key)
+    banner       banner.json   {"banner_url": ...}
+    summarize    summary.md    raw model output
+    postprocess  article.md    final markdown sent to Dev.to
+    publish      devto.json    Dev.to API response
+    medium       medium.json   {"recipient": ..., "sent_at": ...}
+
+A retry loads whatever already exists and resumes at the first missing stage, so a
+failed publish does not regenerate the banner or the summary.
+"""
+import json
+import os
+import pathlib
+import re
+import tempfile
+from typing import Any, Optional
+from urllib.parse import urlparse
+
+from disk_cache import sha256_hex
+
+DEFAULT_ROOT = pathlib.Path(__file__).parent / "outputs"
+
+STAGES = ("fetch", "banner", "summarize", "postprocess", "publish", "medium")
+STAGE_FILES = {
+    "fetch": "page.json",
+    "banner": "banner.json",
+    "summarize": "summary.md",
+    "postprocess": "article.md",
+    "publish": "devto.json",
+    "medium": "medium.json",
+}
+# Stages whose artifacts depend on the item's options (title, tags, banner, ...).
+# When those change, these are discarded; fetched pages and publish/email records are kept.
+INPUT_DEPENDENT_STAGES = ("banner", "summarize", "postprocess")
+
+
+class StageError(RuntimeError):
+    """A pipeline stage failed; `stage` names it and the original exception is chained."""
+
+    def __init__(self, stage: str, cause: BaseException):
+        super().__init__(f"{stage} failed: {type(cause).__name__}: {cause}")
+        self.stage = stage
+        self.cause = cause
+
+
+def item_id(url: str) -> str:
+    """Stable directory name for an item: readable slug plus a short URL hash."""
+    parsed = urlparse(url or "")
+    last = (parsed.path or "").strip("/").split("/")[-1] or parsed.netloc
+    slug = re.sub(r"[^A-Za-z0-9]+", "-", last).strip("-").lower()[:60]
+    return f"{slug or 'item'}-{sha256_hex(url or '')[:8]}"
+
+
+def _write_atomic(path: pathlib.Path, text: str) -> None:
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def _read(path: pathlib.Path) -> Any:
+    try:
+        text = path.read_text(encoding="utf-8")
+    except OSError:
+        return None
+    if path.suffix == ".json":
+        try:
+            return json.loads(text)
+        except ValueError:
+            return None
+    return text
+
+
+class ItemCheckpoint:
+    def __init__(self, root: pathlib.Path | str, url: str, inputs: Optional[dict] = None):
+        self.url = url
+        self.directory = pathlib.Path(root) / item_id(url)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._check_inputs(inputs or {})
+
+    def _check_inputs(self, inputs: dict) -> None:
+        path = self.directory / "inputs.json"
+        fingerprint = {"url": self.url, **inputs}
+        try:
+            previous = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            previous = None
+        if previous != fingerprint:
+            if previous is not None:
+                for stage in INPUT_DEPENDENT_STAGES:
+                    self.clear(stage)
+            _write_atomic(path, json.dumps(fingerprint, indent=2, sort_keys=True))
+
+    def path(self, stage: str) -> pathlib.Path:
+        return self.directory / STAGE_FILES[stage]
+
+    def load(self, stage: str) -> Any:
+        return _read(self.path(stage))
+
+    def save(self, stage: str, value: Any) -> None:
+        path = self.path(stage)
+        text = value if path.suffix != ".json" else json.dumps(value, indent=2, ensure_ascii=False)
+        _write_atomic(path, text)
+
+    def clear(self, stage: str) -> None:
+        try:
+            self.path(stage).unlink()
+        except OSError:
+            pass
+
+    def first_incomplete(self) -> Optional[str]:
+        for stage in STAGES:
+            if not self.path(stage).exists():
+                return stage
+        return None
+
+
+def load_stage(root: pathlib.Path | str, url: str, stage: str) -> Any:
+    """Read one stage's artifact for `url` without opening (or creating) its checkpoint."""
+    return _read(pathlib.Path(root) / item_id(url) / STAGE_FILES[stage])
+
+
+def clear_stages(root: pathlib.Path | str, url: str, stages) -> None:
+    """Drop the given stages' artifacts for `url` without touching its inputs fingerprint."""
+    directory = pathlib.Path(root) / item_id(url)
+    for stage in stages:
+        try:
+            (directory / STAGE_FILES[stage]).unlink()
+        except OSError:
+            pass
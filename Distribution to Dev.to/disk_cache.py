@@ -0,0 +1,149 @@
+"""Small file-backed key/value cache shared by the pipeline's caches.
+
+Each entry is one file named by the SHA-256 of its key. Writes are atomic (temp file +
+rename) so concurrent processes never see half-written entries. Reads bump the file's
+mtime, which gives least-recently-used eviction once the directory exceeds `max_bytes`.
+"""
+import hashlib
+import json
+import os
+import pathlib
+import tempfile
+import threading
+from typing import Any, Optional
+
+
+def sha256_hex(data: bytes | str) -> str:
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+class DiskCache:
+    """Key/value store on disk with size-bounded LRU eviction and hit/miss counters."""
+
+    def __init__(self, directory: pathlib.Path | str, max_bytes: int = 200 * 1024 * 1024):
+        self.directory = pathlib.Path(directory)
+        self.max_bytes = max(0, int(max_bytes))
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._total_bytes: Optional[int] = None
+
+    def _path(self, key: str) -> pathlib.Path:
+        return self.directory / f"{sha256_hex(key)}.bin"
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+        return data
+
+    def set(self, key: str, value: bytes) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        try:
+            old_size = path.stat().st_size
+        except OSError:
+            old_size = 0
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(value)
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+        with self._lock:
+            if self._total_bytes is not None:
+                self._total_bytes += len(value) - old_size
+        self._evict_if_needed(keep=path)
+
+    def delete(self, key: str) -> None:
+        path = self._path(key)
+        try:
+            size = path.stat().st_size
+            path.unlink()
+        except OSError:
+            return
+        with self._lock:
+            if self._total_bytes is not None:
+                self._total_bytes -= size
+
+    def get_json(self, key: str) -> Any:
+        data = self.get(key)
+        if data is None:
+            return None
+        try:
+            return json.loads(data.decode("utf-8"))
+        except ValueError:
+            self.delete(key)
+            return None
+
+    def set_json(self, key: str, value: Any) -> None:
+        self.set(key, json.dumps(value, ensure_ascii=False).encode("utf-8"))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "bytes": self._total_bytes,
+            }
+
+    def _entries(self) -> list[tuple[float, int, pathlib.Path]]:
+        entries = []
+        try:
+            paths = list(self.directory.glob("*.bin"))
+        except OSError:
+            return entries
+        for path in paths:
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def _evict_if_needed(self, keep: Optional[pathlib.Path] = None) -> None:
+        if not self.max_bytes:
+            return
+        with self._lock:
+            if self._total_bytes is not None and self._total_bytes <= self.max_bytes:
+                return
+            entries = self._entries()
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries, key=lambda e: e[0]):
+                if total <= self.max_bytes:
+                    break
+                if path == keep:
+                    continue
+                try:
+                    path.unlink()
+                except OSError:
+                    continue
+                total -= size
+                self.evictions += 1
+            self._total_bytes = total
+
+
+def env_int(name: str, default: int) -> int:
+    try:
+        return int(float(os.getenv(name) or default))
+    except ValueError:
+        return default
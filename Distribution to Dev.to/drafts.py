@@ -0,0 +1,76 @@
+"""Persistent store of generated drafts (web UI and `app.py --draft`).
+
+A draft is identified by `draft_id(source_url, content_hash, settings)`. `content_hash`
+hashes the fetched page, and `settings` holds whatever else changes the output (e.g.
+the banner base URL). Generating a draft for an unchanged page returns the stored one
+without any banner or LLM call. Publishing only needs the id, not the whole article.
+
+Entries live in a DiskCache, so the store is bounded in size and evicts
+least-recently-used drafts first.
+
+Env:
+  - DRAFTS (default: 1) set to 0 to disable the store
+  - DRAFTS_DIR draft location (default: cache/drafts next to app.py)
+  - DRAFTS_MAX_MB size bound (default: 20)
+"""
+import json
+import os
+import pathlib
+import re
+import threading
+import time
+from typing import Optional
+
+from disk_cache import DiskCache, env_int, sha256_hex
+
+DEFAULT_DIR = pathlib.Path(__file__).parent / "cache" / "drafts"
+_ID_RE = re.compile(r"^[0-9a-f]{16}$")
+
+
+def content_hash(*parts: str) -> str:
+    return sha256_hex(json.dumps(parts, ensure_ascii=False))
+
+
+def draft_id(source_url: str, content: str, settings: Optional[dict] = None) -> str:
+    return sha256_hex(json.dumps([source_url, content, settings or {}], sort_keys=True))[:16]
+
+
+class DraftStore:
+    def __init__(self, directory: pathlib.Path | str, max_bytes: int = 20 * 1024 * 1024):
+        self.store = DiskCache(directory, max_bytes=max_bytes)
+
+    def get(self, draft_id: str) -> Optional[dict]:
+        if not _ID_RE.match(draft_id or ""):
+            return None
+        return self.store.get_json(f"draft:{draft_id}")
+
+    def put(self, draft_id: str, draft: dict) -> dict:
+        """Store `draft` under `draft_id`, replacing an earlier draft with the same id."""
+        entry = {**draft, "id": draft_id, "created_at": draft.get("created_at") or int(time.time())}
+        self.store.set_json(f"draft:{draft_id}", entry)
+        return entry
+
+    def mark_published(self, draft_id: str, devto: dict) -> None:
+        draft = self.get(draft_id)
+        if draft is not None:
+            draft["published"] = {"url": devto.get("url"), "id": devto.get("id"), "at": int(time.time())}
+            self.store.set_json(f"draft:{draft_id}", draft)
+
+    def stats(self) -> dict:
+        return self.store.stats()
+
+
+_default_store: Optional[DraftStore] = None
+_default_lock = threading.Lock()
+
+
+def default_draft_store() -> Optional[DraftStore]:
+    """Process-wide DraftStore configured from env, or None when DRAFTS=0."""
+    global _default_store
+    if (os.getenv("DRAFTS", "1") or "").strip().lower() in {"0", "false", "no", "off"}:
+        return None
+    with _default_lock:
+        if _default_store is None:
+            directory = (os.getenv("DRAFTS_DIR") or "").strip() or DEFAULT_DIR
+            _default_store = DraftStore(directory, max_bytes=env_int("DRAFTS_MAX_MB", 20) * 1024 * 1024)
+        return _default_store
@@ -0,0 +1,246 @@
+"""GitHub helpers for banner hosting: cached auth/branch probing and single-commit batches.
+
+The Contents API (app._github_upload_banner) makes one commit per file and used to probe
+up to 2 branch modes x 2 auth schemes for every banner. The mode that worked is now
+remembered per repo (`preferred_modes()` / `remember_mode()`), so later uploads go
+straight to it.
+
+For batch runs, `deferred_uploads()` makes banner uploads queue their files instead of
+committing. Each queued banner gets its final raw URL straight away
+(`<GITHUB_RAW_URL>/<repo>/<branch>/<path>`). `flush()` then writes every queued file in one
+commit through the Git Data API: blobs -> tree -> commit -> ref update. The ref update is
+retried on top of the new head if another commit landed in between. Callbacks registered
+with `when_committed()` (the banner manifest) run once the ref update has succeeded. Blob bodies are
+base64-encoded from disk in chunks (b64_stream.py), never as one in-memory copy.
+
+Env (besides GITHUB_TOKEN / GITHUB_REPO / GITHUB_BRANCH):
+  - GITHUB_API_URL API base (default: https://api.github.com), e.g. a local fake server in tests
+  - GITHUB_RAW_URL raw content base (default: https://raw.githubusercontent.com)
+"""
+import contextlib
+import os
+import pathlib
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+import b64_stream
+import http_client
+
+DEFAULT_API_URL = "https://api.github.com"
+DEFAULT_RAW_URL = "https://raw.githubusercontent.com"
+AUTH_SCHEMES = ("Bearer", "token")
+
+_lock = threading.RLock()
+# (api_url, repo) -> {"scheme": ..., "include_branch": ..., "branch": ...}
+_modes: Dict[Tuple[str, str], dict] = {}
+_pending: Dict[str, pathlib.Path] = {}
+# deferred raw URL -> callbacks taking the committed raw URL
+_on_commit: Dict[str, List[Callable[[str], None]]] = {}
+_deferred_urls: Dict[str, str] = {}
+_deferring = False
+
+
+def api_url() -> str:
+    return ((os.getenv("GITHUB_API_URL") or "").strip() or DEFAULT_API_URL).rstrip("/")
+
+
+def raw_url() -> str:
+    return ((os.getenv("GITHUB_RAW_URL") or "").strip() or DEFAULT_RAW_URL).rstrip("/")
+
+
+def _config() -> Tuple[str, str, str]:
+    token = (os.getenv("GITHUB_TOKEN") or "").strip()
+    repo = (os.getenv("GITHUB_REPO") or "").strip()
+    branch = (os.getenv("GITHUB_BRANCH") or "main").strip() or "main"
+    if not token:
+        raise RuntimeError("GITHUB_TOKEN missing (needed to upload banner when BANNER_BASE_URL is not set)")
+    if not repo or "/" not in repo:
+        raise RuntimeError('GITHUB_REPO missing/invalid (expected "owner/repo")')
+    return token, repo, branch
+
+
+def _mode(repo: str) -> dict:
+    with _lock:
+        return _modes.setdefault((api_url(), repo), {})
+
+
+def preferred_modes(repo: str) -> List[Tuple[bool, str]]:
+    """`(include_branch, scheme)` attempts for the Contents API, last known-good first."""
+    attempts = [(include_branch, scheme) for include_branch in (True, False) for scheme in AUTH_SCHEMES]
+    known = _mode(repo)
+    if "scheme" in known and "include_branch" in known:
+        best = (known["include_branch"], known["scheme"])
+        attempts.remove(best)
+        attempts.insert(0, best)
+    return attempts
+
+
+def remember_mode(repo: str, scheme: str, include_branch: Optional[bool] = None) -> None:
+    with _lock:
+        mode = _mode(repo)
+        mode["scheme"] = scheme
+        if include_branch is not None:
+            mode["include_branch"] = include_branch
+
+
+def _headers(token: str, scheme: str) -> dict:
+    return {
+        "Authorization": f"{scheme} {token}",
+        "Accept": "application/vnd.github+json",
+        "X-GitHub-Api-Version": "2022-11-28",
+    }
+
+
+def _call(method: str, path: str, token: str, repo: str, headers: Optional[dict] = None, **kwargs):
+    """Call the repo API with the remembered auth scheme, probing the other one on 401.
+
+    A file-like `data` body is rewound before every attempt.
+    """
+    known = _mode(repo).get("scheme")
+    schemes = [known] + [s for s in AUTH_SCHEMES if s != known] if known else list(AUTH_SCHEMES)
+    resp = None
+    for scheme in schemes:
+        if hasattr(kwargs.get("data"), "seek"):
+            kwargs["data"].seek(0)
+        resp = http_client.request(
+            method,
+            f"{api_url()}/repos/{repo}{path}",
+            headers={**_headers(token, scheme), **(headers or {})},
+            timeout=30,
+            service="github",
+            **kwargs,
+        )
+        if resp.status_code != 401:
+            remember_mode(repo, scheme)
+            return resp
+    return resp
+
+
+def resolve_branch(token: str, repo: str, branch: str) -> Tuple[str, str]:
+    """Return `(branch, head_sha)`, falling back to the repo's default branch if `branch` is missing."""
+    cached = _mode(repo).get("branch")
+    target = cached or branch
+    resp = _call("GET", f"/git/ref/heads/{quote(target, safe='')}", token, repo)
+    if resp.status_code == 404 and not cached:
+        info = _call("GET", "", token, repo)
+        if info.status_code != 200:
+            raise RuntimeError(f"GitHub repo lookup failed ({info.status_code}): {info.text}")
+        target = (info.json() or {}).get("default_branch") or branch
+        resp = _call("GET", f"/git/ref/heads/{quote(target, safe='')}", token, repo)
+    if resp.status_code != 200:
+        raise RuntimeError(f"GitHub branch lookup failed ({resp.status_code}): {resp.text}")
+    with _lock:
+        _mode(repo)["branch"] = target
+    return target, resp.json()["object"]["sha"]
+
+
+def raw_file_url(repo: str, branch: str, path: str) -> str:
+    return f"{raw_url()}/{repo}/{quote(branch, safe='')}/{quote(path, safe='/')}"
+
+
+# -- deferred single-commit batches ----------------------------------------------------
+
+
+@contextlib.contextmanager
+def deferred_uploads():
+    """While active, banner uploads are queued for one flush() commit instead of committed."""
+    global _deferring
+    with _lock:
+        previous, _deferring = _deferring, True
+    try:
+        yield
+    finally:
+        with _lock:
+            _deferring = previous
+
+
+def deferring() -> bool:
+    with _lock:
+        return _deferring
+
+
+def defer(path: str, source: pathlib.Path) -> str:
+    """Queue the file `source` for `path` and return the raw URL it will have after flush()."""
+    token, repo, branch = _config()
+    cached = _mode(repo).get("branch")
+    if cached is None:
+        cached, _ = resolve_branch(token, repo, branch)
+    url = raw_file_url(repo, cached, path)
+    with _lock:
+        _pending[path] = source
+        _deferred_urls[path] = url
+    return url
+
+
+def when_committed(url: str, callback: Callable[[str], None]) -> None:
+    """Call `callback(committed_url)` once the file deferred under `url` is committed by flush()."""
+    with _lock:
+        _on_commit.setdefault(url, []).append(callback)
+
+
+def pending_paths() -> List[str]:
+    with _lock:
+        return list(_pending)
+
+
+def flush(message: Optional[str] = None, attempts: int = 3) -> Dict[str, str]:
+    """Commit every queued file in a single commit; returns `{path: raw_url}`."""
+    with _lock:
+        files = dict(_pending)
+    if not files:
+        return {}
+    token, repo, branch = _config()
+
+    blobs: Dict[str, str] = {}
+    for path, source in files.items():
+        with b64_stream.json_body({"encoding": "base64"}, "content", source) as body:
+            resp = _call("POST", "/git/blobs", token, repo, headers={"Content-Type": "application/json"}, data=body)
+        if resp.status_code not in (200, 201):
+            raise RuntimeError(f"GitHub blob upload failed ({resp.status_code}): {resp.text}")
+        blobs[path] = resp.json()["sha"]
+
+    message = message or f"Add {len(files)} banner(s)"
+    last_error = ""
+    for _ in range(max(1, attempts)):
+        target, head = resolve_branch(token, repo, branch)
+        commit = _call("GET", f"/git/commits/{head}", token, repo)
+        if commit.status_code != 200:
+            raise RuntimeError(f"GitHub commit lookup failed ({commit.status_code}): {commit.text}")
+        tree = _call(
+            "POST",
+            "/git/trees",
+            token,
+            repo,
+            json={
+                "base_tree": commit.json()["tree"]["sha"],
+                "tree": [{"path": p, "mode": "100644", "type": "blob", "sha": sha} for p, sha in blobs.items()],
+            },
+        )
+        if tree.status_code not in (200, 201):
+            raise RuntimeError(f"GitHub tree creation failed ({tree.status_code}): {tree.text}")
+        new_commit = _call(
+            "POST", "/git/commits", token, repo, json={"message": message, "tree": tree.json()["sha"], "parents": [head]}
+        )
+        if new_commit.status_code not in (200, 201):
+            raise RuntimeError(f"GitHub commit creation failed ({new_commit.status_code}): {new_commit.text}")
+        ref = _call(
+            "PATCH", f"/git/refs/heads/{quote(target, safe='')}", token, repo, json={"sha": new_commit.json()["sha"], "force": False}
+        )
+        if ref.status_code == 200:
+            committed = {path: raw_file_url(repo, target, path) for path in files}
+            callbacks = []
+            with _lock:
+                for path in files:
+                    if _pending.get(path) is files[path]:
+                        del _pending[path]
+                    for callback in _on_commit.pop(_deferred_urls.pop(path, ""), []):
+                        callbacks.append((callback, committed[path]))
+            for callback, url in callbacks:
+                callback(url)
+            return committed
+        # 422: the branch moved (not a fast-forward); rebuild on the new head.
+        last_error = f"({ref.status_code}): {ref.text}"
+        if ref.status_code != 422:
+            break
+    raise RuntimeError(f"GitHub ref update failed {last_error}")
@@ -0,0 +1,188 @@
+"""Single-pass HTML extraction for fetch_page().
+
+`extract_page()` streams the document through the stdlib event-based `HTMLParser` once
+and collects everything fetch_page() needs along the way: the `<title>`, readable text
+(script/style/noscript/svg dropped), deduped absolute links, main points from h1-h3
+headings and list items, and the headings themselves. No tree is built, and dedup uses sets instead of list scans.
+"""
+from html.parser import HTMLParser
+from typing import List, Optional, Tuple
+from urllib.parse import urljoin
+
+SKIP_TAGS = frozenset({"script", "style", "noscript", "svg"})
+HEADING_TAGS = frozenset({"h1", "h2", "h3"})
+LIST_TAGS = frozenset({"ul", "ol"})
+MAX_POINTS = 8
+# List items kept while streaming; only the first few ever become points.
+MAX_LIST_ITEMS = 200
+DEFAULT_MAX_BYTES = 5 * 1024 * 1024
+
+
+class _Capture:
+    __slots__ = ("tag", "kind", "parts", "href", "slot")
+
+    def __init__(self, tag: str, kind: str, slot: int = -1, href: Optional[str] = None):
+        self.tag = tag
+        self.kind = kind
+        self.parts: list[str] = []
+        self.href = href
+        # Index reserved in the output list at the start tag, keeping document order for nested elements.
+        self.slot = slot
+
+
+class _PageExtractor(HTMLParser):
+    def __init__(self, base_url: str):
+        super().__init__(convert_charrefs=True)
+        self.base_url = base_url
+        self.title: Optional[str] = None
+        self.lines: list[str] = []
+        self.links: list[Optional[Tuple[str, str]]] = []
+        self.headings: list[Optional[str]] = []
+        self.list_items: list[Optional[str]] = []
+        self._seen_urls: set[str] = set()
+        self._skip_depth = 0
+        self._captures: list[_Capture] = []
+        # len(self._captures) when each open <ul>/<ol> started, innermost last.
+        self._lists: list[int] = []
+
+    def handle_starttag(self, tag: str, attrs) -> None:
+        if tag in SKIP_TAGS:
+            self._skip_depth += 1
+            return
+        if self._skip_depth:
+            return
+        if tag in LIST_TAGS:
+            self._lists.append(len(self._captures))
+        elif tag == "li":
+            # `</li>` is optional: a new item ends the previous one of the same list.
+            base = self._lists[-1] if self._lists else 0
+            for i in range(len(self._captures) - 1, base - 1, -1):
+                if self._captures[i].tag == "li":
+                    self._close_from(i)
+                    break
+        if tag == "title" and self.title is None:
+            self._captures.append(_Capture(tag, "title"))
+        elif tag in HEADING_TAGS:
+            self._captures.append(_Capture(tag, "heading", self._reserve(self.headings)))
+        elif tag == "li" and len(self.list_items) < MAX_LIST_ITEMS:
+            self._captures.append(_Capture(tag, "li", self._reserve(self.list_items)))
+        elif tag == "a":
+            href = next((v for k, v in attrs if k == "href"), None)
+            if href is not None:
+                abs_url = urljoin(self.base_url, href)
+                if abs_url not in self._seen_urls:
+                    self._seen_urls.add(abs_url)
+                    self._captures.append(_Capture(tag, "link", self._reserve(self.links), href=abs_url))
+
+    @staticmethod
+    def _reserve(out: list) -> int:
+        out.append(None)
+        return len(out) - 1
+
+    def handle_startendtag(self, tag: str, attrs) -> None:
+        if tag == "a" and not self._skip_depth:
+            # Self-closing anchor: record it with no text.
+            self.handle_starttag(tag, attrs)
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in SKIP_TAGS:
+            if self._skip_depth:
+                self._skip_depth -= 1
+            return
+        if self._skip_depth:
+            return
+        if tag in LIST_TAGS:
+            # Closing the list also ends items (and anything in them) left unclosed.
+            if self._lists:
+                self._close_from(self._lists.pop())
+            return
+        for i in range(len(self._captures) - 1, -1, -1):
+            if self._captures[i].tag == tag:
+                self._close_from(i)
+                break
+
+    def _close_from(self, index: int) -> None:
+        """Finish the captures from `index` up, innermost first."""
+        for capture in reversed(self._captures[index:]):
+            self._finish(capture)
+        del self._captures[index:]
+        self._lists = [min(base, index) for base in self._lists]
+
+    def handle_data(self, data: str) -> None:
+        if self._skip_depth:
+            return
+        for capture in self._captures:
+            capture.parts.append(data)
+        for line in data.splitlines():
+            line = line.strip()
+            if line:
+                self.lines.append(line)
+
+    def _finish(self, capture: _Capture) -> None:
+        if capture.kind == "title":
+            self.title = "".join(capture.parts).strip()
+        elif capture.kind == "heading":
+            self.headings[capture.slot] = "".join(capture.parts)
+        elif capture.kind == "li":
+            self.list_items[capture.slot] = "".join(capture.parts)
+        elif capture.kind == "link":
+            text = "".join(part.strip() for part in capture.parts)
+            self.links[capture.slot] = ((text or capture.href)[:200], capture.href)
+
+    def close(self) -> None:
+        super().close()
+        for capture in reversed(self._captures):
+            self._finish(capture)
+        self._captures.clear()
+
+
+def _main_points(headings: List[str], list_items: List[str], text: str) -> List[str]:
+    points: list[str] = []
+    seen: set[str] = set()
+
+    def _add_point(s: str) -> None:
+        clean = " ".join((s or "").split())
+        if not clean:
+            return
+        # Keep points concise
+        if len(clean) > 240:
+            clean = clean[:237].rstrip() + "…"
+        if clean not in seen:
+            seen.add(clean)
+            points.append(clean)
+
+    for heading in headings:
+        _add_point(heading)
+    # Pull a few prominent list items (limit to first 8)
+    for item in list_items:
+        _add_point(item)
+        if len(points) >= MAX_POINTS:
+            break
+
+    # If no headings/lists found, fall back to first sentences from the article
+    if not points:
+        words = text.split()
+        if words:
+            _add_point(" ".join(words[:60]))
+    return points
+
+
+def extract_page(
+    url: str, html: str, max_bytes: int = DEFAULT_MAX_BYTES
+) -> Tuple[str, str, List[Tuple[str, str]], List[str], List[str]]:
+    """Return `(title, text, links, points, headings)` for `html` in one streaming pass.
+
+    Input beyond the first `max_bytes` bytes (UTF-8) is ignored so oversized pages cannot
+    blow up CPU or memory; the summarizer only reads the head of the text anyway.
+    """
+    # A character is at most 4 bytes in UTF-8, so shorter pages need no encoding pass.
+    if max_bytes and len(html) * 4 > max_bytes:
+        html = html.encode("utf-8")[:max_bytes].decode("utf-8", "ignore")
+    parser = _PageExtractor(url)
+    parser.feed(html)
+    parser.close()
+    text = "\n".join(parser.lines)
+    title = parser.title or "Untitled"
+    points = _main_points(parser.headings, parser.list_items, text)
+    return title, text, parser.links, points, [h for h in parser.headings if h]
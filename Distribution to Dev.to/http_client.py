@@ -0,0 +1,137 @@
+"""Shared pooled HTTP session for every outbound call made by the pipeline.
+
+One `requests.Session` is shared process-wide (and across batch worker threads), so
+calls to the same host reuse keep-alive connections instead of paying a new TCP+TLS
+handshake each time. Known API hosts get their own connection pool size.
+
+Failed calls are retried with exponential, jittered backoff that honours `Retry-After`:
+- idempotent methods (GET/PUT/...) on connection/read errors and 429/500/502/503/504
+- POST only on connection errors and 429/503, where the server did not process the request
+
+Env:
+  - HTTP_RETRIES total retries per request (default: 3)
+  - HTTP_BACKOFF backoff factor in seconds (default: 0.5)
+  - HTTP_POOL_MAXSIZE default connections kept per host (default: 10)
+
+Calls to the rate-limited APIs pass `service=`. They use a second pooled session, are
+paced by ratelimit.py, and leave their 429 handling to it.
+
+requests itself is only imported with the first call (http_session.py), so importing
+this module costs nothing at startup.
+"""
+from __future__ import annotations
+
+import os
+import pathlib
+import threading
+from collections import Counter
+from typing import TYPE_CHECKING, Dict, Optional
+
+import ratelimit
+
+if TYPE_CHECKING:
+    import requests
+
+DEFAULT_TIMEOUT = 30
+DOWNLOAD_CHUNK_BYTES = 64 * 1024
+
+# Per-host pool sizes (max keep-alive connections held per host).
+HOST_POOL_SIZES = {
+    "https://api.openai.com": 8,
+    "https://openrouter.ai": 4,
+    "https://dev.to": 4,
+    "https://api.github.com": 4,
+}
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "PUT", "DELETE", "OPTIONS", "TRACE"})
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+POST_RETRY_STATUSES = frozenset({429, 503})
+
+_stats: Counter = Counter()
+_stats_lock = threading.Lock()
+
+
+def _bump(name: str, n: int = 1) -> None:
+    with _stats_lock:
+        _stats[name] += n
+
+
+_sessions: Dict[bool, requests.Session] = {}
+_session_lock = threading.Lock()
+
+
+def get_session(scheduled: bool = False) -> requests.Session:
+    """Return the process-wide pooled session, creating it on first use.
+
+    The `scheduled` one serves rate-limited API calls and hands their 429s to ratelimit.py.
+    """
+    with _session_lock:
+        session = _sessions.get(scheduled)
+        if session is None:
+            from http_session import build_session  # imports requests; deferred until the first call
+
+            session = _sessions[scheduled] = build_session(scheduled)
+        return session
+
+
+def request(method: str, url: str, service: Optional[str] = None, **kwargs) -> requests.Response:
+    """Send one request; with `service` (devto, openai, openrouter, github) it is paced by ratelimit.py."""
+    kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+    if service is None:
+        return get_session().request(method, url, **kwargs)
+
+    def _send() -> requests.Response:
+        # A throttled call is sent again; rewind a file body first.
+        if hasattr(kwargs.get("data"), "seek"):
+            kwargs["data"].seek(0)
+        return get_session(scheduled=True).request(method, url, **kwargs)
+
+    return ratelimit.send(service, _send)
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    return request("GET", url, **kwargs)
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    return request("POST", url, **kwargs)
+
+
+def put(url: str, **kwargs) -> requests.Response:
+    return request("PUT", url, **kwargs)
+
+
+def download(url: str, dest: pathlib.Path, chunk_size: int = DOWNLOAD_CHUNK_BYTES, **kwargs) -> int:
+    """Stream the body of GET `url` into `dest` chunk by chunk; returns bytes written.
+
+    Raises `requests.HTTPError` on an error status. `dest` only appears once complete.
+    """
+    kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+    tmp = dest.with_name(f".{dest.name}.part")
+    written = 0
+    try:
+        with get_session().get(url, stream=True, **kwargs) as resp:
+            resp.raise_for_status()
+            with open(tmp, "wb") as f:
+                for chunk in resp.iter_content(chunk_size):
+                    f.write(chunk)
+                    written += len(chunk)
+        os.replace(tmp, dest)
+    except Exception:
+        tmp.unlink(missing_ok=True)
+        raise
+    return written
+
+
+def connection_stats() -> dict:
+    """Counters for connection reuse: requests sent, new connections opened, reused, retries."""
+    with _stats_lock:
+        sent = _stats["requests"]
+        new_connections = _stats["new_connections"]
+        retries = _stats["retries"]
+    return {
+        "requests": sent,
+        "new_connections": new_connections,
+        "reused": max(0, sent - new_connections),
+        "retries": retries,
+    }
@@ -0,0 +1,96 @@
+"""The pooled `requests.Session` behind http_client, built on first use.
+
+Kept apart from http_client so importing the pipeline does not import requests and
+urllib3; http_client.get_session() imports this module when the first call goes out.
+"""
+import os
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+from disk_cache import env_int
+from http_client import HOST_POOL_SIZES, IDEMPOTENT_METHODS, POST_RETRY_STATUSES, RETRY_STATUSES, _bump
+
+
+class _CountingHTTPConnectionPool(HTTPConnectionPool):
+    def _new_conn(self):
+        _bump("new_connections")
+        return super()._new_conn()
+
+    def _make_request(self, *args, **kwargs):
+        _bump("requests")
+        return super()._make_request(*args, **kwargs)
+
+
+class _CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    def _new_conn(self):
+        _bump("new_connections")
+        return super()._new_conn()
+
+    def _make_request(self, *args, **kwargs):
+        _bump("requests")
+        return super()._make_request(*args, **kwargs)
+
+
+class PipelineRetry(Retry):
+    """Retry policy that never replays a POST the server may already have processed."""
+
+    def is_retry(self, method: str, status_code: int, has_retry_after: bool = False) -> bool:
+        if method and method.upper() not in IDEMPOTENT_METHODS and status_code not in POST_RETRY_STATUSES:
+            return False
+        return super().is_retry(method, status_code, has_retry_after)
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        if error is not None and self._is_read_error(error) and (method or "").upper() not in IDEMPOTENT_METHODS:
+            # The request reached the server; replaying a POST could publish twice.
+            # Base increment() on a copy with read retries off re-raises the original error.
+            return super(PipelineRetry, self.new(read=False)).increment(method, url, response, error, _pool, _stacktrace)
+        new_retry = super().increment(method, url, response, error, _pool, _stacktrace)
+        _bump("retries")
+        return new_retry
+
+
+class ScheduledRetry(PipelineRetry):
+    """PipelineRetry that returns 429s to the caller, so ratelimit.py can pause the whole service."""
+
+    def is_retry(self, method: str, status_code: int, has_retry_after: bool = False) -> bool:
+        return status_code != 429 and super().is_retry(method, status_code, has_retry_after)
+
+
+def _make_retry(retry_class: type = PipelineRetry) -> Retry:
+    kwargs = dict(
+        total=env_int("HTTP_RETRIES", 3),
+        backoff_factor=float(os.getenv("HTTP_BACKOFF") or 0.5),
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=IDEMPOTENT_METHODS | {"POST"},
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    try:
+        return retry_class(backoff_jitter=0.5, **kwargs)
+    except TypeError:  # urllib3 < 2 has no backoff_jitter
+        return retry_class(**kwargs)
+
+
+class _PooledAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _CountingHTTPConnectionPool,
+            "https": _CountingHTTPSConnectionPool,
+        }
+
+
+def build_session(scheduled: bool = False) -> requests.Session:
+    """A pooled session; `scheduled` sessions leave 429 handling to ratelimit.py."""
+    retry_class = ScheduledRetry if scheduled else PipelineRetry
+    session = requests.Session()
+    default_size = env_int("HTTP_POOL_MAXSIZE", 10)
+    default_adapter = _PooledAdapter(pool_connections=16, pool_maxsize=default_size, max_retries=_make_retry(retry_class))
+    session.mount("https://", default_adapter)
+    session.mount("http://", default_adapter)
+    for prefix, size in HOST_POOL_SIZES.items():
+        session.mount(prefix, _PooledAdapter(pool_connections=1, pool_maxsize=size, max_retries=_make_retry(retry_class)))
+    return session
@@ -0,0 +1,161 @@
+"""Background jobs for the web UI: a bounded queue, a fixed worker pool and per-job event logs.
+
+`JobQueue.submit()` returns a Job at once; one of `workers` threads runs it later. A full
+queue raises `QueueFullError` instead of piling up work. The job function gets the Job
+and reports progress through `job.emit(event, data)`. Each job keeps an ordered event
+log, so an SSE stream (web.py `/jobs/<id>/events`) can replay it from any point
+(`Last-Event-ID`) and then wait for new events. Finished jobs are forgotten after `ttl`
+seconds.
+
+Env:
+  - WEB_JOB_WORKERS jobs running at once (default: 2)
+  - WEB_JOB_QUEUE jobs waiting beyond those (default: 16)
+  - WEB_JOB_TTL seconds a finished job stays readable (default: 3600)
+"""
+import queue
+import threading
+import time
+import traceback
+import uuid
+from typing import Callable, List, Optional, Tuple
+
+from disk_cache import env_int
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "error"
+
+
+class QueueFullError(RuntimeError):
+    """Raised by submit() when the queue already holds its maximum of waiting jobs."""
+
+
+class Job:
+    def __init__(self, fn: Callable[["Job"], dict], meta: Optional[dict] = None):
+        self.id = uuid.uuid4().hex[:16]
+        self.fn = fn
+        self.meta = dict(meta or {})
+        self.state = QUEUED
+        self.result: Optional[dict] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self._events: List[Tuple[str, dict]] = []
+        self._cond = threading.Condition()
+
+    def emit(self, event: str, data: Optional[dict] = None) -> None:
+        with self._cond:
+            self._events.append((event, dict(data or {})))
+            self._cond.notify_all()
+
+    def events_since(self, index: int, timeout: float) -> List[Tuple[int, str, dict]]:
+        """Events after position `index` as `(id, event, data)`, waiting up to `timeout` for one.
+
+        Returns at once for a finished job: an empty list then means the stream is over.
+        """
+        with self._cond:
+            if index >= len(self._events) and not self.finished:
+                self._cond.wait(timeout)
+            return [(i + 1, event, data) for i, (event, data) in enumerate(self._events[index:], start=index)]
+
+    @property
+    def finished(self) -> bool:
+        return self.state in (DONE, FAILED)
+
+    def status(self) -> dict:
+        return {
+            "id": self.id,
+            "state": self.state,
+            "meta": self.meta,
+            "result": self.result,
+            "error": self.error,
+            "events": len(self._events),
+        }
+
+    def run(self) -> None:
+        self.state = RUNNING
+        self.emit("state", {"state": RUNNING})
+        # The final state and its event change together (under the condition's RLock), so
+        # a reader that sees a finished job has its last event too.
+        try:
+            result = self.fn(self) or {}
+            with self._cond:
+                self.result = result
+                self.state = DONE
+                self.emit("done", self.result)
+        except Exception as exc:
+            traceback.print_exc()
+            with self._cond:
+                self.error = f"{type(exc).__name__}: {exc}"
+                self.state = FAILED
+                self.emit("error", {"error": self.error})
+        finally:
+            self.finished_at = time.time()
+            with self._cond:
+                self._cond.notify_all()
+
+
+class JobQueue:
+    def __init__(self, workers: int = 2, max_pending: int = 16, ttl: float = 3600):
+        self.workers = max(1, workers)
+        self.ttl = ttl
+        self._queue: "queue.Queue[Job]" = queue.Queue(maxsize=max(1, max_pending))
+        self._jobs: dict = {}
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+
+    def _start(self) -> None:
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._work, name=f"job-{len(self._threads)}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _work(self) -> None:
+        while True:
+            job = self._queue.get()
+            try:
+                job.run()
+            finally:
+                self._queue.task_done()
+
+    def _prune(self) -> None:
+        cutoff = time.time() - self.ttl
+        for job_id in [j.id for j in self._jobs.values() if j.finished and (j.finished_at or 0) < cutoff]:
+            del self._jobs[job_id]
+
+    def submit(self, fn: Callable[[Job], dict], **meta) -> Job:
+        """Queue `fn(job)`; raises QueueFullError when the queue is full."""
+        job = Job(fn, meta)
+        with self._lock:
+            self._prune()
+            self._start()
+            if self._queue.full():
+                raise QueueFullError(f"Too many jobs waiting ({self._queue.maxsize}); try again shortly.")
+            job.emit("state", {"state": QUEUED, "position": self._queue.qsize() + 1})
+            self._jobs[job.id] = job
+            self._queue.put_nowait(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            states = [j.state for j in self._jobs.values()]
+        return {"workers": self.workers, "waiting": self._queue.qsize(), **{s: states.count(s) for s in (QUEUED, RUNNING, DONE, FAILED)}}
+
+
+_default_queue: Optional[JobQueue] = None
+_default_lock = threading.Lock()
+
+
+def default_job_queue() -> JobQueue:
+    """Process-wide JobQueue configured from env."""
+    global _default_queue
+    with _default_lock:
+        if _default_queue is None:
+            _default_queue = JobQueue(
+                workers=env_int("WEB_JOB_WORKERS", 2),
+                max_pending=env_int("WEB_JOB_QUEUE", 16),
+                ttl=env_int("WEB_JOB_TTL", 3600),
+            )
+        return _default_queue
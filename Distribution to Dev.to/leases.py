@@ -0,0 +1,82 @@
+"""Expiring per-URL leases so several runners can share one state directory.
+
+Before a runner processes a URL it claims a lease in `state/leases.json`. A lease held by
+another owner blocks the claim until it expires (`LEASE_TTL` seconds), so a crashed
+runner's items become claimable again instead of being stuck. The file is read and
+rewritten under an exclusive `flock` on `state/.leases.lock`.
+
+`shard_of()` gives each URL a stable shard so `--shard i/N` runners split the queue
+without talking to each other; leases then only arbitrate overlaps (e.g. a runner started
+without `--shard`).
+
+Env:
+  - LEASE_TTL seconds a claim stays valid without being released (default: 1800)
+"""
+import json
+import pathlib
+import time
+from typing import Optional
+
+from disk_cache import env_int, sha256_hex
+from state_store import _write_json_atomic, file_lock, owner_id
+
+
+def shard_of(url: str, shards: int) -> int:
+    """Stable shard index for `url` in `0..shards-1`."""
+    return int(sha256_hex(url), 16) % shards if shards > 1 else 0
+
+
+def parse_shard(spec: str) -> Optional[tuple[int, int]]:
+    """Parse "i/N" (0-based i) into `(i, N)`; empty means no sharding."""
+    spec = (spec or "").strip()
+    if not spec:
+        return None
+    try:
+        index, total = (int(part) for part in spec.split("/", 1))
+    except ValueError:
+        raise ValueError(f"Invalid shard {spec!r}, expected i/N") from None
+    if total < 1 or not 0 <= index < total:
+        raise ValueError(f"Invalid shard {spec!r}, expected 0 <= i < N")
+    return index, total
+
+
+class LeaseTable:
+    def __init__(self, path: pathlib.Path | str, owner: Optional[str] = None, ttl: Optional[int] = None):
+        self.path = pathlib.Path(path)
+        self.lock_path = self.path.with_name(".leases.lock")
+        self.owner = owner or owner_id()
+        self.ttl = ttl if ttl is not None else env_int("LEASE_TTL", 1800)
+
+    def _read(self) -> dict:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def claim(self, url: str) -> bool:
+        """Take (or renew) the lease on `url`; False if another owner holds a live one."""
+        with file_lock(self.lock_path):
+            now = time.time()
+            leases = {u: lease for u, lease in self._read().items() if lease.get("expires", 0) > now}
+            current = leases.get(url)
+            if current and current.get("owner") != self.owner:
+                return False
+            leases[url] = {"owner": self.owner, "expires": now + self.ttl}
+            _write_json_atomic(self.path, leases)
+            return True
+
+    def release(self, url: str) -> None:
+        with file_lock(self.lock_path):
+            leases = self._read()
+            if leases.get(url, {}).get("owner") == self.owner:
+                del leases[url]
+                _write_json_atomic(self.path, leases)
+
+    def release_all(self) -> None:
+        """Drop every lease this owner still holds (end of run)."""
+        with file_lock(self.lock_path):
+            leases = self._read()
+            kept = {u: lease for u, lease in leases.items() if lease.get("owner") != self.owner}
+            if kept != leases:
+                _write_json_atomic(self.path, kept)
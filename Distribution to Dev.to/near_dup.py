@@ -0,0 +1,244 @@
+"""MinHash/LSH index of fetched page text for near-duplicate detection.
+
+Each page is reduced to word 5-shingles and a 128-value MinHash signature, whose
+agreement rate estimates the Jaccard similarity of two pages. The signature uses one
+permutation: every shingle hash lands in one of 128 bins and each bin keeps its minimum,
+so a page is hashed in one pass (about 40 ms for 20,000 words) instead of 128. Signatures are split into
+32 bands of 4 rows; pages sharing any band land in the same LSH bucket and only those
+candidates are compared, so a check costs O(bands) rather than O(pages).
+
+The index remembers the order in which pages were first seen. The earliest page of a
+cluster is treated as the original, and later ones are reported as its near-duplicates.
+Entries live in a JSON snapshot (`index.json`) plus an append-only journal
+(`journal.jsonl`): a check appends at most one line instead of rewriting every entry, and
+reads only the journal lines other workers appended since its last look. `compact()`
+folds the journal into the snapshot; the runner calls it once per run, and a check does
+too once the journal holds more lines than the index has entries. Everything happens
+under a file lock, so batch workers and parallel runners share the index.
+
+Env:
+  - NEAR_DUP (default: 1) set to 0 to disable
+  - NEAR_DUP_DIR (default: cache/near_dup next to app.py)
+  - NEAR_DUP_THRESHOLD estimated Jaccard similarity that counts as a duplicate (default: 0.7)
+"""
+import json
+import os
+import pathlib
+import re
+import threading
+from hashlib import blake2b
+from typing import List, Optional, Tuple
+
+from state_store import _write_json_atomic, file_lock
+
+DEFAULT_DIR = pathlib.Path(__file__).parent / "cache" / "near_dup"
+NUM_PERM = 128
+BANDS = 32
+ROWS = NUM_PERM // BANDS
+SHINGLE_WORDS = 5
+# Stored with the index; entries signed by another scheme are not comparable and are dropped.
+SIGNATURE_VERSION = 2
+# A check compacts the journal once it has more lines than this and than the index has entries.
+COMPACT_MIN_LINES = 256
+_BIN_BITS = NUM_PERM.bit_length() - 1  # NUM_PERM is a power of two
+_EMPTY = 1 << (64 - _BIN_BITS)  # larger than any bin value
+_WORD_RE = re.compile(r"\w+")
+
+
+def _shingle_hashes(text: str) -> set:
+    words = _WORD_RE.findall(text.casefold())
+    if len(words) < SHINGLE_WORDS:
+        words = words or [""]
+        spans = [" ".join(words)]
+    else:
+        spans = (" ".join(words[i : i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1))
+    return {int.from_bytes(blake2b(s.encode("utf-8"), digest_size=8).digest(), "big") for s in spans}
+
+
+def signature(text: str) -> List[int]:
+    """One-permutation MinHash signature (NUM_PERM values) of `text`'s word shingles.
+
+    An empty bin (short texts) takes the next non-empty bin's value plus a per-distance
+    offset ("rotation" densification), so two texts still agree on it only as often as
+    their shingle sets overlap.
+    """
+    bins = [_EMPTY] * NUM_PERM
+    for h in _shingle_hashes(text):
+        index, value = h & (NUM_PERM - 1), h >> _BIN_BITS
+        if value < bins[index]:
+            bins[index] = value
+    sig = list(bins)
+    for index in range(NUM_PERM):
+        distance = 0
+        while bins[(index + distance) % NUM_PERM] == _EMPTY:
+            distance += 1
+        sig[index] = bins[(index + distance) % NUM_PERM] + distance * _EMPTY
+    return sig
+
+
+def similarity(sig_a: List[int], sig_b: List[int]) -> float:
+    """Estimated Jaccard similarity of the two signed texts."""
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_PERM
+
+
+def _band_keys(sig: List[int]) -> List[Tuple[int, Tuple[int, ...]]]:
+    return [(band, tuple(sig[band * ROWS : (band + 1) * ROWS])) for band in range(BANDS)]
+
+
+class NearDuplicateError(RuntimeError):
+    """Raised instead of processing a page that near-duplicates an earlier one."""
+
+    def __init__(self, url: str, original: str, score: float):
+        super().__init__(f"Near-duplicate of {original} (similarity {score:.2f})")
+        self.url = url
+        self.original = original
+        self.score = score
+
+
+class NearDupIndex:
+    def __init__(self, directory: pathlib.Path | str, threshold: float = 0.7):
+        self.path = pathlib.Path(directory) / "index.json"
+        self.journal_path = self.path.with_name("journal.jsonl")
+        self.lock_path = self.path.with_name(".index.lock")
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._entries: dict = {}
+        self._buckets: dict = {}
+        self._mtime: Optional[int] = None
+        self._offset = 0
+        self.journal_entries = 0
+
+    def _load(self) -> None:
+        """Full reload of snapshot + journal; caller holds both locks."""
+        try:
+            self._mtime = self.path.stat().st_mtime_ns
+        except OSError:
+            self._mtime = None
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            data = {}
+        entries = (data.get("entries") or {}) if data.get("version") == SIGNATURE_VERSION else {}
+        self._entries = entries
+        self._buckets = {}
+        for url, entry in entries.items():
+            self._index(url, entry["sig"])
+        self._offset = 0
+        self.journal_entries = 0
+        self._read_journal()
+
+    def _read_journal(self) -> None:
+        """Apply journal lines appended since the last read."""
+        try:
+            with self.journal_path.open("rb") as f:
+                f.seek(self._offset)
+                chunk = f.read()
+        except OSError:
+            return
+        # Only consume whole lines; a torn tail is picked up once its writer finishes it.
+        end = chunk.rfind(b"\n") + 1
+        self._offset += end
+        for line in chunk[:end].splitlines():
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue
+            if rec.get("v") != SIGNATURE_VERSION:
+                continue
+            old = self._entries.get(rec["url"])
+            if old:
+                self._unindex(rec["url"], old["sig"])
+            self._entries[rec["url"]] = {"seq": rec["seq"], "sig": rec["sig"]}
+            self._index(rec["url"], rec["sig"])
+            self.journal_entries += 1
+
+    def _sync(self) -> None:
+        """Catch up with other writers; reload fully if someone compacted meanwhile."""
+        try:
+            mtime = self.path.stat().st_mtime_ns
+        except OSError:
+            mtime = None
+        try:
+            size = self.journal_path.stat().st_size
+        except OSError:
+            size = 0
+        if mtime != self._mtime or size < self._offset:
+            self._load()
+        else:
+            self._read_journal()
+
+    def _compact(self) -> None:
+        _write_json_atomic(self.path, {"version": SIGNATURE_VERSION, "entries": self._entries})
+        try:
+            self.journal_path.unlink()
+        except OSError:
+            pass
+        self._mtime = self.path.stat().st_mtime_ns
+        self._offset = 0
+        self.journal_entries = 0
+
+    def compact(self) -> None:
+        """Fold the journal into the snapshot (a no-op when the journal is empty)."""
+        with self._lock, file_lock(self.lock_path):
+            self._sync()
+            if self.journal_entries:
+                self._compact()
+
+    def _index(self, url: str, sig: List[int]) -> None:
+        for key in _band_keys(sig):
+            self._buckets.setdefault(key, set()).add(url)
+
+    def _unindex(self, url: str, sig: List[int]) -> None:
+        for key in _band_keys(sig):
+            bucket = self._buckets.get(key)
+            if bucket:
+                bucket.discard(url)
+
+    def check(self, url: str, text: str) -> Optional[Tuple[str, float]]:
+        """Add or update `url`, then return `(original_url, similarity)` if it duplicates an earlier page."""
+        sig = signature(text)
+        with self._lock, file_lock(self.lock_path):
+            self._sync()
+            entry = self._entries.get(url)
+            if entry is None or entry["sig"] != sig:
+                seq = entry["seq"] if entry else max((e["seq"] for e in self._entries.values()), default=-1) + 1
+                if entry:
+                    self._unindex(url, entry["sig"])
+                entry = {"seq": seq, "sig": sig}
+                self._entries[url] = entry
+                self._index(url, sig)
+                with self.journal_path.open("ab") as f:
+                    f.write((json.dumps({"url": url, "v": SIGNATURE_VERSION, **entry}) + "\n").encode("utf-8"))
+                    self._offset = f.tell()
+                self.journal_entries += 1
+                if self.journal_entries > max(COMPACT_MIN_LINES, len(self._entries)):
+                    self._compact()
+            candidates = set()
+            for key in _band_keys(sig):
+                candidates |= self._buckets.get(key, set())
+            best: Optional[Tuple[str, float]] = None
+            for other in candidates:
+                other_entry = self._entries.get(other)
+                if other == url or not other_entry or other_entry["seq"] > entry["seq"]:
+                    continue
+                score = similarity(sig, other_entry["sig"])
+                if score >= self.threshold and (best is None or score > best[1]):
+                    best = (other, score)
+            return best
+
+
+_default_index: Optional[NearDupIndex] = None
+_default_lock = threading.Lock()
+
+
+def default_near_dup_index() -> Optional[NearDupIndex]:
+    """Process-wide NearDupIndex configured from env, or None when NEAR_DUP=0."""
+    global _default_index
+    if (os.getenv("NEAR_DUP", "1") or "").strip().lower() in {"0", "false", "no", "off"}:
+        return None
+    with _default_lock:
+        if _default_index is None:
+            directory = (os.getenv("NEAR_DUP_DIR") or "").strip() or DEFAULT_DIR
+            _default_index = NearDupIndex(directory, threshold=float(os.getenv("NEAR_DUP_THRESHOLD") or 0.7))
+        return _default_index
+
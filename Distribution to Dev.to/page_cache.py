@@ -0,0 +1,112 @@
+"""Conditional-GET page cache used by app.fetch_page().
+
+Bodies are stored content-addressed (by SHA-256 of the decoded HTML), with a small
+per-URL record holding the validators (ETag / Last-Modified) and the fetch time.
+Within `ttl` seconds a cached page is served without touching the network; after that
+it is revalidated, and a 304 reuses the stored body. Parsed results are cached per
+body hash, so an unchanged page also skips HTML parsing.
+
+Env:
+  - PAGE_CACHE (default: 1) set to 0 to disable
+  - PAGE_CACHE_DIR (default: cache/pages next to app.py)
+  - PAGE_CACHE_TTL seconds before a cached page is revalidated (default: 86400)
+  - PAGE_CACHE_MAX_MB on-disk size bound, least recently used entries go first (default: 200)
+"""
+import os
+import pathlib
+import threading
+import time
+from typing import Any, Callable, Optional, Tuple
+
+from disk_cache import DiskCache, env_int, sha256_hex
+
+DEFAULT_DIR = pathlib.Path(__file__).parent / "cache" / "pages"
+
+
+class PageCache:
+    def __init__(self, directory: pathlib.Path | str, ttl: int = 86400, max_bytes: int = 200 * 1024 * 1024):
+        self.store = DiskCache(directory, max_bytes=max_bytes)
+        self.ttl = max(0, int(ttl))
+        self.fresh_hits = 0
+        self.revalidated = 0
+        self.downloads = 0
+        self._lock = threading.Lock()
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def fetch(self, url: str, get: Callable[[str, dict], Any]) -> Tuple[str, str]:
+        """Return `(html, body_hash)` for `url`, using `get(url, headers)` only when needed.
+
+        `get` must return a requests-style response.
+        """
+        meta = self.store.get_json(f"meta:{url}")
+        body: Optional[bytes] = None
+        if meta:
+            body = self.store.get(f"body:{meta.get('sha256')}")
+
+        headers: dict = {}
+        if meta and body is not None:
+            if time.time() - float(meta.get("fetched_at") or 0) < self.ttl:
+                self._count("fresh_hits")
+                return body.decode("utf-8"), meta["sha256"]
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        resp = get(url, headers)
+        if resp.status_code == 304 and meta and body is not None:
+            meta["fetched_at"] = time.time()
+            self.store.set_json(f"meta:{url}", meta)
+            self._count("revalidated")
+            return body.decode("utf-8"), meta["sha256"]
+        resp.raise_for_status()
+
+        html = resp.text
+        data = html.encode("utf-8")
+        digest = sha256_hex(data)
+        self.store.set(f"body:{digest}", data)
+        self.store.set_json(
+            f"meta:{url}",
+            {
+                "sha256": digest,
+                "etag": resp.headers.get("ETag"),
+                "last_modified": resp.headers.get("Last-Modified"),
+                "fetched_at": time.time(),
+            },
+        )
+        self._count("downloads")
+        return html, digest
+
+    def get_parsed(self, key: str) -> Any:
+        return self.store.get_json(f"parsed:{key}")
+
+    def set_parsed(self, key: str, value: Any) -> None:
+        self.store.set_json(f"parsed:{key}", value)
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = {"fresh_hits": self.fresh_hits, "revalidated": self.revalidated, "downloads": self.downloads}
+        return {**counts, "store": self.store.stats()}
+
+
+_default_cache: Optional[PageCache] = None
+_default_lock = threading.Lock()
+
+
+def default_page_cache() -> Optional[PageCache]:
+    """Process-wide PageCache configured from env, or None when PAGE_CACHE=0."""
+    global _default_cache
+    if (os.getenv("PAGE_CACHE", "1") or "").strip().lower() in {"0", "false", "no", "off"}:
+        return None
+    with _default_lock:
+        if _default_cache is None:
+            directory = (os.getenv("PAGE_CACHE_DIR") or "").strip() or DEFAULT_DIR
+            _default_cache = PageCache(
+                directory,
+                ttl=env_int("PAGE_CACHE_TTL", 86400),
+                max_bytes=env_int("PAGE_CACHE_MAX_MB", 200) * 1024 * 1024,
+            )
+        return _default_cache
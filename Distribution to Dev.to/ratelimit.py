@@ -0,0 +1,272 @@
+"""Per-service request scheduler for the Dev.to, OpenAI, OpenRouter and GitHub APIs.
+
+Every call made through `http_client.request(..., service=name)` first takes a slot from
+that service's token bucket, so a batch sends at the configured rate instead of finding
+the provider's limit by failing. Slots are handed out in arrival order. A caller sleeps
+until its slot comes up, so requests queue instead of failing.
+
+The bucket adapts to the responses:
+  - `Retry-After` on any response pauses the whole service for that long.
+  - A rate-limit header saying nothing is left (`x-ratelimit-remaining[-requests]`,
+    `ratelimit-remaining`) pauses it until the matching reset header.
+  - A throttled response (429, or GitHub's 403 with one of those headers) also halves the
+    pace; every success speeds it back up toward the configured rate. Without any header,
+    the pause backs off exponentially.
+A throttled call is queued again and resent. Only when the wait would go past
+RATE_LIMIT_MAX_WAIT is the throttled response returned to the caller, whose error
+handling reports it as before. A call whose first slot is already further away than that
+raises RateLimitError without being sent.
+
+Each service also caps its calls in flight (OPENAI_CONCURRENCY, ...). A call takes that
+concurrency slot only once its rate-limit wait is over, and gives it back before waiting
+again after a throttled response, so queued callers never hold a slot while they sleep.
+
+Env:
+  - RATE_LIMIT_<SERVICE> rate as `N/period`, e.g. `9/30s`, `50/min`, `1000/h`; `0` or
+    `off` removes the pacing but keeps honouring the provider's headers
+  - RATE_LIMIT_<SERVICE>_BURST requests allowed back to back before pacing starts
+  - RATE_LIMIT_MAX_WAIT seconds one call may spend queued in total (default: 300)
+  - <SERVICE>_CONCURRENCY calls in flight (default: openai 4, openrouter 2, devto 1, github 1)
+
+Defaults sit just under the providers' published limits: devto 9/30s (burst 1), openai
+50/min (burst 5), openrouter 18/min (burst 2), github 480/h (burst 20; GitHub allows
+500 content-creating requests per hour).
+"""
+import contextlib
+import email.utils
+import os
+import re
+import threading
+import time
+from collections import Counter
+from typing import Callable, Dict, Mapping, Optional, Tuple
+
+from disk_cache import env_int
+
+DEFAULT_LIMITS: Dict[str, Tuple[str, int]] = {
+    "devto": ("9/30s", 1),
+    "openai": ("50/min", 5),
+    "openrouter": ("18/min", 2),
+    "github": ("480/h", 20),
+}
+# Max in-flight calls per external service when items run concurrently (overridable via env).
+SERVICE_CONCURRENCY_DEFAULTS: Dict[str, Tuple[str, int]] = {
+    "openai": ("OPENAI_CONCURRENCY", 4),
+    "openrouter": ("OPENROUTER_CONCURRENCY", 2),
+    "devto": ("DEVTO_CONCURRENCY", 1),
+    # Contents API commits to one branch conflict (409) when made in parallel.
+    "github": ("GITHUB_CONCURRENCY", 1),
+}
+# A throttled service is slowed down at most this many times below its configured rate.
+MAX_SLOWDOWN = 16
+MAX_BACKOFF = 60.0
+_PERIOD_RE = re.compile(r"^(\d+(?:\.\d+)?)?\s*(s|sec|secs|second|seconds|m|min|mins|minute|minutes|h|hr|hour|hours)$")
+_PERIOD_UNITS = {"s": 1, "m": 60, "h": 3600}
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+_REMAINING_HEADERS = ("x-ratelimit-remaining", "x-ratelimit-remaining-requests", "ratelimit-remaining")
+_RESET_HEADERS = ("x-ratelimit-reset", "x-ratelimit-reset-requests", "ratelimit-reset")
+
+
+class RateLimitError(RuntimeError):
+    """Raised when a call's slot is further away than RATE_LIMIT_MAX_WAIT."""
+
+
+def parse_rate(spec: str) -> float:
+    """Requests per second for a `N/period` spec; 0 means unpaced."""
+    spec = (spec or "").strip().lower()
+    if spec in ("", "0", "off", "none"):
+        return 0.0
+    count, _, period = spec.partition("/")
+    match = _PERIOD_RE.match(period.strip())
+    try:
+        n = float(count)
+    except ValueError:
+        match = None
+    if not match:
+        raise RuntimeError(f"Invalid rate limit {spec!r} (expected N/period, e.g. 9/30s or 50/min)")
+    seconds = float(match.group(1) or 1) * _PERIOD_UNITS[match.group(2)[0]]
+    return n / seconds if n > 0 else 0.0
+
+
+def _parse_retry_after(value: Optional[str], now: float) -> Optional[float]:
+    """Seconds to wait for a `Retry-After` value in seconds or as an HTTP date."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - now)
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_reset(name: str, value: Optional[str], now: float) -> Optional[float]:
+    """Seconds until a rate-limit window resets.
+
+    GitHub sends an epoch timestamp, OpenAI a duration such as `6m0s` or `20ms`, and the
+    IETF `ratelimit-reset` header a number of seconds.
+    """
+    if not value:
+        return None
+    value = value.strip().lower()
+    try:
+        number = float(value)
+    except ValueError:
+        parts = _DURATION_RE.findall(value)
+        return sum(float(n) * _DURATION_UNITS[unit] for n, unit in parts) if parts else None
+    if name == "x-ratelimit-reset" and number > 1e9:
+        return max(0.0, number - now)
+    return max(0.0, number)
+
+
+def _header(headers: Mapping[str, str], names: Tuple[str, ...]) -> Tuple[Optional[str], Optional[str]]:
+    for name in names:
+        value = headers.get(name)
+        if value is not None:
+            return name, value
+    return None, None
+
+
+class TokenBucket:
+    """Rate `rate` per second with up to `burst` requests back to back (0 = unpaced).
+
+    Slots are reserved in arrival order (each caller gets the next free one and sleeps
+    until then), so waiting callers form a FIFO queue without a scheduler thread.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.base_interval = 1.0 / rate if rate > 0 else 0.0
+        self.interval = self.base_interval
+        self.burst = max(1, burst)
+        self._tat = 0.0  # theoretical arrival time of the next request
+        self._paused_until = 0.0
+        self._strikes = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, deadline: Optional[float] = None) -> float:
+        """Wait for the next slot; returns seconds waited.
+
+        Raises RateLimitError without taking a slot if it comes after `deadline` (monotonic).
+        """
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._paused_until)
+            if self.interval:
+                tat = max(self._tat, now)
+                start = max(start, tat - (self.burst - 1) * self.interval)
+            if deadline is not None and start > deadline:
+                raise RateLimitError(f"next slot is {start - now:.0f}s away")
+            if self.interval:
+                self._tat = max(tat, start) + self.interval
+        if start > now:
+            time.sleep(start - now)
+        return start - now
+
+    def pause(self, seconds: float) -> None:
+        """Hold every caller back for `seconds` from now."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def observe(self, status: int, headers: Mapping[str, str]) -> Tuple[bool, float]:
+        """Adapt to one response; returns `(throttled, seconds paused)`."""
+        now = time.time()
+        delay = _parse_retry_after(headers.get("retry-after"), now)
+        _, remaining = _header(headers, _REMAINING_HEADERS)
+        exhausted = remaining is not None and remaining.strip() in ("0", "0.0")
+        if delay is None and exhausted:
+            name, value = _header(headers, _RESET_HEADERS)
+            delay = _parse_reset(name or "", value, now)
+        throttled = status == 429 or (status == 403 and (delay is not None or exhausted))
+        with self._lock:
+            if throttled:
+                self._strikes += 1
+                if self.base_interval:
+                    self.interval = min(self.interval * 2, self.base_interval * MAX_SLOWDOWN)
+                if delay is None:
+                    delay = min(MAX_BACKOFF, 2.0 ** (self._strikes - 1))
+            elif 200 <= status < 300:
+                self._strikes = 0
+                self.interval = max(self.base_interval, self.interval * 0.9)
+        if delay:
+            self.pause(delay)
+        return throttled, delay or 0.0
+
+
+_buckets: Dict[str, TokenBucket] = {}
+_buckets_lock = threading.Lock()
+_stats: Counter = Counter()
+_semaphores: Dict[str, threading.BoundedSemaphore] = {}
+
+
+def limiter(service: str) -> TokenBucket:
+    """The process-wide bucket for `service`, configured from env on first use."""
+    with _buckets_lock:
+        bucket = _buckets.get(service)
+        if bucket is None:
+            spec, burst = DEFAULT_LIMITS.get(service, ("off", 1))
+            env_name = f"RATE_LIMIT_{service.upper()}"
+            bucket = TokenBucket(parse_rate(os.getenv(env_name) or spec), env_int(f"{env_name}_BURST", burst))
+            _buckets[service] = bucket
+        return bucket
+
+
+def _semaphore(service: str) -> threading.BoundedSemaphore:
+    with _buckets_lock:
+        sem = _semaphores.get(service)
+        if sem is None:
+            env_name, default = SERVICE_CONCURRENCY_DEFAULTS.get(service, ("", 4))
+            limit = env_int(env_name, default) if env_name else default
+            sem = _semaphores[service] = threading.BoundedSemaphore(max(1, limit))
+        return sem
+
+
+@contextlib.contextmanager
+def concurrency_slot(service: str):
+    """Hold one of `service`'s in-flight slots (see SERVICE_CONCURRENCY_DEFAULTS)."""
+    with _semaphore(service):
+        yield
+
+
+def send(service: str, call: Callable[[], object]):
+    """Run `call()` (one HTTP request, returning a response) in `service`'s queue.
+
+    The concurrency slot is held only while `call()` runs, never during a wait. Throttled
+    responses are queued again and resent until RATE_LIMIT_MAX_WAIT runs out; then the
+    last one is returned as is.
+    """
+    bucket = limiter(service)
+    deadline = time.monotonic() + env_int("RATE_LIMIT_MAX_WAIT", 300)
+    while True:
+        try:
+            waited = bucket.acquire(deadline)
+        except RateLimitError as exc:
+            raise RateLimitError(f"{service} rate limit: {exc}, beyond RATE_LIMIT_MAX_WAIT") from None
+        with concurrency_slot(service):
+            resp = call()
+        throttled, delay = bucket.observe(resp.status_code, resp.headers)
+        with _buckets_lock:
+            _stats[(service, "requests")] += 1
+            _stats[(service, "waited")] += waited
+            if throttled:
+                _stats[(service, "throttled")] += 1
+        if not throttled or time.monotonic() + delay > deadline:
+            return resp
+
+
+def stats() -> Dict[str, dict]:
+    """Per service: requests sent, throttled responses and seconds spent queued."""
+    with _buckets_lock:
+        services = sorted({service for service, _ in _stats})
+        return {
+            service: {
+                "requests": int(_stats[(service, "requests")]),
+                "throttled": int(_stats[(service, "throttled")]),
+                "waited": round(_stats[(service, "waited")], 1),
+            }
+            for service in services
+        }
@@ -5,14 +5,42 @@ Behavior:
 - Uses DATA_FILE env (default: urls.json) under the same folder.
 - If SHEET_ROW_INDEX env is set (1-based), processes that single item.
 - Otherwise uses state/last_index.txt (repo-root) to pick next item and advances it only on success.
+- With --batch (or RUN_BATCH=1), imports app.py once and processes every pending item
+  in this process via app.process_item(), recording each result as it goes.
+- With --workers N (or RUN_WORKERS), batch mode runs up to N items concurrently.
+- With --retry-errors, errored URLs go back to pending; app.py checkpoints under
+  outputs/<item-id>/ let each one resume from the stage that failed.
+- State transitions are journaled (state_store.py) and folded back into
+  state/last_state.json when the run ends.
+- With --shard i/N (or RUN_SHARD), only URLs hashing to shard i are taken, and every URL
+  is leased (leases.py) before processing, so several runners can share the state dir.
+  --no-compact leaves the journal in place; --merge only folds journals into the snapshot.
+- With --near-dups (or RUN_NEAR_DUPS) "skip", pages that near-duplicate an earlier one
+  are recorded as errors before any banner/LLM call; "defer" fetches pending pages first
+  and moves near-duplicates to the end of the queue; "warn" (default) only reports them.
+- When publishing, canonicals of processed items and of your Dev.to articles feed
+  canonical_index.py, so items whose canonical URL is already taken fail before any
+  expensive stage. The Dev.to listing is synced whenever DEVTO_API_KEY is set (the
+  index file is not kept between CI runs); --no-sync-devto or DEVTO_SYNC_CANONICALS=0
+  turns it off.
+- With --batch-upload (or GITHUB_BATCH_UPLOAD=1), batch mode commits every GitHub banner
+  of the run in one commit (github_upload.py) before publishing.
+- `run_from_json.py banners` pre-renders the local banners of pending items (or, with
+  --all-items, of every item) on a process pool into the banner cache, so the banner
+  stage of a later run only has to publish them.
 """
+import argparse
 import json
 import os
 import subprocess
 import traceback
 import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
 
+import ratelimit
+from leases import LeaseTable, parse_shard, shard_of
+from state_store import PENDING, StateStore
 
 ROOT = Path(__file__).parent
 # Load .env if present so vars written by the workflow are available to this process
@@ -45,23 +73,41 @@ def state_file_path():
     sdir.mkdir(parents=True, exist_ok=True)
     return sdir / "last_state.json"
 
-def read_state_json():
-    p = state_file_path()
-    if not p.exists():
-        return {"processed": [], "pending": [], "error": []}
-    try:
-        with p.open("r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception:
-        return {"processed": [], "pending": [], "error": []}
 
-def write_state_json(state):
-    p = state_file_path()
-    with p.open("w", encoding="utf-8") as f:
-        json.dump(state, f, indent=2)
+def open_state_store() -> StateStore:
+    """Load state/last_state.json plus any journals left by other or interrupted runs."""
+    return StateStore(state_file_path())
+
+
+class WorkQueue:
+    """Pending URLs for this runner: filtered to its shard and claimed via leases."""
 
+    def __init__(self, store: StateStore, leases: LeaseTable, shard=None):
+        self.store = store
+        self.leases = leases
+        self.shard = shard
 
+    def pending(self) -> list:
+        urls = self.store.pending()
+        if self.shard:
+            index, total = self.shard
+            urls = [u for u in urls if shard_of(u, total) == index]
+        return urls
 
+    def claim(self, url) -> bool:
+        """Lease `url` and confirm no other runner finished it in the meantime."""
+        if not self.leases.claim(url):
+            print(f"Skipping {url}: leased by another runner.")
+            return False
+        self.store.refresh()
+        if self.store.status(url) != PENDING:
+            self.leases.release(url)
+            print(f"Skipping {url}: already {self.store.status(url)}.")
+            return False
+        return True
+
+    def release(self, url) -> None:
+        self.leases.release(url)
 
 
 def build_cmd(item, publish: bool):
@@ -100,7 +146,375 @@ def build_cmd(item, publish: bool):
     return cmd
 
 
+def item_kwargs(item, publish: bool) -> dict:
+    """Keyword arguments for app.process_item(), mirroring build_cmd()."""
+    url = item.get("url") or item.get("link") or item.get("path")
+    if not url:
+        raise ValueError("item missing url")
+    tags = item.get("tags")
+    if tags and not isinstance(tags, list):
+        tags = [tags]
+    return {
+        "url": url,
+        "tags": tags or [],
+        "title": item.get("title"),
+        "canonical": item.get("canonical"),
+        "banner": item.get("banner"),
+        # Always request auto-banner unless explicit banner is set
+        "auto_banner": not item.get("banner"),
+        "publish": publish,
+    }
+
+
+def item_canonical(item) -> str:
+    return item.get("canonical") or os.getenv("CANONICAL_URL") or item.get("url")
+
+
+def sync_devto_default() -> bool:
+    """DEVTO_SYNC_CANONICALS if set, else on whenever a Dev.to API key is configured."""
+    value = os.getenv("DEVTO_SYNC_CANONICALS", "").strip().lower()
+    if value in ("", "auto"):
+        return bool(os.getenv("DEVTO_API_KEY"))
+    return value in ("1", "true", "yes", "on")
+
+
+def seed_canonical_index(store: StateStore, items_by_url, sync_devto: bool) -> None:
+    """Feed the canonical index from published items and, optionally, the Dev.to listing.
+
+    Only processed items whose publish checkpoint holds a Dev.to URL count; a dry run or a
+    run stopped before publishing leaves the canonical free.
+    """
+    import app
+    from canonical_index import default_canonical_index
+
+    index = default_canonical_index()
+    if index is None:
+        return
+    root = app._checkpoint_root()
+    known = []
+    for url in store.processed() if root is not None else []:
+        devto = app.checkpoints.load_stage(root, url, "publish") if url in items_by_url else None
+        if isinstance(devto, dict) and devto.get("url"):
+            canonical = devto.get("canonical_url") or item_canonical(items_by_url[url])
+            known.append((canonical, {"source": "state", "url": url, "devto_url": devto["url"], "id": devto.get("id")}))
+    if known:
+        index.add_many(known)
+    devto_key = os.getenv("DEVTO_API_KEY")
+    if sync_devto and devto_key:
+        try:
+            print(f"Synced {index.sync_from_devto(devto_key)} new canonical URL(s) from Dev.to.")
+        except Exception as exc:
+            print(f"Dev.to canonical sync failed: {exc}")
+
+
+def defer_near_duplicates(urls: list, fetch_workers: int = 8) -> list:
+    """Fetch pages (through the page cache) and move near-duplicates behind their originals.
+
+    Pages are fetched on `fetch_workers` threads, but checked in queue order, so the
+    earlier URL of a cluster stays its original.
+    """
+    import app
+
+    index = app.default_near_dup_index()
+    if index is None:
+        return urls
+
+    def _fetch(url):
+        try:
+            return app.fetch_page(url)[1]
+        except Exception as exc:
+            print(f"[near-dup] could not pre-fetch {url}: {exc}")
+            return None
+
+    originals, duplicates = [], []
+    with ThreadPoolExecutor(max_workers=max(1, fetch_workers), thread_name_prefix="fetch") as pool:
+        texts = pool.map(_fetch, urls)
+        for url, text in zip(urls, texts):
+            match = index.check(url, text) if text is not None else None
+            if match:
+                print(f"[near-dup] deferring {url}: near-duplicate of {match[0]} (similarity {match[1]:.2f})")
+                duplicates.append(url)
+            else:
+                originals.append(url)
+    return originals + duplicates
+
+
+def compact_near_dup_index() -> None:
+    """Fold this run's near-duplicate checks into the index snapshot, once per run."""
+    from near_dup import default_near_dup_index
+
+    index = default_near_dup_index()
+    if index is not None:
+        index.compact()
+
+
+def run_batch(
+    items_by_url,
+    queue: WorkQueue,
+    publish: bool,
+    limit: int = 0,
+    workers: int = 1,
+    near_dups: str = "warn",
+    batch_upload: bool = False,
+) -> int:
+    """Process pending items in-process, isolating failures per item.
+
+    With workers > 1 items run on a bounded thread pool so fetch, banner, summarize and
+    publish overlap across items; per-service caps live in ratelimit.concurrency_slot().
+    With batch_upload (and checkpoints on), items first run up to postprocess while
+    GitHub banner uploads are queued, then all banners go up in one commit, then the
+    prepared items resume to publish.
+    Returns the number of items that completed successfully.
+    """
+    import app  # deferred: only batch mode pays for the pipeline imports
+
+    store = queue.store
+    medium = app.get_medium_email_config_from_env()
+    pending = queue.pending()
+    if near_dups == "defer":
+        pending = defer_near_duplicates(pending)
+    if limit > 0:
+        pending = pending[:limit]
+
+    def _run(url, stop_after=None) -> bool:
+        # Also renews the lease kept from the first pass of a batch upload, which may be
+        # older than LEASE_TTL by now; an item another runner took over meanwhile is skipped.
+        if not queue.claim(url):
+            return False
+        keep_lease = False
+        try:
+            item = items_by_url.get(url)
+            if not item:
+                print(f"Item for url {url} not found in data file.")
+                store.mark_error(url, "Not found in data file")
+                return False
+            try:
+                app.process_item(
+                    **item_kwargs(item, publish),
+                    medium=medium,
+                    near_dup_action="skip" if near_dups == "skip" else "warn",
+                    stop_after=stop_after,
+                )
+            except (app.NearDuplicateError, app.DuplicateCanonicalError) as exc:
+                print(f"Skipped {url}: {exc}")
+                store.mark_error(url, str(exc))
+                return False
+            except Exception as exc:
+                print(f"Error processing {url}: {exc}")
+                traceback.print_exc()
+                store.mark_error(url, f"{type(exc).__name__}: {exc}")
+                return False
+            if stop_after:
+                keep_lease = True  # the second pass finishes this item
+                return True
+            store.mark_processed(url)
+            print(f"Processed {url}")
+            return True
+        finally:
+            if not keep_lease:
+                queue.release(url)
+
+    def _map(fn, urls) -> list:
+        if workers <= 1:
+            return [fn(url) for url in urls]
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="item") as pool:
+            return list(pool.map(fn, urls))
+
+    checkpoint_root = app._checkpoint_root()
+    if batch_upload and checkpoint_root is None:
+        print("Batch upload needs checkpoints (CHECKPOINTS=1); uploading banners one by one.")
+        batch_upload = False
+
+    if batch_upload:
+        with app.github_upload.deferred_uploads():
+            prepared = [url for url, ready in zip(pending, _map(lambda u: _run(u, "postprocess"), pending)) if ready]
+        try:
+            uploaded = app.github_upload.flush(message=f"Add banners for {len(prepared)} article(s)")
+            if uploaded:
+                print(f"Committed {len(uploaded)} banner(s) in one commit.")
+        except Exception as exc:
+            print(f"Batch banner upload failed: {exc}")
+            for url in prepared:
+                # Their banner URLs point at files that were never committed.
+                app.checkpoints.clear_stages(checkpoint_root, url, ("banner", "postprocess"))
+                store.mark_error(url, f"Banner upload failed: {exc}")
+                queue.release(url)
+            prepared = []
+        results = _map(_run, prepared)
+    else:
+        results = _map(_run, pending)
+
+    ok = sum(results)
+    print(f"Batch done: {ok} processed, {len(pending) - ok} failed or skipped, {len(queue.pending())} still pending.")
+    print(f"HTTP connections: {app.http_client.connection_stats()}")
+    rate_limits = ratelimit.stats()
+    if rate_limits:
+        print(f"Rate limits: {rate_limits}")
+    cache = app.summary_cache()
+    if cache is not None:
+        print(f"Summary cache: {cache.stats()}")
+    banners = app.default_banner_cache()
+    if banners is not None:
+        print(f"Banner cache: {banners.stats()}")
+    index = app.default_boilerplate_index()
+    if index is not None:
+        print(f"Boilerplate stripped: {index.stats()}")
+    return ok
+
+
+def _prerender_banner(title: str):
+    import app
+
+    return app.prerender_local_banner(title)
+
+
+def prerender_banners(items_by_url, urls, processes: int = 0, fetch_workers: int = 8) -> int:
+    """Render local banners for `urls` across CPU cores; returns how many were newly rendered.
+
+    Titles come from the data file, or from the page (through the page cache) like
+    process_item() does. Rendering runs in a process pool, so it neither holds the GIL
+    nor waits behind network calls. Files land where generate_banner() looks them up.
+    When BANNER_BASE_URL is set, their public URLs are recorded in the manifest too.
+    """
+    import app
+
+    provider = (os.getenv("BANNER_PROVIDER") or "local").strip().lower()
+    if provider != "local":
+        print(f"BANNER_PROVIDER={provider}: only local banners can be pre-rendered.")
+        return 0
+    cache = app.default_banner_cache()
+    if cache is None:
+        print("BANNER_CACHE=0: pre-rendered banners would not be reused.")
+        return 0
+
+    items = [items_by_url[u] for u in urls if u and u in items_by_url and not items_by_url[u].get("banner")]
+
+    def _title(item):
+        kwargs = item_kwargs(item, publish=False)
+        try:
+            title = kwargs["title"] or app.fetch_page(kwargs["url"])[0]
+        except Exception as exc:
+            print(f"[banners] could not fetch {kwargs['url']}: {exc}")
+            return None
+        return app.local_banner_title(app.build_banner_prompt(title, "", kwargs["tags"]))
+
+    with ThreadPoolExecutor(max_workers=max(1, fetch_workers), thread_name_prefix="fetch") as pool:
+        titles = sorted({t for t in pool.map(_title, items) if t is not None})
+    if not titles:
+        print("No banners to render.")
+        return 0
+
+    processes = processes if processes > 0 else (os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=min(processes, len(titles))) as pool:
+        results = list(pool.map(_prerender_banner, titles, chunksize=max(1, len(titles) // (processes * 4))))
+    rendered = sum(1 for _, fresh in results if fresh)
+
+    base_url = (os.getenv("BANNER_BASE_URL") or "").strip()
+    if base_url:
+        destination = app._banner_destination(base_url)
+        for files, _ in results:
+            for key, file_name in files.values():
+                url = app._local_file_to_base_url(app.STATIC_BANNERS_DIR / file_name, base_url)
+                cache.set_url(key, destination, url, file_name)
+    print(f"Banners: {rendered} rendered, {len(titles) - rendered} already cached ({processes} process(es)).")
+    return rendered
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Process URLs from the data file and track state.")
+    parser.add_argument(
+        "command",
+        nargs="?",
+        choices=("run", "banners"),
+        default="run",
+        help="run (default): process items; banners: only pre-render local banners into the banner cache.",
+    )
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        default=os.getenv("RUN_BATCH", "0").lower() in ("1", "true", "yes", "on"),
+        help="Process all pending items in this process instead of one subprocess per item.",
+    )
+    parser.add_argument(
+        "--limit",
+        type=int,
+        default=int(os.getenv("RUN_LIMIT", "0") or 0),
+        help="Maximum number of pending items to process in batch mode (0 = all).",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.getenv("RUN_WORKERS", "1") or 1),
+        help="Number of items to process concurrently in batch mode (implies --batch when > 1).",
+    )
+    parser.add_argument(
+        "--retry-errors",
+        action="store_true",
+        help="Requeue URLs from the error list; each resumes from its first incomplete stage.",
+    )
+    parser.add_argument(
+        "--shard",
+        default=os.getenv("RUN_SHARD", ""),
+        help="Only process URLs in shard i of N, given as i/N (0-based); runners share state via leases.",
+    )
+    parser.add_argument(
+        "--near-dups",
+        choices=("warn", "skip", "defer"),
+        default=(os.getenv("RUN_NEAR_DUPS") or "warn").strip().lower(),
+        help="What to do with pages that near-duplicate an earlier one (default: warn).",
+    )
+    parser.add_argument(
+        "--sync-devto",
+        action="store_true",
+        default=sync_devto_default(),
+        help="Before publishing, add canonical URLs of your existing Dev.to articles to the local index "
+        "(default: on when DEVTO_API_KEY is set).",
+    )
+    parser.add_argument(
+        "--no-sync-devto",
+        dest="sync_devto",
+        action="store_false",
+        help="Only seed the canonical index from the state store and local checkpoints.",
+    )
+    parser.add_argument(
+        "--batch-upload",
+        action="store_true",
+        default=os.getenv("GITHUB_BATCH_UPLOAD", "0").lower() in ("1", "true", "yes", "on"),
+        help="In batch mode, commit all GitHub banner uploads of the run in a single commit.",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=int(os.getenv("BANNER_PROCESSES", "0") or 0),
+        help="Worker processes for the banners command (default: one per CPU).",
+    )
+    parser.add_argument(
+        "--all-items",
+        action="store_true",
+        help="With the banners command, render banners for every item in the data file, not only pending ones.",
+    )
+    parser.add_argument(
+        "--no-compact",
+        action="store_true",
+        help="Leave this run's journal in state/ instead of folding it into last_state.json.",
+    )
+    parser.add_argument(
+        "--merge",
+        action="store_true",
+        help="Only fold all journals in state/ into last_state.json, then exit.",
+    )
+    args = parser.parse_args()
+    if args.workers > 1:
+        args.batch = True
+    try:
+        args.shard = parse_shard(args.shard)
+    except ValueError as exc:
+        parser.error(str(exc))
+    return args
+
+
 def main():
+    args = parse_args()
     # Diagnostic: print effective publish flag and presence of keys
     print(f"[runner-debug] RUN_PUBLISH={os.getenv('RUN_PUBLISH')} OPENAI_API_KEY_set={'yes' if os.getenv('OPENAI_API_KEY') else 'no'} DEVTO_API_KEY_set={'yes' if os.getenv('DEVTO_API_KEY') else 'no'} BANNER_UPLOAD_PROVIDER={os.getenv('BANNER_UPLOAD_PROVIDER')}")
 
@@ -109,21 +523,49 @@ def main():
     if not items:
         print("No items found in data file.")
         raise SystemExit(1)
+    items_by_url = {}
+    for item in items:
+        items_by_url.setdefault(item.get("url"), item)
 
     idx_env = os.getenv("SHEET_ROW_INDEX")
     publish = os.getenv("RUN_PUBLISH", "0").lower() in ("1", "true", "yes", "on")
 
-    state = read_state_json()
+    store = open_state_store()
+    if args.merge:
+        store.compact()
+        print(f"Merged journals into {store.snapshot_path}: {store.counts()}")
+        raise SystemExit(0)
+    queue = WorkQueue(store, LeaseTable(store.snapshot_path.with_name("leases.json")), shard=args.shard)
+    try:
+        rc = _run(args, queue, items, items_by_url, idx_env, publish)
+    finally:
+        queue.leases.release_all()
+        if not args.no_compact:
+            # Fold the journals into last_state.json (the file the workflow commits).
+            store.compact()
+        compact_near_dup_index()
+    raise SystemExit(rc)
+
+
+def _run(args, queue: WorkQueue, items, items_by_url, idx_env, publish: bool) -> int:
+    store = queue.store
     # On first run, populate pending if empty
-    if not state["pending"] and not state["processed"] and not state["error"]:
-        state["pending"] = [item["url"] for item in items]
-        write_state_json(state)
+    if store.is_empty():
+        store.add_pending(item["url"] for item in items)
+
+    if args.retry_errors:
+        moved = store.requeue_errors()
+        print(f"Requeued {moved} errored item(s).")
 
-    def find_item_by_url(url):
-        for item in items:
-            if item.get("url") == url:
-                return item
-        return None
+    if args.command == "banners":
+        urls = list(items_by_url) if args.all_items else queue.pending()
+        if args.limit > 0:
+            urls = urls[: args.limit]
+        prerender_banners(items_by_url, urls, processes=args.processes)
+        return 0
+
+    if publish:
+        seed_canonical_index(store, items_by_url, args.sync_devto)
 
     # If SHEET_ROW_INDEX provided, use it (1-based)
     if idx_env:
@@ -131,35 +573,51 @@ def main():
             idx = max(0, int(idx_env) - 1)
         except Exception:
             print("Invalid SHEET_ROW_INDEX")
-            raise SystemExit(2)
-        if idx >= len(state["pending"]):
-            print(f"Index {idx+1} out of range (pending items: {len(state['pending'])})")
-            raise SystemExit(3)
-        url = state["pending"][idx]
-        item = find_item_by_url(url)
+            return 2
+        pending = store.pending()
+        if idx >= len(pending):
+            print(f"Index {idx+1} out of range (pending items: {len(pending)})")
+            return 3
+        url = pending[idx]
+        item = items_by_url.get(url)
         if not item:
             print(f"Item for url {url} not found in data file.")
-            raise SystemExit(4)
+            return 4
         cmd = build_cmd(item, publish)
         rc = subprocess.call(cmd)
         if rc == 0:
-            state["processed"].append(url)
-            state["pending"].remove(url)
+            store.mark_processed(url)
         else:
-            state["error"].append({"url": url, "error": f"Exit code {rc}"})
-            state["pending"].remove(url)
-        write_state_json(state)
-        raise SystemExit(rc)
+            store.mark_error(url, f"Exit code {rc}")
+        return rc
+
+    if args.batch:
+        run_batch(
+            items_by_url,
+            queue,
+            publish,
+            limit=args.limit,
+            workers=args.workers,
+            near_dups=args.near_dups,
+            batch_upload=args.batch_upload,
+        )
+        return 0
 
     # Try pending URLs in order until one is published successfully, or all are errors
+    if args.near_dups == "skip":
+        os.environ["NEAR_DUP_ACTION"] = "skip"  # inherited by the app.py subprocess
+    pending = queue.pending()
+    if args.near_dups == "defer":
+        pending = defer_near_duplicates(pending)
     published = False
-    for url in list(state["pending"]):
-        item = find_item_by_url(url)
+    for url in pending:
+        if not queue.claim(url):
+            continue
+        item = items_by_url.get(url)
         if not item:
             print(f"Item for url {url} not found in data file.")
-            state["error"].append({"url": url, "error": "Not found in data file"})
-            state["pending"].remove(url)
-            write_state_json(state)
+            store.mark_error(url, "Not found in data file")
+            queue.release(url)
             continue
         cmd = build_cmd(item, publish)
         try:
@@ -168,25 +626,21 @@ def main():
             rc = 99
             err_msg = f"Exception: {exc}\n{traceback.format_exc()}"
             print(f"Runner exception for {url}: {err_msg}")
-            state["error"].append({"url": url, "error": err_msg})
-            state["pending"].remove(url)
-            write_state_json(state)
+            store.mark_error(url, err_msg)
+            queue.release(url)
             continue
+        queue.release(url)
         if rc == 0:
-            state["processed"].append(url)
-            state["pending"].remove(url)
-            write_state_json(state)
+            store.mark_processed(url)
             print(f"Processed {url}")
             published = True
             break
         else:
-            state["error"].append({"url": url, "error": f"Exit code {rc}"})
-            state["pending"].remove(url)
-            write_state_json(state)
+            store.mark_error(url, f"Exit code {rc}")
             print(f"Error processing {url}, exit code {rc}")
     if not published:
         print("No blog was published (all pending URLs failed or errored).")
-    raise SystemExit(0)
+    return 0
 
 
 if __name__ == "__main__":
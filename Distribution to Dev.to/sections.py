@@ -0,0 +1,69 @@
+"""Split extracted page text into heading-aligned chunks for map-reduce summarization.
+
+fetch_page() returns plain text (one line per text node) plus main points that start
+with the page's h1-h3 headings. `split_sections()` cuts the text before every line that
+matches a heading, then packs neighbouring sections into chunks of at most `max_chars`
+so each condense call gets a coherent, bounded slice. Sections longer than `max_chars`
+are split on line boundaries. With `max_chunks`, a text that needs more chunks is packed
+into fewer, larger ones; no part of it is dropped.
+"""
+from typing import Iterable, List
+
+
+def _norm(line: str) -> str:
+    return " ".join(line.split()).casefold()
+
+
+def split_sections(text: str, headings: Iterable[str] = ()) -> List[str]:
+    """Split `text` into sections starting at lines equal to one of `headings`."""
+    marks = {_norm(h) for h in headings if h and h.strip()}
+    sections: list[list[str]] = [[]]
+    for line in text.splitlines():
+        if marks and _norm(line) in marks and sections[-1]:
+            sections.append([])
+        sections[-1].append(line)
+    return ["\n".join(lines) for lines in sections if lines]
+
+
+def _split_long(section: str, max_chars: int) -> List[str]:
+    parts: list[str] = []
+    current: list[str] = []
+    size = 0
+    for line in section.splitlines():
+        while len(line) > max_chars:
+            if current:
+                parts.append("\n".join(current))
+                current, size = [], 0
+            parts.append(line[:max_chars])
+            line = line[max_chars:]
+        if current and size + len(line) + 1 > max_chars:
+            parts.append("\n".join(current))
+            current, size = [], 0
+        current.append(line)
+        size += len(line) + 1
+    if current:
+        parts.append("\n".join(current))
+    return parts
+
+
+def chunk_text(text: str, headings: Iterable[str] = (), max_chars: int = 6000, max_chunks: int = 0) -> List[str]:
+    """Heading-aligned chunks of at most `max_chars` characters, in document order.
+
+    With `max_chunks`, `max_chars` grows until the whole text fits in that many chunks.
+    """
+    chunks = _pack(text, headings, max_chars)
+    while max_chunks and len(chunks) > max_chunks:
+        max_chars = max(max_chars + 1, max_chars * len(chunks) // max_chunks)
+        chunks = _pack(text, headings, max_chars)
+    return chunks
+
+
+def _pack(text: str, headings: Iterable[str], max_chars: int) -> List[str]:
+    chunks: list[str] = []
+    for section in split_sections(text, headings):
+        for part in _split_long(section, max_chars) if len(section) > max_chars else [section]:
+            if chunks and len(chunks[-1]) + len(part) + 1 <= max_chars:
+                chunks[-1] = f"{chunks[-1]}\n{part}"
+            else:
+                chunks.append(part)
+    return chunks
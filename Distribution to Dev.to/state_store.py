@@ -0,0 +1,294 @@
+"""URL-indexed runner state: a JSON snapshot plus append-only journals.
+
+`state/last_state.json` stays the durable, committed format:
+
+    {"processed": [url, ...], "pending": [url, ...], "error": [{"url": ..., "error": ...}, ...]}
+
+Between compactions every transition is appended as one JSON line to this process's
+journal, `state/journal-<host>-<pid>.jsonl` (flushed and fsynced), instead of rewriting the
+whole snapshot. Loading replays all journals over the snapshot in timestamp order, so
+several runners sharing a state directory see each other's results. `refresh()` reads only
+the journal bytes appended since the last look. In memory each status is an insertion-
+ordered dict keyed by URL, so lookups and moves are O(1), and a URL always lives in
+exactly one of processed / pending / error.
+
+`compact()` merges the snapshot and every journal, writes the snapshot atomically and
+deletes the folded journals. Appends, refreshes and compaction hold an exclusive
+`flock` on `state/.state.lock`. The runner compacts at the end of every run so the GitHub
+workflow keeps committing the same JSON file.
+"""
+import contextlib
+import json
+import os
+import pathlib
+import socket
+import tempfile
+import threading
+import time
+from typing import Iterable, Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX
+    fcntl = None
+
+PROCESSED = "processed"
+PENDING = "pending"
+ERROR = "error"
+
+_thread_locks: dict[str, threading.RLock] = {}
+_thread_locks_guard = threading.Lock()
+
+
+@contextlib.contextmanager
+def file_lock(path: pathlib.Path | str):
+    """Exclusive lock across threads (in-process) and processes (flock) on `path`."""
+    path = pathlib.Path(path)
+    with _thread_locks_guard:
+        tlock = _thread_locks.setdefault(str(path.resolve()), threading.RLock())
+    with tlock:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open("a+") as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _write_json_atomic(path: pathlib.Path | str, data) -> None:
+    path = pathlib.Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def owner_id() -> str:
+    """Identifier for this runner process, used in journal names and leases."""
+    host = "".join(ch if ch.isalnum() or ch in "-_" else "-" for ch in socket.gethostname()) or "host"
+    return f"{host}-{os.getpid()}"
+
+
+class StateStore:
+    def __init__(self, snapshot_path: pathlib.Path | str, journal_path: Optional[pathlib.Path | str] = None):
+        self.snapshot_path = pathlib.Path(snapshot_path)
+        self.journal_path = (
+            pathlib.Path(journal_path) if journal_path else self.snapshot_path.with_name(f"journal-{owner_id()}.jsonl")
+        )
+        self.lock_path = self.snapshot_path.with_name(".state.lock")
+        self._lock = threading.RLock()
+        self._processed: dict[str, None] = {}
+        self._pending: dict[str, None] = {}
+        self._errors: dict[str, str] = {}
+        self._offsets: dict[pathlib.Path, int] = {}
+        self._snapshot_mtime: Optional[int] = None
+        self.journal_entries = 0
+        with self._lock, file_lock(self.lock_path):
+            self._load()
+
+    # -- loading -----------------------------------------------------------------------
+
+    def _snapshot_stamp(self) -> Optional[int]:
+        try:
+            return self.snapshot_path.stat().st_mtime_ns
+        except OSError:
+            return None
+
+    def _load(self) -> None:
+        """Full reload of snapshot + all journals; caller holds both locks."""
+        self._processed, self._pending, self._errors = {}, {}, {}
+        self._offsets = {}
+        self.journal_entries = 0
+        self._snapshot_mtime = self._snapshot_stamp()
+        try:
+            data = json.loads(self.snapshot_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            data = {}
+        # Older snapshots could list a URL under several keys; processed wins, then pending.
+        for url in data.get(PROCESSED) or []:
+            self._set(url, PROCESSED)
+        for url in data.get(PENDING) or []:
+            if url not in self._processed:
+                self._set(url, PENDING)
+        for entry in data.get(ERROR) or []:
+            url = entry.get("url") if isinstance(entry, dict) else entry
+            if url and url not in self._processed and url not in self._pending:
+                self._set(url, ERROR, (entry.get("error") if isinstance(entry, dict) else "") or "")
+        self._read_journals()
+
+    def journal_paths(self) -> list[pathlib.Path]:
+        return sorted(self.snapshot_path.parent.glob("journal*.jsonl"))
+
+    def _read_journals(self) -> None:
+        """Apply journal records appended since the last read, merged by timestamp."""
+        records = []
+        for path in self.journal_paths():
+            offset = self._offsets.get(path, 0)
+            try:
+                with path.open("rb") as f:
+                    f.seek(offset)
+                    chunk = f.read()
+            except OSError:
+                continue
+            # Only consume whole lines; a torn tail is picked up once its writer finishes it.
+            end = chunk.rfind(b"\n") + 1
+            self._offsets[path] = offset + end
+            for line in chunk[:end].splitlines():
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue
+                records.append(rec)
+        records.sort(key=lambda rec: rec.get("ts") or 0)
+        for rec in records:
+            url = rec.get("url")
+            status = rec.get("status")
+            if url and status in (PROCESSED, PENDING, ERROR):
+                self._set(url, status, rec.get("error") or "")
+                self.journal_entries += 1
+
+    def _catch_up(self) -> None:
+        """Apply other runners' changes; reload fully if someone compacted meanwhile."""
+        stale = self._snapshot_stamp() != self._snapshot_mtime or any(
+            not path.exists() or path.stat().st_size < offset for path, offset in self._offsets.items()
+        )
+        if stale:
+            self._load()
+        else:
+            self._read_journals()
+
+    def refresh(self) -> None:
+        """Pick up transitions written by other runners since the last load."""
+        with self._lock, file_lock(self.lock_path):
+            self._catch_up()
+
+    # -- transitions -------------------------------------------------------------------
+
+    def _set(self, url: str, status: str, error: str = "") -> None:
+        self._processed.pop(url, None)
+        self._pending.pop(url, None)
+        self._errors.pop(url, None)
+        if status == PROCESSED:
+            self._processed[url] = None
+        elif status == PENDING:
+            self._pending[url] = None
+        else:
+            self._errors[url] = error
+
+    def _append(self, records: list[dict]) -> None:
+        payload = "".join(json.dumps(rec, ensure_ascii=False) + "\n" for rec in records).encode("utf-8")
+        with file_lock(self.lock_path):
+            # Apply other runners' records first so our offsets stay contiguous.
+            self._catch_up()
+            with self.journal_path.open("ab") as f:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+                self._offsets[self.journal_path] = f.tell()
+        self.journal_entries += len(records)
+
+    def _transition(self, url: str, status: str, error: str = "") -> None:
+        with self._lock:
+            rec = {"url": url, "status": status, "ts": time.time()}
+            if status == ERROR:
+                rec["error"] = error
+            self._append([rec])
+            self._set(url, status, error)
+
+    def mark_processed(self, url: str) -> None:
+        self._transition(url, PROCESSED)
+
+    def mark_error(self, url: str, error: str) -> None:
+        self._transition(url, ERROR, error)
+
+    def mark_pending(self, url: str) -> None:
+        self._transition(url, PENDING)
+
+    def add_pending(self, urls: Iterable[str]) -> int:
+        """Queue URLs that are not tracked yet; returns how many were added."""
+        with self._lock:
+            new = [u for u in dict.fromkeys(urls) if u and self.status(u) is None]
+            if new:
+                now = time.time()
+                self._append([{"url": u, "status": PENDING, "ts": now} for u in new])
+                for u in new:
+                    self._set(u, PENDING)
+            return len(new)
+
+    def requeue_errors(self) -> int:
+        """Move every errored URL back to pending; returns how many moved."""
+        with self._lock:
+            urls = list(self._errors)
+            if urls:
+                now = time.time()
+                self._append([{"url": u, "status": PENDING, "ts": now} for u in urls])
+                for u in urls:
+                    self._set(u, PENDING)
+            return len(urls)
+
+    # -- queries -----------------------------------------------------------------------
+
+    def status(self, url: str) -> Optional[str]:
+        with self._lock:
+            if url in self._processed:
+                return PROCESSED
+            if url in self._pending:
+                return PENDING
+            if url in self._errors:
+                return ERROR
+            return None
+
+    def pending(self) -> list[str]:
+        with self._lock:
+            return list(self._pending)
+
+    def processed(self) -> list[str]:
+        with self._lock:
+            return list(self._processed)
+
+    def is_empty(self) -> bool:
+        with self._lock:
+            return not (self._processed or self._pending or self._errors)
+
+    def counts(self) -> dict:
+        with self._lock:
+            return {PROCESSED: len(self._processed), PENDING: len(self._pending), ERROR: len(self._errors)}
+
+    # -- export / compaction -----------------------------------------------------------
+
+    def export(self) -> dict:
+        """State in the committed last_state.json format."""
+        with self._lock:
+            return {
+                PROCESSED: list(self._processed),
+                PENDING: list(self._pending),
+                ERROR: [{"url": url, "error": err} for url, err in self._errors.items()],
+            }
+
+    def export_json(self, path: pathlib.Path | str) -> None:
+        _write_json_atomic(path, self.export())
+
+    def compact(self) -> None:
+        """Merge snapshot and all journals into the snapshot, then delete the journals."""
+        with self._lock, file_lock(self.lock_path):
+            self._load()
+            self.export_json(self.snapshot_path)
+            for path in list(self._offsets):
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+            self._offsets = {}
+            self._snapshot_mtime = self._snapshot_stamp()
+            self.journal_entries = 0
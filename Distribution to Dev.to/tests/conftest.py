@@ -0,0 +1,5 @@
+import pathlib
+import sys
+
+# The modules live flat next to this folder, like app.py imports them.
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
@@ -0,0 +1,101 @@
+"""A local stand-in for the GitHub Git Data and Contents APIs of one repo, `o/r`.
+
+`ref_failures` lists status codes the next ref updates answer with. A 422 also moves the
+branch to a new commit first, like another push landing in between.
+"""
+import hashlib
+import http.server
+import itertools
+import json
+import re
+import threading
+
+
+class FakeGitHub:
+    repo = "o/r"
+
+    def __init__(self):
+        self.calls = []
+        self.blobs = {}
+        self.trees = {"t0": {}}
+        self.commits = {"c0": {"tree": "t0", "parents": []}}
+        self.refs = {"main": "c0"}
+        self.contents = {}
+        self.ref_failures = []
+        self._ids = itertools.count(1)
+        fake = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def _reply(self, status, body):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _handle(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}")
+                path = self.path.split("?")[0]
+                fake.calls.append((self.command, path))
+                status, reply = fake.handle(self.command, path[len(f"/repos/{fake.repo}") :], body)
+                self._reply(status, reply)
+
+            do_GET = do_POST = do_PATCH = do_PUT = _handle
+
+            def log_message(self, *args):
+                pass
+
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _new_id(self, prefix):
+        return f"{prefix}{next(self._ids)}"
+
+    def head_tree(self):
+        return self.trees[self.commits[self.refs["main"]]["tree"]]
+
+    def handle(self, method, rest, body):
+        if method == "GET" and rest == "":
+            return 200, {"default_branch": "main"}
+        match = re.fullmatch(r"/git/ref/heads/(.+)", rest)
+        if method == "GET" and match:
+            sha = self.refs.get(match.group(1))
+            return (200, {"object": {"sha": sha}}) if sha else (404, {"message": "Not Found"})
+        match = re.fullmatch(r"/git/commits/(.+)", rest)
+        if method == "GET" and match:
+            return 200, {"sha": match.group(1), "tree": {"sha": self.commits[match.group(1)]["tree"]}}
+        if method == "POST" and rest == "/git/blobs":
+            sha = "b" + hashlib.sha1(body["content"].encode()).hexdigest()[:8]
+            self.blobs[sha] = body["content"]
+            return 201, {"sha": sha}
+        if method == "POST" and rest == "/git/trees":
+            sha = self._new_id("t")
+            self.trees[sha] = {**self.trees[body["base_tree"]], **{e["path"]: e["sha"] for e in body["tree"]}}
+            return 201, {"sha": sha}
+        if method == "POST" and rest == "/git/commits":
+            sha = self._new_id("c")
+            self.commits[sha] = {"tree": body["tree"], "parents": body["parents"], "message": body["message"]}
+            return 201, {"sha": sha}
+        match = re.fullmatch(r"/git/refs/heads/(.+)", rest)
+        if method == "PATCH" and match:
+            if self.ref_failures:
+                status = self.ref_failures.pop(0)
+                if status == 422:
+                    other = self._new_id("c")
+                    self.commits[other] = {"tree": "t0", "parents": [self.refs["main"]]}
+                    self.refs["main"] = other
+                return status, {"message": "Update is not a fast forward"}
+            self.refs[match.group(1)] = body["sha"]
+            return 200, {"object": {"sha": body["sha"]}}
+        match = re.fullmatch(r"/contents/(.+)", rest)
+        if method == "PUT" and match:
+            self.contents[match.group(1)] = body["content"]
+            return 201, {"content": {"download_url": f"https://raw.example/{self.repo}/main/{match.group(1)}"}}
+        return 404, {"message": f"unexpected {method} {rest}"}
@@ -0,0 +1,19 @@
+import boilerplate
+
+
+def _page(i):
+    return f"Home Blog Pricing\nArticle {i} intro.\nKey Features\nFeature detail {i}.\nConclusion\nWrap-up {i}.\n© Example Inc."
+
+
+def test_repeated_in_article_headings_survive_while_site_chrome_is_stripped(tmp_path):
+    index = boilerplate.BoilerplateIndex(tmp_path)
+    for i in range(boilerplate.DEFAULT_MIN_PAGES):
+        cleaned = index.clean(f"https://blog.example/post-{i}", _page(i), keep=["Key Features", "Conclusion"])
+
+    assert cleaned.splitlines() == [f"Article {i} intro.", "Key Features", f"Feature detail {i}.", "Conclusion", f"Wrap-up {i}."]
+
+
+def test_nothing_is_stripped_before_min_pages(tmp_path):
+    index = boilerplate.BoilerplateIndex(tmp_path)
+    for i in range(boilerplate.DEFAULT_MIN_PAGES - 1):
+        assert index.clean(f"https://blog.example/post-{i}", _page(i)) == _page(i)
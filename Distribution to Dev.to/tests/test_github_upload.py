@@ -0,0 +1,121 @@
+import pytest
+
+import app
+import banner_cache
+import checkpoints
+import github_upload
+import ratelimit
+import run_from_json
+from fake_github import FakeGitHub
+from leases import LeaseTable
+from state_store import StateStore
+
+URLS = ["https://a.example/first-post", "https://a.example/second-post"]
+
+
+@pytest.fixture
+def github(monkeypatch):
+    fake = FakeGitHub()
+    monkeypatch.setenv("GITHUB_API_URL", fake.url)
+    monkeypatch.setenv("GITHUB_RAW_URL", "https://raw.example")
+    monkeypatch.setenv("GITHUB_TOKEN", "t")
+    monkeypatch.setenv("GITHUB_REPO", fake.repo)
+    monkeypatch.setitem(ratelimit._buckets, "github", ratelimit.TokenBucket(0))
+    for name in ("_pending", "_on_commit", "_deferred_urls"):
+        monkeypatch.setattr(github_upload, name, {})
+    yield fake
+    fake.close()
+
+
+@pytest.fixture
+def pipeline(tmp_path, monkeypatch, github):
+    """process_item() with canned pages and summaries, local banners uploaded to the fake."""
+    for name in ("BANNER_BASE_URL", "BANNER_PROVIDER", "BANNER_UPLOAD_PROVIDER", "GITHUB_BRANCH", "GITHUB_PATH_PREFIX"):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv("CHECKPOINT_DIR", str(tmp_path / "outputs"))
+    monkeypatch.setenv("BANNER_CACHE_DIR", str(tmp_path / "banner_cache"))
+    monkeypatch.setenv("NEAR_DUP", "0")
+    monkeypatch.setattr(banner_cache, "_default_cache", None)
+    monkeypatch.setattr(app, "STATIC_BANNERS_DIR", tmp_path / "banners")
+    monkeypatch.setattr(app, "fetch_page_keyed", lambda url: (f"Title of {url}", "Body text.", [], [], url))
+    monkeypatch.setattr(app, "summarize_content", lambda title, *args, **kwargs: f"Summary of {title}.")
+    store = StateStore(tmp_path / "state" / "last_state.json")
+    store.add_pending(URLS)
+    queue = run_from_json.WorkQueue(store, LeaseTable(tmp_path / "state" / "leases.json"))
+    return queue, {url: {"url": url} for url in URLS}
+
+
+def _queue_files(tmp_path, count):
+    for i in range(count):
+        source = tmp_path / f"banner-{i}.png"
+        source.write_bytes(b"png %d" % i)
+        github_upload.defer(f"banners/banner-{i}.png", source)
+
+
+def test_flush_rebuilds_the_commit_on_the_new_head_after_a_422(tmp_path, github):
+    _queue_files(tmp_path, 2)
+    github.ref_failures = [422]
+
+    committed = github_upload.flush(message="Add banners")
+
+    assert committed == {f"banners/banner-{i}.png": f"https://raw.example/o/r/main/banners/banner-{i}.png" for i in range(2)}
+    head = github.commits[github.refs["main"]]
+    moved_to = github.commits[head["parents"][0]]
+    assert moved_to["parents"] == ["c0"]  # the commit that landed in between
+    assert set(github.head_tree()) == {"banners/banner-0.png", "banners/banner-1.png"}
+    assert len([call for call in github.calls if call[0] == "PATCH"]) == 2
+    assert github_upload.pending_paths() == []
+
+
+def test_flush_gives_up_on_other_ref_errors(tmp_path, github):
+    _queue_files(tmp_path, 1)
+    github.ref_failures = [500]
+
+    with pytest.raises(RuntimeError, match="ref update failed"):
+        github_upload.flush()
+    assert github_upload.pending_paths() == ["banners/banner-0.png"]
+
+
+def test_batch_upload_commits_once_and_later_runs_hit_the_banner_cache(tmp_path, pipeline, github):
+    queue, items = pipeline
+
+    assert run_from_json.run_batch(items, queue, publish=False, batch_upload=True) == 2
+
+    assert len([call for call in github.calls if call[0] == "PATCH"]) == 1
+    assert len(github.head_tree()) == 2
+    assert queue.store.processed() == URLS
+    calls = len(github.calls)
+    for url in URLS:
+        urls = app.generate_banner_renditions(app.build_banner_prompt(f"Title of {url}", "", []))
+        assert urls["cover"].startswith("https://raw.example/o/r/main/banners/")
+    assert len(github.calls) == calls  # cached: no upload, no deferral, no API call
+
+
+def test_failed_batch_commit_clears_the_banner_and_postprocess_stages(tmp_path, pipeline, github):
+    queue, items = pipeline
+    github.ref_failures = [500]
+
+    assert run_from_json.run_batch(items, queue, publish=False, batch_upload=True) == 0
+
+    for url in URLS:
+        assert queue.store.status(url) == "error"
+        for stage in ("banner", "postprocess"):
+            assert checkpoints.load_stage(tmp_path / "outputs", url, stage) is None
+        assert checkpoints.load_stage(tmp_path / "outputs", url, "fetch") is not None
+
+
+def test_second_pass_skips_items_another_runner_took_over(tmp_path, pipeline, monkeypatch):
+    queue, items = pipeline
+    queue.leases.ttl = 0  # the first pass's leases have expired by the second pass
+    other_runner = LeaseTable(queue.leases.path, owner="other-runner")
+    flush = github_upload.flush
+
+    def flush_while_another_runner_claims(**kwargs):
+        assert other_runner.claim(URLS[0])
+        return flush(**kwargs)
+
+    monkeypatch.setattr(github_upload, "flush", flush_while_another_runner_claims)
+
+    assert run_from_json.run_batch(items, queue, publish=False, batch_upload=True) == 1
+    assert queue.store.status(URLS[0]) == "pending"
+    assert queue.store.status(URLS[1]) == "processed"
@@ -0,0 +1,26 @@
+from html_extract import _PageExtractor, extract_page
+
+
+def _list_items(html: str):
+    parser = _PageExtractor("https://example.com/")
+    parser.feed(html)
+    parser.close()
+    return parser.list_items
+
+
+def test_unclosed_list_items_end_at_next_item_and_list_end():
+    html = "<ul><li>One</li><li>Two<li>Three</ul><h2>Sub</h2><p>End</p>"
+    assert _list_items(html) == ["One", "Two", "Three"]
+    _, _, _, points, headings = extract_page("https://example.com/", html)
+    assert points == ["Sub", "One", "Two", "Three"]
+    assert headings == ["Sub"]
+
+
+def test_unclosed_items_in_nested_lists():
+    html = "<ol><li>A<ul><li>A1<li>A2</ul><li>B</ol><p>After</p>"
+    assert _list_items(html) == ["AA1A2", "A1", "A2", "B"]
+
+
+def test_max_bytes_counts_utf8_bytes():
+    title, text, _, _, _ = extract_page("https://example.com/", "<p>" + "é" * 100 + "</p>", max_bytes=53)
+    assert text == "é" * 25
@@ -0,0 +1,42 @@
+import threading
+import time
+
+import web
+from jobs import DONE, default_job_queue
+
+
+def _finished_job():
+    job = default_job_queue().submit(lambda job: {"ok": True}, kind="test")
+    deadline = time.monotonic() + 5
+    while not job.finished and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert job.state == DONE
+    return job
+
+
+def _read_events(job, **headers):
+    body = {}
+
+    def _get():
+        resp = web.app.test_client().get(f"/jobs/{job.id}/events", headers=headers)
+        body["text"] = resp.get_data(as_text=True)
+
+    reader = threading.Thread(target=_get, daemon=True)
+    reader.start()
+    reader.join(timeout=5)
+    assert not reader.is_alive(), "event stream did not end"
+    return body["text"]
+
+
+def test_finished_job_replays_its_events_and_ends():
+    job = _finished_job()
+    text = _read_events(job)
+    assert "event: done" in text
+    assert text.index("event: state") < text.index("event: done")
+
+
+def test_reconnect_after_last_event_ends_the_stream():
+    job = _finished_job()
+    last_id = job.status()["events"]
+    text = _read_events(job, **{"Last-Event-ID": str(last_id)})
+    assert text == ""
@@ -0,0 +1,52 @@
+import near_dup
+import run_from_json
+
+ARTICLE = " ".join(f"word{i}" for i in range(300))
+
+
+def test_checks_append_to_the_journal_and_compact_folds_it(tmp_path):
+    index = near_dup.NearDupIndex(tmp_path)
+    assert index.check("https://a.example/1", ARTICLE) is None
+    assert index.check("https://a.example/2", "something else entirely " * 20) is None
+    assert not index.path.exists()  # no snapshot rewrite per check
+    assert len(index.journal_path.read_text().splitlines()) == 2
+
+    other_worker = near_dup.NearDupIndex(tmp_path)
+    assert other_worker.check("https://a.example/copy", ARTICLE + " extra")[0] == "https://a.example/1"
+
+    index.compact()
+    assert not index.journal_path.exists()
+    reloaded = near_dup.NearDupIndex(tmp_path)
+    assert reloaded.check("https://a.example/copy", ARTICLE + " extra")[0] == "https://a.example/1"
+    assert not reloaded.journal_path.exists()  # unchanged entry, nothing appended
+
+
+def test_defer_near_duplicates_keeps_queue_order_with_parallel_fetches(tmp_path, monkeypatch):
+    import app
+
+    pages = {"https://a.example/first": ARTICLE, "https://a.example/other": "unrelated text " * 30}
+    pages["https://a.example/dup"] = ARTICLE + " copy"
+    monkeypatch.setattr(app, "default_near_dup_index", lambda: near_dup.NearDupIndex(tmp_path))
+    monkeypatch.setattr(app, "fetch_page", lambda url: ("title", pages[url]))
+
+    urls = ["https://a.example/first", "https://a.example/dup", "https://a.example/other"]
+    assert run_from_json.defer_near_duplicates(urls, fetch_workers=3) == [urls[0], urls[2], urls[1]]
+
+
+def test_signature_agreement_tracks_shingle_overlap():
+    words = [f"w{i}" for i in range(4000)]
+    base = " ".join(words)
+    sig = near_dup.signature(base)
+
+    assert near_dup.similarity(sig, near_dup.signature(" ".join(words[:3800] + ["x"] * 200))) > 0.85
+    assert near_dup.similarity(sig, near_dup.signature(" ".join(f"v{i}" for i in range(4000)))) < 0.05
+    short = near_dup.signature("only a handful of words here")  # fewer shingles than bins
+    assert len(short) == near_dup.NUM_PERM and near_dup.similarity(short, short) == 1.0
+
+
+def test_entries_signed_by_an_older_scheme_are_dropped(tmp_path):
+    (tmp_path / "index.json").write_text('{"entries": {"https://a.example/1": {"seq": 0, "sig": [1, 2, 3]}}}')
+    index = near_dup.NearDupIndex(tmp_path)
+
+    assert index.check("https://a.example/2", ARTICLE) is None
+    assert list(index._entries) == ["https://a.example/2"]
@@ -0,0 +1,138 @@
+import http.server
+import threading
+import time
+
+import pytest
+import requests
+
+import http_client
+import ratelimit
+
+
+class _Response:
+    status_code = 200
+    headers: dict = {}
+
+
+def test_a_call_waiting_for_its_token_does_not_hold_the_concurrency_slot(monkeypatch):
+    monkeypatch.setitem(ratelimit.SERVICE_CONCURRENCY_DEFAULTS, "test-slot", ("TEST_SLOT_CONCURRENCY", 1))
+    ratelimit.limiter("test-slot").pause(0.5)
+    sent = []
+    waiter = threading.Thread(target=lambda: sent.append(ratelimit.send("test-slot", _Response)))
+    waiter.start()
+    time.sleep(0.1)
+
+    with ratelimit.concurrency_slot("test-slot"):  # would block until the pause ends if the waiter held it
+        assert not sent
+    waiter.join(5)
+    assert len(sent) == 1
+
+
+def test_the_concurrency_slot_caps_calls_in_flight(monkeypatch):
+    monkeypatch.setitem(ratelimit.SERVICE_CONCURRENCY_DEFAULTS, "test-cap", ("TEST_CAP_CONCURRENCY", 1))
+    in_flight, peak, lock = [0], [0], threading.Lock()
+
+    def call():
+        with lock:
+            in_flight[0] += 1
+            peak[0] = max(peak[0], in_flight[0])
+        time.sleep(0.05)
+        with lock:
+            in_flight[0] -= 1
+        return _Response()
+
+    threads = [threading.Thread(target=ratelimit.send, args=("test-cap", call)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert peak[0] == 1
+
+
+class _ScriptedServer:
+    """Local HTTP server answering with `plan` entries `(status, headers)` in turn, then 200.
+
+    A `None` entry reads the request and drops the connection without answering.
+    """
+
+    def __init__(self):
+        self.plan, self.hits, lock = [], [], threading.Lock()
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _handle(self):
+                self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                with lock:
+                    server.hits.append((time.monotonic(), self.command))
+                    step = server.plan.pop(0) if server.plan else (200, {})
+                if step is None:
+                    self.close_connection = True
+                    return
+                status, headers = step
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", "2")
+                self.end_headers()
+                self.wfile.write(b"{}")
+
+            do_GET = do_POST = _handle
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}/api"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+
+@pytest.fixture
+def server():
+    scripted = _ScriptedServer()
+    yield scripted
+    scripted.httpd.shutdown()
+    scripted.httpd.server_close()
+
+
+def test_http_client_pauses_on_429_retry_after_and_resends(server):
+    server.plan = [(429, {"Retry-After": "1"})]
+
+    resp = http_client.post(server.url, json={"n": 1}, service="test-429")
+
+    assert resp.status_code == 200
+    assert [method for _, method in server.hits] == ["POST", "POST"]
+    assert server.hits[1][0] - server.hits[0][0] >= 0.9
+    assert ratelimit.stats()["test-429"]["throttled"] == 1
+
+
+def test_http_client_frees_the_concurrency_slot_while_waiting(server, monkeypatch):
+    monkeypatch.setitem(ratelimit.SERVICE_CONCURRENCY_DEFAULTS, "test-wait", ("TEST_WAIT_CONCURRENCY", 1))
+    ratelimit.limiter("test-wait").pause(0.5)  # first the token wait, then a throttled retry
+    server.plan = [(429, {"Retry-After": "1"})]
+    sent = []
+    caller = threading.Thread(target=lambda: sent.append(http_client.get(server.url, service="test-wait")))
+    caller.start()
+
+    semaphore = ratelimit._semaphore("test-wait")
+    time.sleep(0.1)
+    assert semaphore.acquire(timeout=0.2) and not server.hits  # waiting for its token
+    semaphore.release()
+    while not server.hits:
+        time.sleep(0.02)
+    time.sleep(0.1)
+    assert semaphore.acquire(timeout=0.2) and len(server.hits) == 1  # waiting out the Retry-After
+    semaphore.release()
+
+    caller.join(5)
+    assert sent[0].status_code == 200 and len(server.hits) == 2
+
+
+def test_http_client_never_replays_a_post_after_a_read_error(server):
+    server.plan = [None]
+
+    with pytest.raises(requests.ConnectionError):
+        http_client.post(server.url, json={"publish": True}, service="test-read-error")
+
+    assert [method for _, method in server.hits] == ["POST"]
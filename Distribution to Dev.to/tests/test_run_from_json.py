@@ -0,0 +1,52 @@
+import canonical_index
+import checkpoints
+import run_from_json
+from state_store import StateStore
+
+
+def test_seed_canonical_index_only_takes_items_published_to_devto(tmp_path, monkeypatch):
+    index = canonical_index.CanonicalIndex(tmp_path / "canonical_urls.json")
+    monkeypatch.setattr(canonical_index, "default_canonical_index", lambda: index)
+    monkeypatch.setenv("CHECKPOINT_DIR", str(tmp_path / "outputs"))
+    store = StateStore(tmp_path / "state.json")
+    items = {url: {"url": url} for url in ("https://a.example/published", "https://a.example/dry-run")}
+    store.add_pending(items)
+    for url in items:
+        store.mark_processed(url)
+    checkpoints.ItemCheckpoint(tmp_path / "outputs", "https://a.example/dry-run")  # no publish stage
+    published = checkpoints.ItemCheckpoint(tmp_path / "outputs", "https://a.example/published")
+    published.save("publish", {"id": 7, "url": "https://dev.to/me/published-1"})
+
+    run_from_json.seed_canonical_index(store, items, sync_devto=False)
+
+    assert index.lookup("https://a.example/published")["devto_url"] == "https://dev.to/me/published-1"
+    assert index.lookup("https://a.example/dry-run") is None
+
+
+def test_devto_sync_is_on_by_default_when_an_api_key_is_set(monkeypatch):
+    monkeypatch.delenv("DEVTO_SYNC_CANONICALS", raising=False)
+    monkeypatch.setenv("DEVTO_API_KEY", "k")
+    for argv, expected in (([], True), (["--no-sync-devto"], False), (["--sync-devto"], True)):
+        monkeypatch.setattr("sys.argv", ["run_from_json.py", *argv])
+        assert run_from_json.parse_args().sync_devto is expected
+
+    monkeypatch.setenv("DEVTO_SYNC_CANONICALS", "0")
+    monkeypatch.setattr("sys.argv", ["run_from_json.py"])
+    assert run_from_json.parse_args().sync_devto is False
+
+    monkeypatch.delenv("DEVTO_SYNC_CANONICALS")
+    monkeypatch.delenv("DEVTO_API_KEY")
+    assert run_from_json.parse_args().sync_devto is False
+
+
+def test_seed_canonical_index_syncs_from_devto(tmp_path, monkeypatch):
+    index = canonical_index.CanonicalIndex(tmp_path / "canonical_urls.json")
+    monkeypatch.setattr(canonical_index, "default_canonical_index", lambda: index)
+    monkeypatch.setenv("CHECKPOINT_DIR", str(tmp_path / "outputs"))
+    monkeypatch.setenv("DEVTO_API_KEY", "k")
+    synced = []
+    monkeypatch.setattr(index, "sync_from_devto", lambda key: synced.append(key) or 0)
+
+    run_from_json.seed_canonical_index(StateStore(tmp_path / "state.json"), {}, sync_devto=True)
+
+    assert synced == ["k"]
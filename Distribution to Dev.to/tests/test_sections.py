@@ -0,0 +1,32 @@
+import app
+import sections
+
+HEADINGS = [f"Tool {i}" for i in range(40)]
+TEXT = "\n".join(f"Tool {i}\n" + f"What tool {i} does. " * 20 for i in range(40))
+
+
+def test_chunk_text_packs_into_max_chunks_without_dropping_sections():
+    assert len(sections.chunk_text(TEXT, HEADINGS, max_chars=1000)) > 10
+
+    chunks = sections.chunk_text(TEXT, HEADINGS, max_chars=1000, max_chunks=10)
+
+    assert len(chunks) <= 10
+    assert "\n".join(chunks) == TEXT
+
+
+def test_condense_long_text_covers_every_section_past_the_chunk_cap(monkeypatch, capsys):
+    monkeypatch.setenv("SUMMARY_CHUNK_CHARS", "1000")
+    monkeypatch.setenv("SUMMARY_MAX_CHUNKS", "10")
+    payloads = []
+
+    def run_agent(name, instructions, input_payload, *args, **kwargs):
+        payloads.append(input_payload)
+        return input_payload.rsplit("\n\n", 1)[1]
+
+    monkeypatch.setattr(app, "_run_agent_cached", run_agent)
+
+    digest, chunk_count = app.condense_long_text("Top tools", TEXT, HEADINGS)
+
+    assert chunk_count == len(payloads) <= 10
+    assert all(f"Tool {i}\n" in digest for i in range(40))
+    assert "exceed SUMMARY_MAX_CHUNKS=10" in capsys.readouterr().out
@@ -0,0 +1,35 @@
+import app
+
+
+def test_summary_cache_key_ignores_boilerplate_learned_later(monkeypatch):
+    key_inputs = []
+
+    def run_agent(name, instructions, input_payload, model, settings, refresh=False, on_delta=None, key_input=None):
+        key_inputs.append(key_input)
+        return "summary"
+
+    monkeypatch.setattr(app, "_run_agent_cached", run_agent)
+    before = "Intro.\nShared footer line.\nBody."
+    after = "Intro.\nBody."  # the index has since learned that the footer is boilerplate
+    app.summarize_content("Title", "https://a.example/p", before, source_key="raw-hash")
+    app.summarize_content("Title", "https://a.example/p", after, source_key="raw-hash")
+    assert key_inputs[0] == key_inputs[1]
+    assert "Shared footer line" not in key_inputs[0]
+
+
+def test_fetch_page_keyed_hashes_the_text_before_boilerplate_removal(monkeypatch):
+    monkeypatch.setattr(app, "_fetch_parsed", lambda url: ("T", "Nav\nBody", [], [], []))
+
+    class Index:
+        def __init__(self, boilerplate):
+            self.boilerplate = boilerplate
+
+        def clean(self, url, text, keep=()):
+            return "\n".join(line for line in text.splitlines() if line not in self.boilerplate)
+
+    monkeypatch.setattr(app, "default_boilerplate_index", lambda: Index(set()))
+    unlearned = app.fetch_page_keyed("https://a.example/p")
+    monkeypatch.setattr(app, "default_boilerplate_index", lambda: Index({"Nav"}))
+    learned = app.fetch_page_keyed("https://a.example/p")
+    assert learned[1] == "Body" and unlearned[1] == "Nav\nBody"
+    assert learned[4] == unlearned[4]
@@ -1,11 +1,13 @@
+import json
 import os
-from typing import List
+import time
+from typing import Callable, List
 
-from flask import Flask, render_template, request
+from flask import Flask, Response, jsonify, render_template, request
 from dotenv import load_dotenv
 
 from app import (
-    fetch_page,
+    fetch_page_keyed,
     summarize_content,
     post_devto,
     generate_banner,
@@ -15,7 +17,10 @@ from app import (
     _ensure_front_matter_cover_image,
     _remove_leading_title,
     _ensure_banner_markdown,
+    _run_banner_and_summary,
 )
+from drafts import content_hash, default_draft_store, draft_id
+from jobs import QueueFullError, default_job_queue
 
 load_dotenv()
 
@@ -23,14 +28,196 @@ app = Flask(__name__)
 app.config["TEMPLATES_AUTO_RELOAD"] = True
 
 
+def _truthy(value: str | None) -> bool:
+    return (value or "").strip().lower() in {"1", "true", "yes", "on"}
+
+
 def _truthy_env(name: str, default: str = "0") -> bool:
-    return (os.getenv(name, default) or "").strip().lower() in {"1", "true", "yes", "on"}
+    return _truthy(os.getenv(name, default))
 
 
 def _parse_tags(raw: str) -> List[str]:
     return [t.strip() for t in raw.split(",") if t.strip()] if raw else []
 
 
+def _banner_base_url(host_url: str) -> str:
+    base_url = (os.getenv("BANNER_BASE_URL") or "").strip()
+    if not base_url:
+        upload_provider = (os.getenv("BANNER_UPLOAD_PROVIDER") or "").strip().lower()
+        if upload_provider != "github":
+            base_url = host_url.rstrip("/") + "/static/banners"
+    return base_url
+
+
+def _timed(emit: Callable[[str, dict], None], stage: str, fn: Callable[[], object]) -> Callable[[], object]:
+    """Wrap `fn` so it reports `stage` start/finish (with seconds taken) through `emit`."""
+
+    def _run():
+        emit("stage", {"stage": stage, "status": "started"})
+        started = time.monotonic()
+        try:
+            value = fn()
+        except Exception as exc:
+            emit("stage", {"stage": stage, "status": "failed", "error": str(exc)})
+            raise
+        emit("stage", {"stage": stage, "status": "done", "seconds": round(time.monotonic() - started, 1)})
+        return value
+
+    return _run
+
+
+def _draft_settings(base_url: str) -> dict:
+    """Settings besides the page itself that change a generated draft."""
+    return {
+        "base_url": base_url,
+        "banner_provider": (os.getenv("BANNER_PROVIDER") or "local").strip().lower(),
+        "inline_banner": _truthy_env("INLINE_BANNER", default="0"),
+        "blurb": company_blurb(),
+    }
+
+
+def _draft_fields(draft: dict) -> dict:
+    return {key: draft.get(key) for key in ("summary_md", "banner_url", "title", "source_url")}
+
+
+def generate_draft(
+    source_url: str,
+    base_url: str,
+    emit: Callable[[str, dict], None] = lambda event, data: None,
+    refresh: bool = False,
+) -> dict:
+    """Fetch, banner and summarize `source_url` into a reviewable draft, reporting stages via `emit`.
+
+    While the summary is written, its markdown is emitted piece by piece as "delta" events.
+    Drafts are kept in the draft store (drafts.py) by source URL and page content (the text
+    before boilerplate removal, see fetch_page_keyed()), so an unchanged page returns its
+    stored draft right after the fetch. `refresh` skips the stored draft and the summary
+    and banner caches, so a new draft is generated.
+
+    Returns the template fields: summary_md, banner_url, title, source_url, draft_id,
+    errors and status_messages. Banner failures are reported in `errors`; other failures raise.
+    """
+    errors: List[str] = []
+    page_title, page_text, page_links, page_main_points, source_key = _timed(
+        emit, "fetch", lambda: fetch_page_keyed(source_url)
+    )()
+    store = default_draft_store()
+    key = draft_id(source_url, content_hash(page_title, source_key), _draft_settings(base_url))
+    saved = store.get(key) if store is not None and not refresh else None
+    if saved is not None:
+        emit("stage", {"stage": "draft", "status": "done", "reused": True})
+        return {
+            **_draft_fields(saved),
+            "draft_id": key,
+            "errors": [],
+            "status_messages": ["Reused the stored draft for this unchanged page. Tick Regenerate to build a new one."],
+        }
+    title = page_title
+    caption_text = banner_caption_text()
+    prompt = build_banner_prompt(title, page_text, [], caption=caption_text)
+
+    banner_url, banner_error, summary_md = _run_banner_and_summary(
+        _timed(emit, "banner", lambda: generate_banner(prompt, base_url=base_url, caption=caption_text, refresh=refresh)),
+        _timed(
+            emit,
+            "summarize",
+            lambda: summarize_content(
+                title,
+                source_url,
+                page_text,
+                main_points=page_main_points,
+                banner_url=None,
+                lock_title=True,
+                refresh=refresh,
+                on_delta=lambda text: emit("delta", {"text": text}),
+                source_key=source_key,
+            ),
+        ),
+    )
+    if banner_error is not None:
+        errors.append(f"Banner generation failed: {banner_error}")
+
+    summary_md = _remove_leading_title(summary_md, title)
+
+    if banner_url:
+        summary_md = _ensure_front_matter_cover_image(summary_md, banner_url)
+
+    if banner_url and _truthy_env("INLINE_BANNER", default="0"):
+        summary_md = _ensure_banner_markdown(summary_md, banner_url)
+
+    blurb = company_blurb()
+    if blurb and blurb not in summary_md:
+        summary_md = summary_md.rstrip() + "\n\n---\n\n## About Infrasity\n\n" + blurb
+    draft = {"summary_md": summary_md, "banner_url": banner_url, "title": title, "source_url": source_url}
+    # Drafts with a failed banner are not kept, so the next attempt retries the banner.
+    if store is not None and not errors:
+        store.put(key, draft)
+    return {
+        **draft,
+        "draft_id": key if store is not None and not errors else None,
+        "errors": errors,
+        "status_messages": ["Draft ready. Review markdown and banner, then click Publish when ready."],
+    }
+
+
+@app.route("/jobs", methods=["POST"])
+def create_job():
+    """Queue draft generation for `url`; returns 202 with the job id and its event stream URL."""
+    source_url = (request.form.get("url") or (request.get_json(silent=True) or {}).get("url") or "").strip()
+    if not source_url:
+        return jsonify({"error": "URL is required."}), 400
+    base_url = _banner_base_url(request.host_url)
+    refresh = _truthy(request.form.get("refresh"))
+    try:
+        job = default_job_queue().submit(
+            lambda job: generate_draft(source_url, base_url, emit=job.emit, refresh=refresh), kind="draft", url=source_url
+        )
+    except QueueFullError as exc:
+        return jsonify({"error": str(exc)}), 503, {"Retry-After": "10"}
+    return jsonify({"id": job.id, "status": f"/jobs/{job.id}", "events": f"/jobs/{job.id}/events"}), 202
+
+
+@app.route("/jobs/<job_id>")
+def job_status(job_id: str):
+    job = default_job_queue().get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown or expired job."}), 404
+    return jsonify(job.status())
+
+
+@app.route("/jobs/<job_id>/events")
+def job_events(job_id: str):
+    """Server-Sent Events: the job's events so far (after Last-Event-ID), then new ones until it ends."""
+    job = default_job_queue().get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown or expired job."}), 404
+    try:
+        start = int(request.headers.get("Last-Event-ID") or request.args.get("after") or 0)
+    except ValueError:
+        start = 0
+
+    def _stream():
+        index = start
+        while True:
+            # Read before waiting: a job finished by then already holds its last event.
+            finished = job.finished
+            events = job.events_since(index, timeout=15)
+            if not events and finished:
+                return  # e.g. a reconnect whose Last-Event-ID is already the final event
+            if not events:
+                yield ": keep-alive\n\n"
+                continue
+            for event_id, event, data in events:
+                index = event_id
+                yield f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data)}\n\n"
+                if event in ("done", "error"):
+                    return
+
+    return Response(
+        _stream(), mimetype="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @app.route("/", methods=["GET", "POST"])
 def index():
     status_messages: List[str] = []
@@ -39,64 +226,57 @@ def index():
     banner_url: str | None = None
     title: str | None = None
     source_url: str | None = None
+    current_draft_id: str | None = None
+
+    store = default_draft_store()
+    if request.method == "GET" and request.args.get("draft"):
+        # Reloading /?draft=<id> brings the stored draft back.
+        saved = store.get(request.args["draft"]) if store is not None else None
+        if saved is None:
+            errors.append("That draft is no longer stored. Generate it again.")
+        else:
+            summary_md, banner_url, title, source_url = _draft_fields(saved).values()
+            current_draft_id = saved["id"]
+            if saved.get("published"):
+                status_messages.append(f"Already published: {saved['published'].get('url')}")
 
     if request.method == "POST":
         action = request.form.get("action", "generate")
 
         if action == "generate":
+            # Without JavaScript the form posts here and waits; the page itself uses /jobs.
             source_url = request.form.get("url", "").strip()
             if not source_url:
                 errors.append("URL is required.")
 
             if not errors:
                 try:
-                    page_title, page_text, page_links, page_main_points = fetch_page(source_url)
-                    title = page_title
-                    caption_text = banner_caption_text()
-
-                    try:
-                        base_url = (os.getenv("BANNER_BASE_URL") or "").strip()
-                        if not base_url:
-                            upload_provider = (os.getenv("BANNER_UPLOAD_PROVIDER") or "").strip().lower()
-                            if upload_provider != "github":
-                                base_url = request.host_url.rstrip("/") + "/static/banners"
-                        prompt = build_banner_prompt(title, page_text, [], caption=caption_text)
-                        banner_url = generate_banner(prompt, base_url=base_url, caption=caption_text)
-                    except Exception as exc:
-                        banner_url = None
-                        errors.append(f"Banner generation failed: {exc}")
-
-                    summary_md = summarize_content(
-                        title,
-                        source_url,
-                        page_text,
-                        main_points=page_main_points,
-                        banner_url=banner_url,
-                        lock_title=True,
+                    draft = generate_draft(
+                        source_url, _banner_base_url(request.host_url), refresh=_truthy(request.form.get("refresh"))
                     )
-
-                    summary_md = _remove_leading_title(summary_md, title)
-
-                    if banner_url:
-                        summary_md = _ensure_front_matter_cover_image(summary_md, banner_url)
-
-                    if banner_url and _truthy_env("INLINE_BANNER", default="0"):
-                        summary_md = _ensure_banner_markdown(summary_md, banner_url)
-
-                    blurb = company_blurb()
-                    if blurb and blurb not in summary_md:
-                        summary_md = summary_md.rstrip() + "\n\n---\n\n## About Infrasity\n\n" + blurb
-                    status_messages.append("Draft ready. Review markdown and banner, then click Publish when ready.")
+                    summary_md, banner_url, title = draft["summary_md"], draft["banner_url"], draft["title"]
+                    current_draft_id = draft["draft_id"]
+                    errors.extend(draft["errors"])
+                    status_messages.extend(draft["status_messages"])
                 except Exception as exc:  # pragma: no cover - interactive path
                     errors.append(f"Failed to summarize: {exc}")
 
         elif action == "publish":
-            summary_md = (request.form.get("summary_md") or "").strip()
-            title = (request.form.get("title") or "").strip() or None
-            source_url = (request.form.get("url") or "").strip() or None
-            banner_url = (request.form.get("banner_url") or "").strip() or None
+            current_draft_id = (request.form.get("draft_id") or "").strip() or None
+            if current_draft_id:
+                # The form only carries the id; the article comes from the draft store.
+                saved = store.get(current_draft_id) if store is not None else None
+                if saved is None:
+                    errors.append("That draft is no longer stored. Generate it again.")
+                    saved = {}
+                summary_md, banner_url, title, source_url = _draft_fields(saved).values()
+            else:
+                summary_md = (request.form.get("summary_md") or "").strip()
+                title = (request.form.get("title") or "").strip() or None
+                source_url = (request.form.get("url") or "").strip() or None
+                banner_url = (request.form.get("banner_url") or "").strip() or None
 
-            if not summary_md:
+            if not summary_md and not errors:
                 errors.append("Nothing to publish. Generate a draft first.")
 
             devto_key = os.getenv("DEVTO_API_KEY")
@@ -114,6 +294,8 @@ def index():
                         canonical_url=source_url,
                     )
                     status_messages.append(f"Dev.to published: {devto_resp.get('url', devto_resp)}")
+                    if current_draft_id and store is not None:
+                        store.mark_published(current_draft_id, devto_resp)
                 except Exception as exc:  # pragma: no cover - interactive path
                     errors.append(f"Dev.to failed: {exc}")
 
@@ -125,9 +307,11 @@ def index():
         banner_url=banner_url,
         title=title,
         source_url=source_url,
+        draft_id=current_draft_id,
     )
 
 
 if __name__ == "__main__":
     port = int(os.getenv("PORT", 5000))
-    app.run(debug=True, port=port)
+    # threaded: event streams hold a connection each while jobs run on the job queue's workers
+    app.run(debug=True, port=port, threaded=True)